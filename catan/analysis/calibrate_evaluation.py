@@ -0,0 +1,155 @@
+"""
+Fits the weights of catan.bots.evaluation.Evaluator to completed games.
+
+Plays games with the MCTS rollout policy (weighted random, on the fast
+rollout engine), records every player's features every few turns, and fits
+the conditional logit model P(winner = p) = softmax(features_p . weights)
+by maximum likelihood (Newton's method). Positions are labelled by who
+eventually won (games hitting the turns limit are skipped), so fitted
+probabilities predict the outcome of playing on with that same policy, as
+truncated MCTS playouts need.
+
+Reports log loss and accuracy (most probable player won) on held-out games,
+against the uniform and the victory-points-only predictions.
+
+Usage:
+    python -m catan.analysis.calibrate_evaluation [--games N] [--every T]
+        [--players 2 3 4] [--holdout F] [--seed S] [--output weights.json]
+"""
+
+import argparse
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from catan.bots.evaluation import FEATURES, Evaluator, position_features
+from catan.bots.mcts import DEFAULT_REWARDS_MAP
+from catan.core.game import TURNS_LIMIT, Game
+from catan.core.models.player import Color, RandomPlayer
+from catan.core.rollout import RolloutState
+
+# num_players => (positions x players x features, winner seat of each)
+Dataset = Dict[int, Tuple[np.ndarray, np.ndarray]]
+
+
+def play_game(
+    num_players: int, every: int, seed: int
+) -> List[Tuple[List[List[float]], int]]:
+    """(features of each player, winner seat) every few turns of a game,
+    played at random with the rollout policy. Empty if no one won."""
+    random.seed(seed)
+    colors = list(Color)[:num_players]
+    game = Game([RandomPlayer(color) for color in colors], seed=seed)
+    state = RolloutState.from_game(game)
+    weights = dict(DEFAULT_REWARDS_MAP)
+    snapshots = []
+    winner = None
+    while winner is None and state.num_turns < TURNS_LIMIT:
+        winner = state.play(weights, turns_limit=state.num_turns + every)
+        if winner is None and not state.is_initial_build_phase:
+            snapshots.append(position_features(state))
+    if winner is None:
+        return []
+    seat = state.colors.index(winner)
+    return [(features, seat) for features in snapshots]
+
+
+def build_dataset(games: List[List[Tuple[List[List[float]], int]]]) -> Dataset:
+    grouped: Dict[int, Tuple[list, list]] = {}
+    for positions in games:
+        for features, winner in positions:
+            xs, ys = grouped.setdefault(len(features), ([], []))
+            xs.append(features)
+            ys.append(winner)
+    return {
+        num_players: (np.array(xs, dtype=float), np.array(ys))
+        for num_players, (xs, ys) in grouped.items()
+    }
+
+
+def _probabilities(x: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    scores = x @ weights
+    scores -= scores.max(axis=1, keepdims=True)
+    exps = np.exp(scores)
+    return exps / exps.sum(axis=1, keepdims=True)
+
+
+def fit(data: Dataset, ridge: float = 1e-3, iterations: int = 50) -> np.ndarray:
+    """Maximum likelihood weights (with a small ridge penalty)."""
+    num_features = next(iter(data.values()))[0].shape[2]
+    weights = np.zeros(num_features)
+    for _ in range(iterations):
+        gradient = -ridge * weights
+        hessian = -ridge * np.eye(num_features)
+        for x, y in data.values():
+            p = _probabilities(x, weights)
+            mean = np.einsum("np,npf->nf", p, x)
+            gradient += (x[np.arange(len(y)), y] - mean).sum(axis=0)
+            second = np.einsum("np,npf,npg->fg", p, x, x)
+            hessian -= second - mean.T @ mean
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-9:
+            break
+    return weights
+
+
+def evaluate(data: Dataset, weights: np.ndarray) -> Tuple[float, float]:
+    """(mean log loss, accuracy) of the predictions of weights"""
+    loss, correct, count = 0.0, 0, 0
+    for x, y in data.values():
+        p = _probabilities(x, weights)
+        picked = p[np.arange(len(y)), y]
+        loss -= np.log(np.maximum(picked, 1e-12)).sum()
+        # ties (e.g. the uniform prediction) count as a fraction of a hit
+        best = p.max(axis=1, keepdims=True)
+        ties = (p == best).sum(axis=1)
+        correct += ((picked == best[:, 0]) / ties).sum()
+        count += len(y)
+    return loss / count, correct / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--every", type=int, default=10, help="turns between samples")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--holdout", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to save the weights to (JSON)")
+    args = parser.parse_args(argv)
+
+    games = [
+        play_game(args.players[i % len(args.players)], args.every, args.seed + i)
+        for i in range(args.games)
+    ]
+    split = int(len(games) * (1 - args.holdout))
+    train, test = build_dataset(games[:split]), build_dataset(games[split:] or games)
+    positions = sum(len(y) for _, y in train.values())
+    print(f"{positions} positions from {split} games for fitting")
+
+    weights = fit(train)
+    for name, weight in zip(FEATURES, weights):
+        print(f"  {name:<18} {weight:+.4f}")
+
+    victory_points_only = np.zeros(len(FEATURES))
+    victory_points_only[FEATURES.index("victory_points")] = fit(
+        {n: (x[:, :, :1], y) for n, (x, y) in train.items()}
+    )[0]
+    print(f"{'held-out':<22} {'log loss':>9} {'accuracy':>9}")
+    for name, candidate in (
+        ("uniform", np.zeros(len(FEATURES))),
+        ("victory points only", victory_points_only),
+        ("fitted", weights),
+    ):
+        loss, accuracy = evaluate(test, candidate)
+        print(f"{name:<22} {loss:>9.4f} {accuracy:>9.1%}")
+
+    if args.output:
+        Evaluator(weights.tolist()).save(args.output)
+        print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,8 @@ def plot_action_freqs(actions: List[Action], exclusions: List[str] = []):
         Color.BLUE: "blue",
         Color.ORANGE: "orange",
         Color.VIOLET: "purple",
+        Color.WHITE: "lightgray",
+        Color.GREEN: "green",
     }
 
     # Plotting
@@ -0,0 +1,157 @@
+"""
+Sequential tests, to stop win-rate experiments as soon as they are decided.
+
+Tests consume a stream of scores of player a against player b, one per
+independent unit (a game, or a deal in duplicate mode), where a score is in
+[0, 1]: 1 if a won, 0 if b won, 0.5 for neither (draws, another player won).
+For units with several games, use (1 + a's win rate - b's win rate) / 2.
+
+Decisions are H1 (a is stronger) or H0 (a is not), None while undecided.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Optional
+
+H0 = "H0"
+H1 = "H1"
+
+
+def elo_to_score(elo: float) -> float:
+    """Expected score of a player elo points stronger than its opponent."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class _Scores:
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def update(self, score: float):
+        if not 0 <= score <= 1:
+            raise ValueError(f"Scores must be in [0, 1], got {score}")
+        self.n += 1
+        self.total += score
+        self.total_squares += score * score
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.5
+
+    @property
+    def variance(self) -> float:
+        """Per-unit variance of the scores"""
+        if self.n == 0:
+            return 0.0
+        return max(0.0, self.total_squares / self.n - self.mean**2)
+
+
+class SPRT(_Scores):
+    """Sequential probability ratio test of H0: elo = elo0 against
+    H1: elo = elo1, for the Elo difference of a over b implied by its mean
+    score. Uses the normal approximation of the generalized SPRT (as in
+    chess engine testing), so scores can be per game or per deal.
+
+    Example:
+        test = SPRT(elo0=0, elo1=30)
+        for score in scores:
+            test.update(score)
+            if test.decision is not None:
+                break
+    """
+
+    def __init__(
+        self,
+        elo0: float = 0.0,
+        elo1: float = 20.0,
+        alpha: float = 0.05,
+        beta: float = 0.05,
+    ):
+        """
+        Args:
+            elo0 (float, optional): Elo difference under H0. Defaults to 0.
+            elo1 (float, optional): Elo difference under H1. Defaults to 20.
+            alpha (float, optional): false positive rate (accepting H1 when
+                H0 is true). Defaults to 0.05.
+            beta (float, optional): false negative rate. Defaults to 0.05.
+        """
+        super().__init__()
+        if elo1 <= elo0:
+            raise ValueError("elo1 must be greater than elo0")
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self) -> float:
+        """Log-likelihood ratio of H1 over H0 so far (0 until scores vary)."""
+        variance = self.variance
+        if self.n < 2 or variance == 0:
+            return 0.0
+        s0, s1 = elo_to_score(self.elo0), elo_to_score(self.elo1)
+        return (s1 - s0) * (2 * self.total - self.n * (s0 + s1)) / (2 * variance)
+
+    @property
+    def decision(self) -> Optional[str]:
+        llr = self.llr()
+        if llr >= self.upper:
+            return H1
+        if llr <= self.lower:
+            return H0
+        return None
+
+    def status(self) -> str:
+        return (
+            f"SPRT elo0={self.elo0:g} elo1={self.elo1:g}: LLR {self.llr():.2f} "
+            f"[{self.lower:.2f}, {self.upper:.2f}] after {self.n}, "
+            f"elo {score_to_elo(self.mean):+.0f}"
+        )
+
+
+class BayesianStop(_Scores):
+    """Stops when the posterior probability that a is stronger (mean score
+    above 0.5) goes over threshold (H1) or under 1 - threshold (H0). Uses a
+    normal approximation of the mean score's posterior with a flat prior.
+
+    Unlike SPRT, error rates aren't controlled when stopping early, so keep
+    threshold high and min_samples large enough to not stop on noise.
+    """
+
+    def __init__(self, threshold: float = 0.99, min_samples: int = 20):
+        super().__init__()
+        if not 0.5 < threshold < 1:
+            raise ValueError("threshold must be in (0.5, 1)")
+        self.threshold = threshold
+        self.min_samples = min_samples
+
+    def probability(self) -> float:
+        """Posterior probability that a is stronger than b."""
+        if self.n < 2:
+            return 0.5
+        standard_error = (self.variance / (self.n - 1)) ** 0.5
+        if standard_error == 0:
+            return 1.0 if self.mean > 0.5 else 0.0 if self.mean < 0.5 else 0.5
+        return NormalDist().cdf((self.mean - 0.5) / standard_error)
+
+    @property
+    def decision(self) -> Optional[str]:
+        if self.n < self.min_samples:
+            return None
+        probability = self.probability()
+        if probability >= self.threshold:
+            return H1
+        if probability <= 1 - self.threshold:
+            return H0
+        return None
+
+    def status(self) -> str:
+        return (
+            f"P(a stronger) = {self.probability():.3f} after {self.n} "
+            f"(threshold {self.threshold:g}), elo {score_to_elo(self.mean):+.0f}"
+        )
@@ -0,0 +1,33 @@
+"""
+Throughput of the NumPy batch engine for growing batch sizes.
+
+Plays batches of N random 4-player games in lockstep (see
+catan.core.batch.play_batch) and reports games per second for each N.
+
+Usage:
+    python -m catan.benchmarks.batch_engine [--sizes 1 10 100 ...] [--seed S]
+"""
+
+import argparse
+import time
+
+from catan.core.batch import play_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 3000]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        start = time.perf_counter()
+        play_batch(size, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"N={size}: {size / elapsed:.1f} games/sec ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+How move generation and longest road computation scale with board size.
+
+Plays a random game with 6 players on hexagonal maps of growing number of
+layers (see build_map_template; 3 is the base map) and times, over
+snapshots of it, generate_playable_actions, Board.buildable_edges (uncached)
+and longest_acyclic_path over every player's road components. Also times
+generate_coordinate_system for big layer counts.
+
+Usage:
+    python -m catan.benchmarks.board_scaling [max_layers] [seed]
+"""
+
+import sys
+import time
+
+from catan.core.game import Game
+from catan.core.models.actions import generate_playable_actions
+from catan.core.models.board import longest_acyclic_path
+from catan.core.models.coordinate_system import generate_coordinate_system
+from catan.core.models.map import CatanMap, build_map_template
+from catan.core.models.player import Color, RandomPlayer
+
+
+def _per_call_us(fn, items, repeat=3) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def _snapshots(catan_map: CatanMap, seed: int, every: int = 25):
+    game = Game([RandomPlayer(c) for c in Color], seed=seed, catan_map=catan_map)
+    snapshots = []
+    while game.winning_color() is None and game.state.num_turns < 1000:
+        game.play_tick()
+        if len(game.state.actions) % every == 0:
+            snapshots.append(game.state.copy())
+    snapshots.append(game.state.copy())
+    return snapshots
+
+
+def _longest_roads(state):
+    board = state.board
+    for color in state.colors:
+        for component in board.find_connected_components(color):
+            longest_acyclic_path(board, component, color)
+
+
+def _buildable_edges(state):
+    board = state.board
+    for color in state.colors:
+        board.buildable_edges_cache = {}
+        board.buildable_edges(color)
+
+
+def main(max_layers: int = 8, seed: int = 0):
+    print(
+        f"{'layers':>6} {'tiles':>6} {'nodes':>6} {'edges':>6} "
+        f"{'movegen us':>11} {'edges us':>9} {'road us':>8}"
+    )
+    for layers in range(3, max_layers + 1):
+        catan_map = CatanMap.from_template(build_map_template(layers))
+        states = _snapshots(catan_map, seed)
+        movegen = _per_call_us(generate_playable_actions, states)
+        edges = _per_call_us(_buildable_edges, states)
+        roads = _per_call_us(_longest_roads, states)
+        print(
+            f"{layers:>6} {catan_map.num_tiles:>6} {catan_map.num_nodes:>6} "
+            f"{catan_map.num_edges:>6} {movegen:>11.1f} {edges:>9.1f} {roads:>8.1f}"
+        )
+
+    for layers in (10, 30, 100):
+        start = time.perf_counter()
+        generate_coordinate_system(layers)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"generate_coordinate_system({layers}): {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
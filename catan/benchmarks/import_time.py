@@ -0,0 +1,91 @@
+"""
+Import-time report (from `python -X importtime`), to guard startup regressions.
+
+Imports each module in a fresh interpreter a few times, keeps the fastest
+run and prints its total, the slowest imports by self time and which heavy
+dependencies got pulled in. Exits with status 1 if a module goes over its
+budget or pulls in a heavy dependency it must not.
+
+Usage:
+    python -m catan.benchmarks.import_time [module ...] [--runs N]
+        [--budget-ms MS] [--top K]
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["catan.core", "catan.bots.mcts"]
+# Budgets (ms) checked when --budget-ms isn't given
+BUDGETS_MS = {"catan.core": 100, "catan.bots.mcts": 120}
+HEAVY_DEPENDENCIES = ["networkx", "numpy", "sqlalchemy", "flask", "matplotlib"]
+# Modules that must not import any of HEAVY_DEPENDENCIES
+LIGHT_MODULES = ["catan.core", "catan.bots.mcts"]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) of each import in a fresh process"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report(module: str, runs: int, top: int) -> Tuple[float, List[str]]:
+    """Prints the report of module. Returns its import time in ms and the
+    heavy dependencies it imported."""
+    best = None
+    for _ in range(runs):
+        rows = import_times(module)
+        total = next(c for name, _, c in reversed(rows) if name == module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    assert best is not None
+    total, rows = best
+
+    loaded = {name.split(".")[0] for name, _, _ in rows}
+    heavy = [dependency for dependency in HEAVY_DEPENDENCIES if dependency in loaded]
+    print(f"{module}: {total / 1000:.1f} ms ({len(rows)} modules)")
+    print(f"  heavy dependencies: {', '.join(heavy) or 'none'}")
+    for name, self_us, _ in sorted(rows, key=lambda r: -r[1])[:top]:
+        print(f"  {self_us / 1000:7.2f} ms  {name}")
+    return total / 1000, heavy
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    budgets: Dict[str, float] = dict(BUDGETS_MS)
+    if args.budget_ms is not None:
+        budgets = {module: args.budget_ms for module in args.modules}
+
+    over = []
+    for module in args.modules:
+        elapsed, heavy = report(module, args.runs, args.top)
+        budget = budgets.get(module)
+        if budget is not None and elapsed > budget:
+            over.append(f"{module} took {elapsed:.1f} ms (budget {budget:.0f} ms)")
+        if module in LIGHT_MODULES and heavy:
+            over.append(f"{module} imported {', '.join(heavy)}")
+    for message in over:
+        print(f"OVER BUDGET: {message}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
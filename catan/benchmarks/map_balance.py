@@ -0,0 +1,35 @@
+"""
+Acceptance rate and speed of balanced-map generation.
+
+Generates maps with MapBalancer (default BalanceCriteria) until the
+requested number is accepted, and reports the acceptance rate and how many
+maps per second are sampled and scored, and accepted.
+
+Usage:
+    python -m catan.benchmarks.map_balance [--maps N] [--seed S]
+"""
+
+import argparse
+
+from catan.core.map_balance import MapBalancer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--maps", type=int, default=1000, help="maps to accept")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    balancer = MapBalancer(seed=args.seed)
+    balancer.generate(args.maps)
+    print(f"{balancer.criteria}")
+    print(
+        f"accepted {balancer.accepted:,} of {balancer.sampled:,} "
+        f"({balancer.accepted / balancer.sampled:.2%})"
+    )
+    print(f"{balancer.maps_per_second:,.0f} maps/s sampled and scored")
+    print(f"{balancer.accepted / balancer.elapsed:,.0f} accepted maps/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Speed of building maps one by one versus drawing them from a MapPool.
+
+Times CatanMap.from_template, generating a pool of random maps at once,
+saving it and opening it memory-mapped, and drawing (rebuilding) maps from
+the opened pool.
+
+Usage:
+    python -m catan.benchmarks.map_pool [--size N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from catan.core.map_pool import MapPool
+from catan.core.models.map import BASE_MAP_TEMPLATE, CatanMap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=10_000, help="maps in the pool")
+    args = parser.parse_args(argv)
+    size = args.size
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        CatanMap.from_template(BASE_MAP_TEMPLATE)
+    print(f"from_template: {1000 / (time.perf_counter() - start):,.0f} maps/s")
+
+    start = time.perf_counter()
+    pool = MapPool.generate(size, seed=0)
+    print(f"generate: {size / (time.perf_counter() - start):,.0f} maps/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "maps.npy")
+        pool.save(path)
+        print(f"file size: {os.path.getsize(path) / size:.0f} bytes/map")
+        start = time.perf_counter()
+        pool = MapPool.load(path)
+        print(f"load: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            pool[i % len(pool)]
+        print(f"draw: {1000 / (time.perf_counter() - start):,.0f} maps/s")
+        del pool  # release the memory map before removing the file
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory and speed of MCTS trees for different state cache sizes.
+
+Searches positions sampled from seeded random games and reports, per cache
+size (see StateCache), tree nodes created per second, memory retained by
+the tree per node (measured with tracemalloc, in a separate run) and how
+often states had to be replayed. A cache as big as the tree keeps every
+node's state, as trees did before states were materialized on demand.
+
+"Reused" is the memory still retained per node once the most visited child
+is detached to be reused (as MCTSBot does with the subtree of the position
+reached) and the rest of the tree dropped.
+
+Usage:
+    python -m catan.benchmarks.mcts_memory [--positions N] [--simulations S]
+        [--cache-sizes 1 256 ...]
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Iterator
+
+from catan.benchmarks.mcts_parallel import sample_positions
+from catan.bots.mcts import MCTSNode
+from catan.core.game import Game
+
+
+def iter_nodes(root: MCTSNode) -> Iterator[MCTSNode]:
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+def search(game: Game, n_simulations: int, cache_size: int, seed: int) -> MCTSNode:
+    random.seed(seed)
+    root = MCTSNode(
+        game=game.copy(), color=game.state.current_color(), cache_size=cache_size
+    )
+    root.run_playouts(n_simulations)
+    return root
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--positions", type=int, default=5)
+    parser.add_argument("--simulations", type=int, default=300)
+    parser.add_argument(
+        "--cache-sizes", type=int, nargs="+", default=[1, 16, 64, 100_000]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    positions = sample_positions(args.positions, args.seed)
+    print(f"{len(positions)} positions, {args.simulations} simulations each")
+    print(
+        f"{'cache':>7} {'nodes':>7} {'nodes/s':>8} {'bytes/node':>11} "
+        f"{'replays':>8} {'actions/replay':>15} {'reused':>7}"
+    )
+    for cache_size in args.cache_sizes:
+        nodes = replays = replayed_actions = 0
+        seconds = 0.0
+        for i, game in enumerate(positions):
+            start = time.perf_counter()
+            root = search(game, args.simulations, cache_size, args.seed + i)
+            seconds += time.perf_counter() - start
+            nodes += sum(1 for _ in iter_nodes(root))
+            replays += root.cache.replays
+            replayed_actions += root.cache.replayed_actions
+            del root
+
+        # same searches again (same seeds, same trees), measuring memory
+        retained = reused = reused_nodes = 0
+        for i, game in enumerate(positions):
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            root = search(game, args.simulations, cache_size, args.seed + i)
+            gc.collect()
+            retained += tracemalloc.get_traced_memory()[0] - before
+
+            subtree = max(root.children, key=lambda child: child.visits)
+            subtree.detach()
+            del root
+            gc.collect()
+            reused += tracemalloc.get_traced_memory()[0] - before
+            reused_nodes += sum(1 for _ in iter_nodes(subtree))
+            tracemalloc.stop()
+            del subtree
+
+        print(
+            f"{cache_size:>7} {nodes:>7} {nodes / seconds:>8.0f} "
+            f"{retained / nodes:>11.0f} {replays:>8} "
+            f"{replayed_actions / max(replays, 1):>15.1f} "
+            f"{reused / reused_nodes:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Decision quality versus wall time of parallel MCTS.
+
+Samples positions from seeded random games, finds a reference action for
+each with a long serial search, then for growing numbers of workers K runs
+root-parallel and leaf-parallel searches with K times the base budget (i.e.
+the same budget per worker) and reports wall time per decision and how often
+the chosen action matches the reference. The serial search with the base
+budget is the K = 1 row. For each leaf-parallel row, a serial search with as
+many simulations as fit in the same wall time ("serial (same time)") shows
+whether parallelism pays for its overhead.
+
+Usage:
+    python -m catan.benchmarks.mcts_parallel [--positions N] [--simulations S]
+        [--reference R] [--workers 1 2 4 ...] [--batch-size B]
+        [--virtual-loss V]
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+from catan.bots.mcts import LeafParallelMCTS, MCTSNode, RootParallelMCTS
+from catan.core.game import Game
+from catan.core.models.enums import Action
+from catan.core.models.player import Color, RandomPlayer
+
+
+def sample_positions(count: int, seed: int = 0) -> List[Game]:
+    """Positions (with a real choice to make) from random 4-player games."""
+    rng = random.Random(seed)
+    positions = []
+    game_seed = seed
+    while len(positions) < count:
+        game = Game([RandomPlayer(c) for c in list(Color)[:4]], seed=game_seed)
+        game_seed += 1
+        while not game.finished() and len(positions) < count:
+            if len(game.state.playable_actions) >= 3 and rng.random() < 0.02:
+                positions.append(game.copy())
+            game.play_tick()
+    return positions
+
+
+def serial_search(game: Game, n_simulations: int) -> Action:
+    root = MCTSNode(game=game.copy(), color=game.state.current_color())
+    root.run_playouts(n_simulations)
+    return root.find_best_action()
+
+
+def leaf_parallel_search(
+    search: LeafParallelMCTS, game: Game, n_simulations: int
+) -> Action:
+    root = MCTSNode(game=game.copy(), color=game.state.current_color())
+    search.run(root, n_simulations)
+    return root.find_best_action()
+
+
+def evaluate(
+    positions: List[Game], references: List[Action], decide: Callable[[Game], Action]
+) -> Tuple[float, float]:
+    """(seconds per decision, fraction of decisions matching the reference)"""
+    matches = 0
+    start = time.perf_counter()
+    for game, reference in zip(positions, references):
+        matches += decide(game) == reference
+    elapsed = time.perf_counter() - start
+    return elapsed / len(positions), matches / len(positions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--simulations", type=int, default=50)
+    parser.add_argument("--reference", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--virtual-loss", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    positions = sample_positions(args.positions, args.seed)
+    references = [serial_search(game, args.reference) for game in positions]
+    print(f"{len(positions)} positions, reference: {args.reference} simulations")
+    print(f"{'mode':<19} {'K':>3} {'sims':>6} {'ms/decision':>12} {'agreement':>10}")
+
+    def report(mode: str, workers: int, n_simulations: int, seconds, agreement):
+        print(
+            f"{mode:<19} {workers:>3} {n_simulations:>6} {seconds * 1000:>12.1f} "
+            f"{agreement:>10.0%}"
+        )
+
+    serial_seconds, agreement = evaluate(
+        positions, references, lambda g: serial_search(g, args.simulations)
+    )
+    report("serial", 1, args.simulations, serial_seconds, agreement)
+    for workers in args.workers:
+        if workers == 1:
+            continue
+        n_simulations = args.simulations * workers
+        root_search = RootParallelMCTS(workers)
+
+        def decide(game: Game) -> Action:
+            color = game.state.current_color()
+            stats = root_search.search(game, color, n_simulations)
+            return max(stats, key=lambda action: stats[action][0])
+
+        decide(positions[0])  # warm up the pool
+        seconds, agreement = evaluate(positions, references, decide)
+        report("root-parallel", workers, n_simulations, seconds, agreement)
+        root_search.close()
+
+        leaf_search = LeafParallelMCTS(workers, args.batch_size, args.virtual_loss)
+        leaf_parallel_search(leaf_search, positions[0], workers)  # warm up
+        seconds, agreement = evaluate(
+            positions,
+            references,
+            lambda g: leaf_parallel_search(leaf_search, g, n_simulations),
+        )
+        report("leaf-parallel", workers, n_simulations, seconds, agreement)
+        leaf_search.close()
+
+        # serial search given the leaf-parallel search's time
+        same_time = max(1, round(args.simulations * seconds / serial_seconds))
+        report(
+            "serial (same time)",
+            1,
+            same_time,
+            *evaluate(positions, references, lambda g: serial_search(g, same_time)),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cheap evaluation of RolloutState positions, as win probabilities.
+
+Each player gets a score, linear in a few features of its position (see
+FEATURES), and win probabilities are the softmax of the scores (a
+conditional logit model). Weights are fitted to completed games by
+catan.analysis.calibrate_evaluation, e.g. to score MCTS playouts truncated
+after a few turns (see MCTSNode's rollout_turns).
+"""
+
+import functools
+import json
+import math
+from typing import List, Optional, Sequence
+
+from catan.core.models.player import Color
+from catan.core.rollout import RolloutState, RolloutTopology
+
+FEATURES = (
+    "victory_points",  # actual ones (with hidden victory point cards)
+    "production",  # expected resource cards per roll (pips / 36)
+    "development_cards",  # in hand
+    "road_length",  # longest road
+    "knights_played",
+    "hand_size",  # resource cards
+)
+
+# fitted by catan.analysis.calibrate_evaluation --games 2000 --every 5 (2-4
+# players; held-out log loss 0.795, against 0.835 with victory points only)
+DEFAULT_WEIGHTS = (0.0953, 2.3461, 0.3918, 0.1873, 0.2659, -0.0300)
+
+
+@functools.lru_cache(maxsize=16)
+def _tile_pips(topology: RolloutTopology) -> List[int]:
+    """Land tile index => pips of its number (ways to roll it, of 36)."""
+    pips = [0] * len(topology.tile_nodes)
+    for number, tiles in topology.number_tiles.items():
+        for tile in tiles:
+            pips[tile] = 6 - abs(7 - number)
+    return pips
+
+
+def position_features(state: RolloutState) -> List[List[float]]:
+    """Features (as FEATURES) of each player, by seating index."""
+    pips = _tile_pips(state.topology)
+    production = [0.0] * state.num_players
+    for tile, weights in enumerate(state.tile_weights):
+        if tile == state.robber_tile or not pips[tile]:
+            continue
+        for player, weight in enumerate(weights):
+            production[player] += pips[tile] * weight / 36
+    return [
+        [
+            state.actual_victory_points[player],
+            production[player],
+            sum(state.dev_hands[player]),
+            state.road_lengths[player],
+            state.knights_played[player],
+            sum(state.hands[player]),
+        ]
+        for player in range(state.num_players)
+    ]
+
+
+class Evaluator:
+    """Win probabilities of RolloutState positions.
+
+    Example:
+        evaluator = Evaluator.load("evaluation.json")  # or Evaluator()
+        evaluator.win_probability(RolloutState.from_game(game), Color.RED)
+    """
+
+    def __init__(self, weights: Optional[Sequence[float]] = None):
+        """
+        Args:
+            weights (Sequence[float], optional): one per feature (see
+                FEATURES). Defaults to DEFAULT_WEIGHTS.
+        """
+        weights = DEFAULT_WEIGHTS if weights is None else weights
+        if len(weights) != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} weights, got {len(weights)}")
+        self.weights = [float(weight) for weight in weights]
+
+    def win_probabilities(self, state: RolloutState) -> List[float]:
+        """Win probability of each player, by seating index."""
+        scores = [
+            sum(w * x for w, x in zip(self.weights, features))
+            for features in position_features(state)
+        ]
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def win_probability(self, state: RolloutState, color: Color) -> float:
+        return self.win_probabilities(state)[state.colors.index(color)]
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump({"features": FEATURES, "weights": self.weights}, file, indent=2)
+
+    @staticmethod
+    def load(path: str) -> "Evaluator":
+        with open(path) as file:
+            data = json.load(file)
+        if tuple(data["features"]) != FEATURES:
+            raise ValueError(
+                f"{path} has weights for other features: {data['features']}"
+            )
+        return Evaluator(data["weights"])
@@ -1,7 +1,8 @@
 import random
 from typing import List
+
 from catan.core.game import Game
-from catan.core.models.enums import BRICK, WOOD, Action, ActionType
+from catan.core.models.enums import BRICK, RESOURCES, WOOD, Action, ActionType
 from catan.core.models.map import NodeId
 from catan.core.models.player import Color
 
@@ -13,22 +14,16 @@ def player_has_resource(game: Game, player_color: Color, resource=None):
     buildings = game.state.buildings_by_color[player_color]
     nodes = buildings["SETTLEMENT"] + buildings["CITY"]
 
-    for node in nodes:
-        adj_tiles = game.state.board.map.adjacent_tiles[node]
-        for adj_tile in adj_tiles:
-            if adj_tile.resource == resource:
-                return True
-
-    return False
+    production = game.state.board.map.compile().node_production
+    return bool(production[nodes, RESOURCES.index(resource)].any())
 
 
 def node_has_resource(game: Game, node: NodeId, resource=None):
     if resource is None:
         return True
 
-    prods = game.state.board.map.node_production
-
-    return resource in prods[node].keys()
+    production = game.state.board.map.compile().node_production
+    return bool(production[node, RESOURCES.index(resource)] > 0)
 
 
 def yield_n_and_with_resource(
@@ -36,16 +31,17 @@ def yield_n_and_with_resource(
     n_yields: int,
     wanted_resource=None,
 ):
-    def filter_fn(prod):
-        return len(prod[1]) >= n_yields and node_has_resource(
-            game, prod[0], wanted_resource
-        )
-
-    return filter_fn
+    """Returns the set of nodes producing at least n_yields distinct
+    resources (one of them wanted_resource, if given)."""
+    production = game.state.board.map.compile().node_production
+    mask = (production > 0).sum(axis=1) >= n_yields
+    if wanted_resource is not None:
+        mask &= production[:, RESOURCES.index(wanted_resource)] > 0
+    return set(mask.nonzero()[0].tolist())
 
 
 def sort_by_yield_chance(action: Action, game: Game):
-    return sum(game.state.board.map.node_production[action.value].values())
+    return float(game.state.board.map.compile().node_production[action.value].sum())
 
 
 def best_settlement_build_actions(
@@ -53,8 +49,6 @@ def best_settlement_build_actions(
 ):
     random.shuffle(possible_actions)
 
-    prods = game.state.board.map.node_production.items()
-
     needed_resource = None
 
     if not player_has_resource(game, player_color, BRICK):
@@ -62,8 +56,7 @@ def best_settlement_build_actions(
     elif not player_has_resource(game, player_color, WOOD):
         needed_resource = WOOD
 
-    filter_1 = yield_n_and_with_resource(game, 3, needed_resource)
-    yield_3_nodes = [n[0] for n in filter(filter_1, prods)]
+    yield_3_nodes = yield_n_and_with_resource(game, 3, needed_resource)
     possible_3_yield_nodes = list(
         filter(lambda action: action.value in yield_3_nodes, possible_actions)
     )
@@ -74,8 +67,7 @@ def best_settlement_build_actions(
     if len(possible_3_yield_nodes) != 0:
         return possible_3_yield_nodes[0:3]
 
-    filter_2 = yield_n_and_with_resource(game, 2, needed_resource)
-    yield_2_nodes = [n[0] for n in filter(filter_2, prods)]
+    yield_2_nodes = yield_n_and_with_resource(game, 2, needed_resource)
     possible_2_yield_nodes = list(
         filter(lambda action: action.value in yield_2_nodes, possible_actions)
     )
@@ -92,26 +84,19 @@ def best_settlement_build_actions(
 def best_robber_actions(
     game: Game, player_color: Color, playable_actions: List[Action], n=5
 ):
-    opponent_colors = [p.color for p in game.state.players if p.color != player_color]
+    board = game.state.board
 
-    opponent_building_nodes = []
+    coordinate_to_tile = board.map.compile().coordinate_to_tile
 
-    for op_color in opponent_colors:
-        opponent_buildings = game.state.buildings_by_color[op_color]
-        opponent_building_nodes += (
-            opponent_buildings["SETTLEMENT"] + opponent_buildings["CITY"]
-        )
-
-    def buildings_on_tile(entry):
-        coords, tile = entry
-        tile_nodes = set(tile.nodes.values())
-
-        return len(tile_nodes.intersection(set(opponent_building_nodes)))
+    def opponent_production_on_tile(coordinate):
+        weights = board.tile_buildings[coordinate_to_tile[coordinate]]
+        return sum(w for color, w in weights.items() if color != player_color)
 
-    tiles = game.state.board.map.land_tiles.copy().items()
-    optimal_tiles = sorted(tiles, key=buildings_on_tile, reverse=True)
+    # Robber has to move, so its current tile is never an option.
+    coords = [c for c in board.map.land_tiles.keys() if c != board.robber_coordinate]
+    optimal_tiles = sorted(coords, key=opponent_production_on_tile, reverse=True)
 
-    optimal_tiles_coords = list(map(lambda a: a[0], optimal_tiles[0:n]))
+    optimal_tiles_coords = optimal_tiles[0:n]
 
     def is_optimal_action(action):
         return action.value[0] in optimal_tiles_coords
@@ -122,7 +107,7 @@ def best_robber_actions(
 def actions_heuristic(
     game, actions: List[Action], player_color: Color, trade_eps=0.1
 ) -> List[Action]:
-    action_types = map(lambda a: a.action_type, actions)
+    action_types = set(map(lambda a: a.action_type, actions))
 
     if ActionType.BUILD_SETTLEMENT in action_types:
         return best_settlement_build_actions(
@@ -130,6 +115,51 @@ def actions_heuristic(
         )
 
     if ActionType.MOVE_ROBBER in action_types:
-        return best_robber_actions(game, player_color, n=2)
+        return best_robber_actions(game, player_color, actions, n=2)
 
     return actions
+
+
+# base score of each action type when ordering candidate actions (see
+# action_score): building first, then dev cards, roads, trades and ending turn
+ACTION_TYPE_SCORES = {
+    ActionType.BUILD_CITY: 6,
+    ActionType.BUILD_SETTLEMENT: 5,
+    ActionType.PLAY_KNIGHT_CARD: 4,
+    ActionType.PLAY_MONOPOLY: 4,
+    ActionType.PLAY_YEAR_OF_PLENTY: 4,
+    ActionType.PLAY_ROAD_BUILDING: 4,
+    ActionType.BUY_DEVELOPMENT_CARD: 3,
+    ActionType.BUILD_ROAD: 2,
+    ActionType.MOVE_ROBBER: 2,
+    ActionType.ROLL: 1,
+    ActionType.DISCARD: 1,
+    ActionType.MARITIME_TRADE: 1,
+    ActionType.END_TURN: 0,
+}
+
+
+def action_score(game: Game, action: Action) -> float:
+    """Fast a priori score of action: its type's ACTION_TYPE_SCORES plus, in
+    [0, 1), how good it is among actions of its type (production of the
+    node built on or reached, opponents' buildings on the robber's tile)."""
+    score = ACTION_TYPE_SCORES.get(action.action_type, 0)
+    action_type = action.action_type
+    if action_type in (ActionType.BUILD_SETTLEMENT, ActionType.BUILD_CITY):
+        production = game.state.board.map.compile().node_production
+        score += float(production[action.value].sum())
+    elif action_type == ActionType.BUILD_ROAD:
+        production = game.state.board.map.compile().node_production
+        score += float(production[list(action.value)].sum(axis=1).max())
+    elif action_type == ActionType.MOVE_ROBBER:
+        board = game.state.board
+        tile = board.map.compile().coordinate_to_tile[action.value[0]]
+        weights = board.tile_buildings[tile]
+        blocked = sum(w for color, w in weights.items() if color != action.color)
+        score += blocked / (blocked + 1)
+    return score
+
+
+def order_actions(game: Game, actions: List[Action]) -> List[Action]:
+    """Actions sorted by action_score, best last (as MCTSNode pops them)."""
+    return sorted(actions, key=lambda action: action_score(game, action))
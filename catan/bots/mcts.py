@@ -1,14 +1,22 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+import itertools
 import math
+import multiprocessing
+import os
+import pickle
 import random
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
 
-import numpy as np
-
-from catan.bots.heuristics import actions_heuristic
-from catan.core.game import Game
+from catan.bots.evaluation import Evaluator
+from catan.bots.heuristics import actions_heuristic, order_actions
+from catan.core.game import TURNS_LIMIT, Game
+from catan.core.rollout import RolloutState
 from catan.core.models.enums import Action, ActionType
-from catan.core.models.player import Color
+from catan.core.models.player import Color, Player
+
+if TYPE_CHECKING:  # numpy is only imported once a node expands
+    import numpy as np
 
 DEFAULT_REWARDS_MAP = {
     ActionType.BUILD_CITY: 10,
@@ -19,6 +27,13 @@ DEFAULT_REWARDS_MAP = {
     ActionType.PLAY_KNIGHT_CARD: 0.5,
 }
 
+# game states kept per tree (besides the root's), see StateCache
+DEFAULT_CACHE_SIZE = 64
+# children from which MCTSNode.select_child scores them with NumPy
+VECTORIZE_MIN_CHILDREN = 32
+# positions kept by a TranspositionTable
+DEFAULT_TABLE_CAPACITY = 20_000
+
 
 def map_action_to_reward(
     action: Action, game: Game, color: Color, catan_weights
@@ -36,7 +51,140 @@ def map_action_to_reward(
     return catan_weights[action.action_type]
 
 
+def replay_action(game: Game, action: Action, outcome: Action):
+    """Executes action again, with the chance outcome it had (as logged)."""
+    # drawing a development card pops the same card again, while executing
+    # the outcome would draw it from elsewhere in the deck
+    if action.action_type == ActionType.BUY_DEVELOPMENT_CARD:
+        game.execute(action, validate_action=False)
+    else:
+        game.execute(outcome, validate_action=False)
+
+
+class Playout:
+    """How the playouts of a search are played and valued (shared by its
+    nodes).
+
+    Playouts are weighted random games on the rollout engine, to the end or,
+    with turns, for that many turns only: the position reached is then
+    valued by the evaluator (see catan.bots.evaluation).
+    """
+
+    def __init__(
+        self,
+        weights,
+        turns: Optional[int] = None,
+        evaluator: Optional[Evaluator] = None,
+    ):
+        """
+        Args:
+            weights (Mapping[ActionType, float]): See RolloutState.play
+            turns (int, optional): turns to play before evaluating. None
+                plays to the end (the default).
+            evaluator (Evaluator, optional): values truncated playouts.
+                Defaults to Evaluator() (its default weights).
+        """
+        if turns is not None and turns < 1:
+            raise ValueError("turns must be at least 1")
+        self.weights = dict(weights)
+        self.turns = turns
+        self.evaluator = evaluator or Evaluator()
+
+    def value(
+        self, state: RolloutState, color: Color, deadline: Optional[float] = None
+    ) -> Optional[float]:
+        """Plays out state (mutating it). Returns 1 if color won and 0 if not
+        (or the game hit TURNS_LIMIT), or, if truncated after turns, the
+        evaluator's win probability of color. None if cut short by deadline
+        (the playout has no value)."""
+        limit = TURNS_LIMIT
+        if self.turns is not None:
+            limit = min(limit, state.num_turns + self.turns)
+        winner = state.play(self.weights, limit, deadline)
+        if winner is not None:
+            return 1.0 if winner == color else 0.0
+        if state.num_turns < limit:
+            return None  # stopped by the deadline
+        if limit < TURNS_LIMIT:
+            return self.evaluator.win_probability(state, color)
+        return 0.0
+
+
+class StateCache:
+    """Bounded LRU cache of the game states of MCTS nodes (shared by the
+    nodes of a tree). States not cached are replayed (see MCTSNode.game).
+
+    Attributes:
+        capacity (int): states kept at most
+        hits (int): lookups of cached states
+        replays (int): states materialized by replaying
+        replayed_actions (int): actions executed by those replays
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.states: "OrderedDict[MCTSNode, Game]" = OrderedDict()
+        self.hits = 0
+        self.replays = 0
+        self.replayed_actions = 0
+
+    def get(self, node: "MCTSNode") -> Optional[Game]:
+        game = self.states.get(node)
+        if game is not None:
+            self.states.move_to_end(node)
+            self.hits += 1
+        return game
+
+    def put(self, node: "MCTSNode", game: Game):
+        self.states[node] = game
+        self.states.move_to_end(node)
+        if len(self.states) > self.capacity:
+            self.states.popitem(last=False)
+
+
 class MCTSNode:
+    """Search tree node. Only the root keeps its Game: the state of other
+    nodes is materialized on demand (see .game), by replaying the actions
+    from the nearest ancestor with a cached state, so nodes take a few
+    hundred bytes and expanding doesn't copy more games than it needs.
+
+    The statistics of a node's children are kept in its NumPy arrays
+    (child_visits, child_rewards, child_virtual_visits; indexed by
+    child.index), to select children with one vectorized UCB1 argmax. The
+    visits/reward properties of a node read its parent's arrays (or its own
+    fields for the root).
+
+    With progressive widening, a node's untried actions are ordered by
+    action_score (best tried first) and it only expands up to
+    ceil(widening * (visits + 1) ** widening_exponent) children, so small
+    budgets aren't spread over every action of high-branching nodes.
+    """
+
+    __slots__ = (
+        "_game",
+        "cache",
+        "parent",
+        "action",
+        "outcome",
+        "color",
+        "children",
+        "index",
+        "child_visits",
+        "child_rewards",
+        "child_virtual_visits",
+        "_visits",
+        "_reward",
+        "_virtual_visits",
+        "untried_actions",
+        "catan_weights",
+        "playout",
+        "widening",
+        "current_color",
+        "terminal",
+    )
+
     def __init__(
         self,
         game: Game,
@@ -44,33 +192,152 @@ class MCTSNode:
         parent: Optional["MCTSNode"] = None,
         action=None,
         rewards_map=DEFAULT_REWARDS_MAP,
+        outcome=None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        rollout_turns: Optional[int] = None,
+        evaluator: Optional[Evaluator] = None,
+        widening: Optional[float] = None,
+        widening_exponent: float = 0.5,
     ):
-        self.game: Game = game
+        """
+        Args:
+            game (Game): state of the node (owned by the node from now on)
+            color (Color): color searched for
+            parent (MCTSNode, optional): None for the root.
+            action (Action, optional): action from the parent.
+            rewards_map (Dict[ActionType, float], optional): reward weights
+                (for the root; children share the root's).
+            outcome (Action, optional): action as executed from the parent.
+            cache_size (int, optional): states cached for the tree (for the
+                root). Defaults to DEFAULT_CACHE_SIZE.
+            rollout_turns (int, optional): truncate playouts after this many
+                turns, valuing them with evaluator (for the root; see
+                Playout). None plays them to the end (the default).
+            evaluator (Evaluator, optional): See Playout.
+            widening (float, optional): progressive widening constant (for
+                the root). Defaults to None (no widening: every action can
+                be expanded, in no particular order).
+            widening_exponent (float, optional): progressive widening
+                exponent (for the root). Defaults to 0.5.
+        """
         self.parent = parent
         self.action: Action = action
+        # action as executed, with its chance outcome (e.g. dice of a ROLL)
+        self.outcome: Optional[Action] = outcome
         self.color = color
         self.children: List["MCTSNode"] = []
-        self.reward = 0
-        self.visits = 0
-        self.untried_actions = self.game.state.playable_actions.copy()
-        self.catan_weights = defaultdict(
-            lambda: 1,
-            rewards_map,
-        )
+        self.index = len(parent.children) if parent is not None else 0
+        self.child_visits: Optional["np.ndarray"] = None  # allocated on expand
+        self.child_rewards: Optional["np.ndarray"] = None
+        # visits of rollouts still running (virtual loss), see run_batched_playouts
+        self.child_virtual_visits: Optional["np.ndarray"] = None
+        self._visits = 0
+        self._reward = 0
+        self._virtual_visits = 0
+        if parent is None:
+            self._game: Optional[Game] = game
+            self.cache = StateCache(cache_size)
+            self.catan_weights = defaultdict(lambda: 1, rewards_map)
+            self.playout = Playout(self.catan_weights, rollout_turns, evaluator)
+            if widening is not None and widening <= 0:
+                raise ValueError("widening must be positive")
+            self.widening = None if widening is None else (widening, widening_exponent)
+        else:
+            self._game = None
+            self.cache = parent.cache
+            self.catan_weights = parent.catan_weights
+            self.playout = parent.playout
+            self.widening = parent.widening
+            self.cache.put(self, game)
 
         self.untried_actions = actions_heuristic(
-            game=self.game, actions=self.untried_actions, player_color=self.color
+            game=game,
+            actions=game.state.playable_actions.copy(),
+            player_color=self.color,
         )
+        if self.widening is not None:
+            self.untried_actions = order_actions(game, self.untried_actions)
         self.current_color: Color = game.state.current_color()
+        self.terminal = game.finished()
+
+    @property
+    def game(self) -> Game:
+        """Game state at this node. Don't modify it (copy() it instead)."""
+        if self._game is not None:
+            return self._game
+        game = self.cache.get(self)
+        if game is None:
+            game = self._replay()
+        return game
+
+    def _replay(self) -> Game:
+        path = []
+        node = self
+        game = None
+        while game is None:
+            path.append(node)
+            node = node.parent
+            game = node._game if node._game is not None else node.cache.get(node)
+
+        game = game.copy()
+        for node in reversed(path):
+            replay_action(game, node.action, node.outcome)
+        self.cache.replays += 1
+        self.cache.replayed_actions += len(path)
+        self.cache.put(self, game)
+        return game
+
+    def detach(self):
+        """Makes this node the root of its own tree (e.g. to reuse it).
+        States cached for nodes out of the new tree are dropped: through
+        their parents, they would keep the rest of the old tree alive."""
+        self._game = self.game
+        self.cache.states.pop(self, None)
+        self._visits = self.visits
+        self._reward = self.reward
+        self._virtual_visits = self.virtual_visits
+        self.parent = None
+        for node in list(self.cache.states):
+            ancestor = node.parent
+            while ancestor is not None and ancestor is not self:
+                ancestor = ancestor.parent
+            if ancestor is None:
+                del self.cache.states[node]
+
+    @property
+    def visits(self) -> int:
+        if self.parent is None:
+            return self._visits
+        return int(self.parent.child_visits[self.index])
+
+    @property
+    def reward(self) -> float:
+        if self.parent is None:
+            return self._reward
+        return float(self.parent.child_rewards[self.index])
+
+    @reward.setter
+    def reward(self, value: float):
+        if self.parent is None:
+            self._reward = value
+        else:
+            self.parent.child_rewards[self.index] = value
+
+    @property
+    def virtual_visits(self) -> float:
+        if self.parent is None:
+            return self._virtual_visits
+        return float(self.parent.child_virtual_visits[self.index])
 
     def ucb1_score(self, exploration_const=1.4):
         if self.visits == 0:
             return float("inf")
 
         # UCB1 = (wins / visits) + C * sqrt(log(parent_visits) / visits)
-        exploitation_term = self.reward / self.visits
+        visits = self.visits + self.virtual_visits
+        exploitation_term = self.reward / visits
         exploration_term = exploration_const * math.sqrt(
-            math.log(self.parent.visits) / self.visits
+            math.log(self.parent.visits + self.parent.virtual_visits) / visits
         )
 
         return exploitation_term + exploration_term
@@ -78,15 +345,64 @@ class MCTSNode:
     def is_fully_expanded(self):
         return len(self.untried_actions) == 0
 
+    def can_expand(self) -> bool:
+        """Whether to expand rather than select among the children: if
+        there are untried actions and, with progressive widening, fewer
+        children than the node's visits allow."""
+        if not self.untried_actions:
+            return False
+        if self.widening is None:
+            return True
+        const, exponent = self.widening
+        allowed = math.ceil(const * (self.visits + 1) ** exponent)
+        return len(self.children) < allowed
+
     def is_terminal_node(self):
-        return self.game.finished()
+        return self.terminal
 
-    def select_child(self):
-        """Selects child with the highest UCB1 score."""
+    def select_child(self, exploration_const=1.4):
+        """Selects child with the highest UCB1 score (the first one, if
+        tied). Same scores as ucb1_score, computed for all children at once."""
         if not self.children:
             return None
 
-        return max(self.children, key=lambda child: child.ucb1_score())
+        n = len(self.children)
+        if n == 1:
+            return self.children[0]
+        log_parent_visits = math.log(self.visits + self.virtual_visits)
+        if n < VECTORIZE_MIN_CHILDREN:  # NumPy's overhead isn't worth it
+            best, best_score = 0, -math.inf
+            stats = zip(
+                self.child_visits[:n].tolist(),
+                self.child_virtual_visits[:n].tolist(),
+                self.child_rewards[:n].tolist(),
+            )
+            for i, (real_visits, virtual_visits, reward) in enumerate(stats):
+                if real_visits == 0:
+                    return self.children[i]  # scores inf
+                visits = real_visits + virtual_visits
+                score = reward / visits + exploration_const * math.sqrt(
+                    log_parent_visits / visits
+                )
+                if score > best_score:
+                    best, best_score = i, score
+            return self.children[best]
+
+        import numpy as np
+
+        real_visits = self.child_visits[:n]
+        visits = real_visits + self.child_virtual_visits[:n]
+        if real_visits.all():
+            scores = self.child_rewards[:n] / visits + exploration_const * np.sqrt(
+                log_parent_visits / visits
+            )
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = self.child_rewards[:n] / visits + exploration_const * np.sqrt(
+                    log_parent_visits / visits
+                )
+            scores[real_visits == 0] = np.inf
+        return self.children[int(np.argmax(scores))]
 
     def expand(self):
         """Expands the node by creating one child node for an untried move."""
@@ -95,69 +411,185 @@ class MCTSNode:
 
         next_action = self.untried_actions.pop()
         next_game = self.game.copy()
-        next_game.execute(next_action)
+        outcome = next_game.execute(next_action)
+
+        capacity = len(self.children) + len(self.untried_actions) + 1
+        if self.child_visits is None or len(self.child_visits) < capacity:
+            self._grow_child_arrays(capacity)
 
         child_node = MCTSNode(
-            game=next_game, parent=self, action=next_action, color=self.color
+            game=next_game,
+            parent=self,
+            action=next_action,
+            color=self.color,
+            outcome=outcome,
         )
         self.children.append(child_node)
 
         return child_node
 
-    def weighted_decide(self, player, game, playable_actions: List[Action]):
-        weights = []
-        action_indices = []
+    def _grow_child_arrays(self, capacity: int):
+        import numpy as np
+
+        n = len(self.children)
+        for name in ("child_visits", "child_rewards", "child_virtual_visits"):
+            array = np.zeros(capacity)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
 
-        for idx, action in enumerate(playable_actions):
-            reward = self.catan_weights[action.action_type]
-            weights.append(reward)
-            action_indices.append(idx)
+    def weighted_decide(self, player, game, playable_actions: List[Action]):
+        weights = [self.catan_weights[a.action_type] for a in playable_actions]
+        return random.choices(playable_actions, weights=weights)[0]
 
-        total_weight = sum(weights)
-        probabilities = [w / total_weight for w in weights]
+    def simulate(self, deadline: Optional[float] = None) -> Optional[float]:
+        """Value of a playout from this node (see Playout.value)"""
+        state = RolloutState.from_game(self.game)
+        return self.playout.value(state, self.color, deadline)
 
-        rand_idx = np.random.choice(action_indices, p=probabilities)
+    def backpropagate(self, reward):
+        """Adds a visit with reward to this node and its ancestors."""
+        node = self
+        while node.parent is not None:
+            parent = node.parent
+            parent.child_visits[node.index] += 1
+            parent.child_rewards[node.index] += reward
+            node = parent
+        node._visits += 1
+        node._reward += reward
 
-        return playable_actions[rand_idx]
+    def select_leaf(self) -> "MCTSNode":
+        """Walks down by UCB1 and expands, returning the node to simulate."""
+        node = self
 
-    def simulate(self):
-        return self.game.copy().play(decide_fn=self.weighted_decide)
+        while not node.can_expand() and not node.is_terminal_node() and node.children:
+            node = node.select_child()
 
-    def backpropagate(self, reward):
-        self.visits += 1
-        self.reward += reward
+        if node.can_expand() and not node.is_terminal_node():
+            node = node.expand()
 
-        if self.parent:
-            self.parent.backpropagate(reward)
+        return node
 
-    def run_playouts(self, n_simulations: int):
-        for _ in range(n_simulations):
-            node = self
+    def playout_reward(self, node: "MCTSNode", value: float) -> float:
+        """Reward of a playout from node (of this root's search) of value
+        (1 for a win, 0 for a loss, or a win probability)."""
+        reward = 0
+        if self.current_color == self.color and value > 0:
+            reward = value
+            node.reward += value * map_action_to_reward(
+                node.action, self.game, self.current_color, self.catan_weights
+            )
+        return reward
 
-            while (
-                node.is_fully_expanded()
-                and not node.is_terminal_node()
-                and node.children
+    def run_playouts(self, n_simulations: int, deadline: Optional[float] = None) -> int:
+        """Runs n_simulations (selection, expansion, playout and
+        backpropagation). With a deadline (a time.perf_counter() time), the
+        playout running at the deadline is cut short and dropped, and no more
+        are run. Returns the number of simulations completed."""
+        for i in range(n_simulations):
+            node = self.select_leaf()
+            if deadline is not None and time.perf_counter() >= deadline:
+                return i  # expanded already, but too late to play out
+            value = node.simulate(deadline)
+            if value is None or (
+                deadline is not None and time.perf_counter() >= deadline
             ):
-                node = node.select_child()
+                return i
+            node.backpropagate(self.playout_reward(node, value))
+        return n_simulations
 
-            if not node.is_fully_expanded() and not node.is_terminal_node():
-                node = node.expand()
+    def run_batched_playouts(
+        self,
+        n_simulations: int,
+        simulate_batch: Callable[..., List[Optional[float]]],
+        batch_size: int = 8,
+        virtual_loss: float = 1.0,
+        deadline: Optional[float] = None,
+    ) -> int:
+        """Like run_playouts, but selects batch_size leaves at a time and
+        simulates them together (e.g. in parallel, see LeafParallelMCTS).
 
-            reward = 0
-            winner_color = node.simulate()
+        While a leaf's playout is pending, its path counts virtual_loss extra
+        visits without reward, so the next selections of the batch favor
+        other paths.
 
-            if self.current_color == self.color and winner_color == self.color:
-                reward = 1
-                node.reward += map_action_to_reward(
-                    node.action, self.game, self.current_color, self.catan_weights
-                )
+        Args:
+            n_simulations (int): simulations to run
+            simulate_batch (Callable): (nodes, deadline) => value of a
+                playout from each (see simulate), None for playouts cut
+                short by the deadline.
+            batch_size (int, optional): leaves per batch. Defaults to 8.
+            virtual_loss (float, optional): virtual visits per pending
+                playout. Defaults to 1.
+            deadline (float, optional): See run_playouts (a batch at the
+                deadline is dropped, and so are its playouts cut short).
 
-            node.backpropagate(reward)
+        Returns:
+            int: simulations completed
+        """
+        done = 0
+        while done < n_simulations:
+            leaves = []
+            for _ in range(min(batch_size, n_simulations - done)):
+                leaf = self.select_leaf()
+                leaf.add_virtual_visits(virtual_loss)
+                leaves.append(leaf)
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+
+            values = []
+            if deadline is None or time.perf_counter() < deadline:
+                values = simulate_batch(leaves, deadline)
+            for leaf in leaves:
+                leaf.add_virtual_visits(-virtual_loss)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            for leaf, value in zip(leaves, values):
+                if value is not None:
+                    leaf.backpropagate(self.playout_reward(leaf, value))
+                    done += 1
+            if None in values:
+                break  # the next batch would be cut short as well
+        return done
+
+    def add_virtual_visits(self, amount: float):
+        node = self
+        while node.parent is not None:
+            node.parent.child_virtual_visits[node.index] += amount
+            node = node.parent
+        node._virtual_visits += amount
+
+    def find_descendant(self, outcomes: Sequence[Action]) -> Optional["MCTSNode"]:
+        """Node reached by playing outcomes (executed actions, as logged by
+        the game) from this one, if the search explored it."""
+        node = self
+        for outcome in outcomes:
+            for child in node.children:
+                if child.outcome == outcome:
+                    node = child
+                    break
+            else:
+                return None
+        return node
+
+    def is_settled(self, remaining: float, confidence: Optional[float] = None) -> bool:
+        """Whether find_best_action is settled, whatever the next remaining
+        simulations do (see settled)."""
+        n = len(self.children)
+        return settled(
+            self.child_visits[:n].tolist() if n else [],
+            self.child_rewards[:n].tolist() if n else [],
+            bool(self.untried_actions),
+            remaining,
+            confidence,
+        )
 
     def find_best_action(self):
-        best_child = max(self.children, key=lambda child: child.visits)
-        return best_child.action
+        import numpy as np
+
+        # most visited child (the first one, if tied)
+        best = int(np.argmax(self.child_visits[: len(self.children)]))
+        return self.children[best].action
 
     def get_action_stats_recursive(self, stats: Dict[str, Tuple[int, float]]):
         for child in self.children:
@@ -177,3 +609,556 @@ class MCTSNode:
         all_action_type_stats: Dict[str, Tuple[int, float]] = {}
         self.get_action_stats_recursive(all_action_type_stats)
         return all_action_type_stats
+
+
+def position_key(game: Game) -> int:
+    """Hash of the position of game: the same for states that play the same
+    from now on, whatever the order of the actions that led to them."""
+    state = game.state
+    board = state.board
+    return hash(
+        (
+            tuple(state.player_state.values()),
+            frozenset(board.buildings.items()),
+            frozenset(board.roads.items()),
+            board.robber_coordinate,
+            board.road_color,
+            tuple(state.resource_freqdeck),
+            tuple(state.development_listdeck),
+            state.num_turns,
+            state.current_player_index,
+            state.current_turn_index,
+            state.current_prompt,
+            state.is_initial_build_phase,
+            state.is_discarding,
+            state.is_moving_knight,
+            state.is_road_building,
+            state.free_roads_available,
+        )
+    )
+
+
+class Edge:
+    """Move from a position (see Position), with its own statistics."""
+
+    __slots__ = ("action", "outcome", "key", "visits", "reward")
+
+    def __init__(self, action: Action, outcome: Action, key: int):
+        self.action = action
+        # action as executed, with its chance outcome (e.g. dice of a ROLL)
+        self.outcome = outcome
+        self.key = key  # of the position reached
+        self.visits = 0
+        self.reward = 0
+
+
+class Position:
+    """Statistics of a position, shared by every path reaching it."""
+
+    __slots__ = (
+        "visits",
+        "reward",
+        "untried_actions",
+        "edges",
+        "current_color",
+        "terminal",
+    )
+
+    def __init__(self, game: Game, color: Color):
+        self.visits = 0
+        self.reward = 0
+        self.untried_actions = actions_heuristic(
+            game=game, actions=game.state.playable_actions.copy(), player_color=color
+        )
+        self.edges: List[Edge] = []
+        self.current_color: Color = game.state.current_color()
+        self.terminal = game.finished()
+
+
+class TranspositionTable:
+    """Positions by key (see position_key), at most capacity of them.
+
+    When full, the policy picks the position to replace: "lru" replaces
+    the least recently used one; "visits" the least visited among the
+    least recently used few (keeping well explored positions longer).
+
+    Attributes:
+        transpositions (int): positions reached again by another path
+        evictions (int): positions replaced
+    """
+
+    POLICIES = ("lru", "visits")
+    VISITS_SAMPLE = 8
+
+    def __init__(self, capacity: int = DEFAULT_TABLE_CAPACITY, policy: str = "lru"):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.positions: "OrderedDict[int, Position]" = OrderedDict()
+        self.transpositions = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get(self, key: int) -> Optional[Position]:
+        """Position of key (marking it as used), None if not in the table."""
+        position = self.positions.get(key)
+        if position is not None:
+            self.positions.move_to_end(key)
+        return position
+
+    def put(self, key: int, position: Position):
+        if key not in self.positions and len(self.positions) >= self.capacity:
+            self._evict()
+        self.positions[key] = position
+        self.positions.move_to_end(key)
+
+    def _evict(self):
+        self.evictions += 1
+        if self.policy == "lru":
+            self.positions.popitem(last=False)
+            return
+        oldest = itertools.islice(self.positions.items(), self.VISITS_SAMPLE)
+        key, _ = min(oldest, key=lambda item: item[1].visits)
+        del self.positions[key]
+
+
+class TranspositionMCTS:
+    """MCTS over the graph of positions (a DAG) rather than a tree:
+    positions reached by different action orders (e.g. trading then
+    building, or building then trading) share one Position, with their
+    statistics, in a bounded TranspositionTable.
+
+    Selection uses UCT2 (Childs et al., 2008): exploitation from the shared
+    statistics of the position an edge leads to, exploration from the
+    edge's own visits. Backpropagation updates each position and edge of
+    the path taken, so positions count every simulation through them once.
+    The states of positions aren't kept: they are replayed from the root
+    along the path of each simulation.
+
+    Example:
+        search = TranspositionMCTS(game.copy(), color)
+        search.run_playouts(800)
+        best_action = search.find_best_action()
+    """
+
+    def __init__(
+        self,
+        game: Game,
+        color: Color,
+        table: Optional[TranspositionTable] = None,
+        rewards_map=DEFAULT_REWARDS_MAP,
+        exploration_const: float = 1.4,
+        rollout_turns: Optional[int] = None,
+        evaluator: Optional[Evaluator] = None,
+    ):
+        """
+        Args:
+            game (Game): root position (owned by the search from now on)
+            color (Color): color searched for
+            table (TranspositionTable, optional): e.g. one of an earlier
+                search of the same game, to reuse its statistics. Defaults
+                to a new table of DEFAULT_TABLE_CAPACITY positions.
+            rewards_map (Dict[ActionType, float], optional): reward weights.
+            exploration_const (float, optional): UCB1 constant.
+            rollout_turns (int, optional): See MCTSNode.
+            evaluator (Evaluator, optional): See MCTSNode.
+        """
+        self.game = game
+        self.color = color
+        self.table = table if table is not None else TranspositionTable()
+        self.catan_weights = defaultdict(lambda: 1, rewards_map)
+        self.playout = Playout(self.catan_weights, rollout_turns, evaluator)
+        self.exploration_const = exploration_const
+        self.root_key = position_key(game)
+        self.root = self.table.get(self.root_key)
+        if self.root is None:
+            self.root = Position(game, color)
+            self.table.put(self.root_key, self.root)
+
+    def _select_edge(self, position: Position) -> Edge:
+        log_visits = math.log(position.visits)
+        best, best_score = position.edges[0], -math.inf
+        for edge in position.edges:
+            if edge.visits == 0:
+                return edge
+            child = self.table.positions.get(edge.key)
+            if child is None or child.visits == 0:  # replaced: edge's own stats
+                exploitation = edge.reward / edge.visits
+            else:
+                exploitation = child.reward / child.visits
+            score = exploitation + self.exploration_const * math.sqrt(
+                log_visits / edge.visits
+            )
+            if score > best_score:
+                best, best_score = edge, score
+        return best
+
+    def run_playouts(self, n_simulations: int, deadline: Optional[float] = None) -> int:
+        """See MCTSNode.run_playouts"""
+        for i in range(n_simulations):
+            if not self._playout(deadline):
+                return i
+        return n_simulations
+
+    def _playout(self, deadline: Optional[float]) -> bool:
+        position = self.root
+        path = [position]
+        keys = {self.root_key}
+        edges: List[Edge] = []
+        game = self.game.copy()
+
+        while not position.untried_actions and not position.terminal and position.edges:
+            edge = self._select_edge(position)
+            if edge.key in keys:  # back to a position of the path
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            replay_action(game, edge.action, edge.outcome)
+            edges.append(edge)
+            keys.add(edge.key)
+            child = self.table.get(edge.key)
+            if child is None:  # replaced since: explore it again
+                child = Position(game, self.color)
+                self.table.put(edge.key, child)
+                path.append(child)
+                break
+            path.append(child)
+            position = child
+
+        if position is path[-1] and position.untried_actions and not position.terminal:
+            action = position.untried_actions.pop()
+            outcome = game.execute(action)
+            key = position_key(game)
+            edge = Edge(action, outcome, key)
+            position.edges.append(edge)
+            edges.append(edge)
+            child = self.table.get(key)
+            if child is None:
+                child = Position(game, self.color)
+                self.table.put(key, child)
+            else:
+                self.table.transpositions += 1
+            path.append(child)
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False  # expanded already, but too late to play out
+        state = RolloutState.from_game(game)
+        value = self.playout.value(state, self.color, deadline)
+        if value is None or (deadline is not None and time.perf_counter() >= deadline):
+            return False
+        reward = 0
+        if self.root.current_color == self.color and value > 0:
+            reward = value
+            if edges:
+                bonus = value * map_action_to_reward(
+                    edges[-1].action,
+                    self.game,
+                    self.root.current_color,
+                    self.catan_weights,
+                )
+                path[-1].reward += bonus
+                edges[-1].reward += bonus
+
+        for position in path:
+            position.visits += 1
+            position.reward += reward
+        for edge in edges:
+            edge.visits += 1
+            edge.reward += reward
+        return True
+
+    def is_settled(self, remaining: float, confidence: Optional[float] = None) -> bool:
+        """Whether find_best_action is settled, whatever the next remaining
+        simulations do (see settled)."""
+        edges = self.root.edges
+        return settled(
+            [edge.visits for edge in edges],
+            [edge.reward for edge in edges],
+            bool(self.root.untried_actions),
+            remaining,
+            confidence,
+        )
+
+    def find_best_action(self) -> Action:
+        return max(self.root.edges, key=lambda edge: edge.visits).action
+
+    def root_stats(self) -> Dict[Action, Tuple[int, float]]:
+        """Root action => (visits, reward), of the root's edges."""
+        return {edge.action: (edge.visits, edge.reward) for edge in self.root.edges}
+
+
+def settled(
+    visits: Sequence[float],
+    rewards: Sequence[float],
+    untried: bool,
+    remaining: float,
+    confidence: Optional[float] = None,
+) -> bool:
+    """Whether the most visited root action is settled: it stays the most
+    visited (the first one, if tied) whatever the next remaining simulations
+    do, as its lead in visits is larger than remaining.
+
+    With confidence (e.g. 0.05), it is also settled once, every action
+    having been tried, its mean reward is better than any other's with that
+    probability of error (by Hoeffding bounds, over all actions). Unlike the
+    visits lead, this can stop on an action more simulations would have
+    changed.
+
+    Args:
+        visits (Sequence[float]): visits of each root action
+        rewards (Sequence[float]): reward of each root action
+        untried (bool): whether the root has actions not tried yet
+        remaining (float): simulations left (or expected to be)
+        confidence (float, optional): error probability of the bound.
+            Defaults to None (visits lead only).
+    """
+    if not visits:
+        return False
+    best = max(range(len(visits)), key=visits.__getitem__)
+    runner_up = max((v for i, v in enumerate(visits) if i != best), default=0)
+    if visits[best] - runner_up > remaining:
+        return True
+    if confidence is None or untried or len(visits) < 2 or min(visits) == 0:
+        return False
+
+    log_term = math.log(2 * len(visits) / confidence)
+
+    def bounds(i: int) -> Tuple[float, float]:
+        radius = math.sqrt(log_term / (2 * visits[i]))
+        mean = rewards[i] / visits[i]
+        return mean - radius, mean + radius
+
+    lower = bounds(best)[0]
+    return all(bounds(i)[1] < lower for i in range(len(visits)) if i != best)
+
+
+def run_until(
+    run_playouts: Callable[[int, float], int],
+    deadline: float,
+    step: int = 1,
+    is_settled: Optional[Callable[[float], bool]] = None,
+) -> int:
+    """Runs simulations, step at a time, until deadline (a time.perf_counter()
+    time). The one running at the deadline is cut short and dropped.
+
+    Args:
+        run_playouts (Callable[[int, float], int]): (n, deadline) => runs up
+            to n simulations, returning the number completed (e.g.
+            MCTSNode.run_playouts)
+        deadline (float): time to stop at
+        step (int, optional): simulations per call. Defaults to 1.
+        is_settled (Callable[[float], bool], optional): e.g.
+            MCTSNode.is_settled, to stop early if the best action is settled
+            given the simulations that would fit until the deadline (at the
+            rate so far).
+
+    Returns:
+        int: simulations completed
+    """
+    simulations = 0
+    start = now = time.perf_counter()
+    while now < deadline:
+        if is_settled is not None and simulations:
+            if is_settled(simulations * (deadline - now) / (now - start)):
+                break
+        simulations += run_playouts(step, deadline)
+        now = time.perf_counter()
+    return simulations
+
+
+def run_until_settled(
+    run_playouts: Callable[[int], int],
+    n_simulations: int,
+    is_settled: Callable[[float], bool],
+    step: int = 1,
+) -> int:
+    """Runs up to n_simulations, step at a time, stopping once the best
+    action is settled given the simulations left (e.g. MCTSNode.is_settled).
+    Returns the number run."""
+    simulations = 0
+    while simulations < n_simulations and not is_settled(n_simulations - simulations):
+        simulations += run_playouts(min(step, n_simulations - simulations))
+    return simulations
+
+
+def compact_game(game: Game) -> bytes:
+    """Pickled copy of game for searching in other processes, with players
+    replaced by plain Player objects (bots may hold trees, pools...)."""
+    game = game.copy()
+    game.state.players = [Player(color) for color in game.state.colors]
+    return pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+
+
+def _root_playouts(job) -> List[Tuple[Action, int, float]]:
+    """Searches a tree in a worker process. Returns root children stats."""
+    payload, color, n_simulations, seed, options = job
+    random.seed(seed)
+    root = MCTSNode(game=pickle.loads(payload), color=color, **options)
+    root.run_playouts(n_simulations)
+    return [(child.action, child.visits, child.reward) for child in root.children]
+
+
+class RootParallelMCTS:
+    """Root-parallel MCTS: each worker process searches its own tree from the
+    same root (with its own random seed), and the visits and rewards of the
+    root's children are summed over trees to pick the action.
+
+    The pool is created on first use and reused across searches; close() it
+    when done.
+
+    Example:
+        search = RootParallelMCTS(workers=8)
+        stats = search.search(game, color, n_simulations=800)  # 100 each
+        best_action = max(stats, key=lambda a: stats[a][0])
+    """
+
+    def __init__(self, workers: Optional[int] = None, **options):
+        """
+        Args:
+            workers (int, optional): processes. Defaults to os.cpu_count().
+            **options: passed to the MCTSNode root of each tree (e.g.
+                rollout_turns).
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.options = options
+        self._pool = None
+
+    def search(
+        self, game: Game, color: Color, n_simulations: int
+    ) -> Dict[Action, Tuple[int, float]]:
+        """Runs n_simulations split over the workers.
+
+        Returns:
+            Dict[Action, Tuple[int, float]]: root action => (visits, reward),
+                summed over workers (in order of first appearance).
+        """
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+        payload = compact_game(game)  # pickled once for all workers
+        base_seed = random.getrandbits(32)
+        jobs = []
+        for worker in range(self.workers):
+            share = n_simulations // self.workers
+            share += worker < n_simulations % self.workers
+            if share > 0:
+                jobs.append((payload, color, share, base_seed + worker, self.options))
+
+        merged: Dict[Action, Tuple[int, float]] = {}
+        for children in self._pool.map(_root_playouts, jobs, chunksize=1):
+            for action, visits, reward in children:
+                total_visits, total_reward = merged.get(action, (0, 0.0))
+                merged[action] = (total_visits + visits, total_reward + reward)
+        return merged
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __getstate__(self):
+        return {"workers": self.workers, "options": self.options, "_pool": None}
+
+
+def _play_states(job) -> Tuple[List[Optional[float]], float]:
+    """Plays out rollout states in a worker process. Returns their values
+    (see Playout.value, None for those cut short by the deadline) and the
+    seconds it took."""
+    states, playout, color, seed, seconds = job
+    random.seed(seed)
+    start = time.perf_counter()
+    # own deadline: perf_counter times aren't comparable across processes
+    deadline = None if seconds is None else start + seconds
+    values = [playout.value(state, color, deadline) for state in states]
+    return values, time.perf_counter() - start
+
+
+class LeafParallelMCTS:
+    """Leaf-parallel MCTS: a single tree, searched in this process, whose
+    playouts run in batches on a pool of worker processes (see
+    MCTSNode.run_batched_playouts). Keeps one (deeper) tree, unlike
+    RootParallelMCTS, at the cost of selecting with virtual losses.
+
+    Example:
+        search = LeafParallelMCTS(workers=8)
+        root = MCTSNode(game=game.copy(), color=color)
+        search.run(root, n_simulations=800)
+        best_action = root.find_best_action()
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        virtual_loss: float = 1.0,
+    ):
+        """
+        Args:
+            workers (int, optional): processes. Defaults to os.cpu_count().
+            batch_size (int, optional): leaves per batch. Defaults to twice
+                the workers.
+            virtual_loss (float, optional): See run_batched_playouts.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size or 2 * self.workers
+        self.virtual_loss = virtual_loss
+        # seconds of a batch not spent playing (pickling, scheduling...), as
+        # a decaying maximum: workers stop that much before deadlines
+        self.latency = 0.0
+        self._pool = None
+
+    def run(
+        self, root: MCTSNode, n_simulations: int, deadline: Optional[float] = None
+    ) -> int:
+        return root.run_batched_playouts(
+            n_simulations, self.simulate, self.batch_size, self.virtual_loss, deadline
+        )
+
+    def simulate(
+        self, nodes: List[MCTSNode], deadline: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """Value of a playout from each node (see MCTSNode.simulate), played
+        by the workers. Workers stop latency seconds before the deadline:
+        playouts they cut short are None."""
+        self.start()
+        start = time.perf_counter()
+        seconds = None if deadline is None else deadline - start - self.latency
+        if seconds is not None and seconds <= 0:
+            return [None] * len(nodes)
+        states = [RolloutState.from_game(node.game) for node in nodes]
+        playout, color = nodes[0].playout, nodes[0].color
+        base_seed = random.getrandbits(32)
+        # one job per worker, so the (shared) topology is pickled once each
+        chunk = -(-len(states) // self.workers)
+        jobs = [
+            (states[i : i + chunk], playout, color, base_seed + i, seconds)
+            for i in range(0, len(states), chunk)
+        ]
+        values: List[Optional[float]] = []
+        playing = 0.0
+        for results, elapsed in self._pool.map(_play_states, jobs, chunksize=1):
+            values.extend(results)
+            playing = max(playing, elapsed)
+        latency = time.perf_counter() - start - playing
+        self.latency = max(latency, 0.9 * self.latency)
+        return values
+
+    def start(self):
+        """Starts the worker processes, if not yet (they otherwise start on
+        first use, e.g. within a time budget)."""
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
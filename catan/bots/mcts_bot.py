@@ -1,9 +1,50 @@
-from typing import List
+import functools
+import gc
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
 import catan.bots.mcts as mcts
 
+from catan.bots.evaluation import Evaluator
 from catan.core.models.enums import Action, ActionType
 from catan.core.models.player import Player
 
+# time kept from time budgets for the last uninterruptible step of a search
+# (expanding a node and converting its state for the playout: up to a few ms)
+# and to pick the action
+DEADLINE_MARGIN_SECONDS = 0.005
+# smallest time budgets that can be met (mostly spent searching): serial
+# search, and leaf-parallel search (whose batches also wait on the workers)
+MIN_TIME_BUDGET_MS = 20
+MIN_LEAF_TIME_BUDGET_MS = 100
+# cap of the time banked by bank_time, in time budgets
+MAX_BANKED_BUDGETS = 4
+
+# attributes of bots pickled by older versions, when missing: one entry per
+# option or state attribute added since (but reports, a new list for each)
+_DEFAULTS = dict(
+    reuse_tree=True,
+    root=None,
+    game_id=None,
+    workers=1,
+    parallel_search=None,
+    parallel="root",
+    batch_size=None,
+    virtual_loss=1.0,
+    transpositions=False,
+    table=None,
+    time_budget_ms=None,
+    rollout_turns=None,
+    evaluator=None,
+    early_stop=False,
+    stop_confidence=None,
+    bank_time=False,
+    banked_seconds=0.0,
+    widening=None,
+    widening_exponent=0.5,
+)
+
 
 def fast_forward_decide(playable_actions: List[Action]):
     action_types = set([a.action_type for a in playable_actions])
@@ -16,34 +57,367 @@ def fast_forward_decide(playable_actions: List[Action]):
     return None
 
 
+@dataclass
+class DecisionReport:
+    """Search statistics of one MCTSBot decision.
+
+    Attributes:
+        turn (int): game turn of the decision
+        inherited (int): simulations of the reused subtree (0 for a fresh tree)
+        simulations (int): simulations run for this decision
+        seconds (float): search time
+        saved (int): simulations not run as the best action was settled
+            (see MCTSBot's early_stop; estimated, with a time budget)
+    """
+
+    turn: int
+    inherited: int
+    simulations: int
+    seconds: float
+    saved: int = 0
+
+    @property
+    def simulations_per_second(self) -> float:
+        return self.simulations / self.seconds if self.seconds > 0 else 0.0
+
+
 class MCTSBot(Player):
-    def __init__(self, color, n_simulations=100, debug=False, debug_cb=None):
+    def __init__(
+        self,
+        color,
+        n_simulations=100,
+        debug=False,
+        debug_cb=None,
+        reuse_tree=True,
+        workers=1,
+        parallel="root",
+        batch_size=None,
+        virtual_loss=1.0,
+        transpositions=False,
+        time_budget_ms=None,
+        rollout_turns=None,
+        evaluator=None,
+        early_stop=False,
+        stop_confidence=None,
+        bank_time=False,
+        widening=None,
+        widening_exponent=0.5,
+    ):
+        """
+        Args:
+            color (Color): bot's color
+            n_simulations (int, optional): simulations per decision.
+            debug (bool, optional): print decisions. Defaults to False.
+            debug_cb (Callable[[MCTSNode], None], optional): called with the
+                root of every search.
+            reuse_tree (bool, optional): keep the search tree between
+                decisions and continue from the subtree of the position
+                reached (if it was explored). Defaults to True.
+            workers (int, optional): processes to search with. Above 1, uses
+                root-parallel search (see RootParallelMCTS): n_simulations
+                are split over independent trees, so there is no tree to
+                reuse or pass to debug_cb. Defaults to 1.
+            parallel (str, optional): "root", or "leaf" for leaf-parallel
+                search (see LeafParallelMCTS): one tree whose playouts run
+                in batches on the workers. Defaults to "root".
+            batch_size (int, optional): leaves per batch of leaf-parallel
+                search. Defaults to twice the workers.
+            virtual_loss (float, optional): virtual loss weight of
+                leaf-parallel search. Defaults to 1.
+            transpositions (bool, optional): search the graph of positions,
+                sharing the statistics of transpositions (see
+                TranspositionMCTS), instead of a tree. With reuse_tree, the
+                transposition table is kept between decisions of a game.
+                Not passed to debug_cb, nor parallel. Defaults to False.
+            time_budget_ms (float, optional): search for this long per
+                decision instead of n_simulations (the playout running at
+                the deadline is cut short and dropped). At least
+                MIN_TIME_BUDGET_MS (MIN_LEAF_TIME_BUDGET_MS with
+                parallel="leaf"): below, the steps of a search that can't be
+                interrupted (or the workers' latency jitter) could overrun
+                it. Leaf-parallel decisions can still overrun by a few ms
+                when the machine has fewer cores than workers. Decisions
+                with a single playable action don't search. Not for
+                root-parallel search. Defaults to None.
+            rollout_turns (int, optional): truncate playouts after this many
+                turns, valuing the positions reached with evaluator (cheaper
+                playouts: more of them per time budget). Defaults to None
+                (playouts to the end of the game).
+            evaluator (Evaluator or str, optional): evaluator of truncated
+                playouts, or the path of its weights (as saved by
+                catan.analysis.calibrate_evaluation). Defaults to Evaluator().
+            early_stop (bool, optional): stop searching once the most
+                visited action leads by more visits than the simulations
+                left (or, with a time budget, expected to fit in the time
+                left), so it can't change. Saved simulations are in reports.
+                Not for root-parallel search. Defaults to False.
+            stop_confidence (float, optional): with early_stop, also stop
+                once the best action is better than the others with this
+                error probability (e.g. 0.05; see mcts.settled). Defaults to
+                None.
+            bank_time (bool, optional): with early_stop and time_budget_ms,
+                add the time left by decisions stopped early to the budget
+                of the next ones (of the same game), up to
+                MAX_BANKED_BUDGETS budgets. Defaults to False.
+            widening (float, optional): progressive widening constant (see
+                MCTSNode): nodes expand their best actions first (by
+                heuristics.action_score), more as they get visited. E.g. 1.
+                Not for transpositions search. Defaults to None.
+            widening_exponent (float, optional): See MCTSNode. Defaults to
+                0.5.
+        """
+        if widening is not None and transpositions:
+            raise ValueError("widening isn't supported by transpositions search")
+        if early_stop and workers > 1 and parallel == "root":
+            raise ValueError("early_stop needs parallel='leaf' (or workers=1)")
+        if bank_time and (time_budget_ms is None or not early_stop):
+            raise ValueError("bank_time needs time_budget_ms and early_stop")
+        if time_budget_ms is not None and workers > 1 and parallel == "root":
+            raise ValueError("time_budget_ms needs parallel='leaf' (or workers=1)")
+        if time_budget_ms is not None:
+            minimum = MIN_LEAF_TIME_BUDGET_MS if workers > 1 else MIN_TIME_BUDGET_MS
+            if time_budget_ms < minimum:
+                raise ValueError(f"time_budget_ms must be at least {minimum}")
+        if transpositions and workers > 1:
+            raise ValueError("transpositions search isn't parallel (use workers=1)")
+        if parallel not in ("root", "leaf"):
+            raise ValueError(f"parallel must be 'root' or 'leaf', got {parallel}")
         super().__init__(color, is_bot=True)
 
         self.n_simulations = n_simulations
         self.debug = debug
         self.debug_cb = debug_cb
+        self.reuse_tree = reuse_tree
+        self.workers = workers
+        self.parallel = parallel
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.transpositions = transpositions
+        self.time_budget_ms = time_budget_ms
+        self.rollout_turns = rollout_turns
+        if isinstance(evaluator, str):
+            evaluator = Evaluator.load(evaluator)
+        self.evaluator = evaluator
+        self.early_stop = early_stop
+        self.stop_confidence = stop_confidence
+        self.bank_time = bank_time
+        self.widening = widening
+        self.widening_exponent = widening_exponent
+        self.banked_seconds = 0.0
+        self.table: Optional[mcts.TranspositionTable] = None
+        self.root: Optional[mcts.MCTSNode] = None
+        self.parallel_search = None  # RootParallelMCTS or LeafParallelMCTS
+        self.reports: List[DecisionReport] = []  # of the current game
+        self.game_id = None  # of the current game
 
     def decide(
         self,
         game,
         playable_actions,
     ):
+        if game.id != self.game_id:
+            self.reset_state()
+            self.game_id = game.id
+
         ff_action = fast_forward_decide(playable_actions)
         if ff_action:
             return ff_action
 
-        mcts_root = mcts.MCTSNode(game=game.copy(), color=self.color)
-        mcts_root.run_playouts(n_simulations=self.n_simulations)
+        if self.workers > 1 and self.parallel == "leaf":
+            self._leaf_search().start()  # not on the first decision's time
+        if self.time_budget_ms is not None:
+            import numpy  # noqa: F401  (expanding nodes imports it: not on time)
+        start = time.perf_counter()
+        if self.time_budget_ms is None:
+            return self._decide(game, start)
+        if len(playable_actions) == 1:
+            return playable_actions[0]
+        # a full garbage collection can take longer than many simulations:
+        # postpone it to after the decision
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._decide(game, start)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _decide(self, game, start: float) -> Action:
+        if self.workers > 1 and self.parallel == "root":
+            return self._decide_in_parallel(game, start)
+        if self.transpositions:
+            return self._decide_with_transpositions(game, start)
+
+        mcts_root = self._reused_root(game) if self.reuse_tree else None
+        inherited = 0 if mcts_root is None else mcts_root.visits
+        if mcts_root is None:
+            mcts_root = mcts.MCTSNode(
+                game=game.copy(), color=self.color, **self._node_options()
+            )
+        if self.workers > 1:
+            search = self._leaf_search()
+            simulations, saved = self._run(
+                lambda n, deadline=None: search.run(mcts_root, n, deadline),
+                mcts_root.is_settled,
+                start,
+                search.batch_size,
+            )
+        else:
+            simulations, saved = self._run(
+                mcts_root.run_playouts, mcts_root.is_settled, start
+            )
 
         if self.debug_cb:
             self.debug_cb(mcts_root)
 
-        best_action = mcts_root.find_best_action()
+        if mcts_root.children:
+            best_action = mcts_root.find_best_action()
+        else:  # out of time: the action the search would have tried first
+            best_action = mcts_root.untried_actions[-1]
+        self.root = mcts_root if self.reuse_tree else None
+        self._report(game, best_action, inherited, simulations, saved, start)
+        return best_action
+
+    def _leaf_search(self) -> mcts.LeafParallelMCTS:
+        if self.parallel_search is None:  # reused across decisions (and games)
+            self.parallel_search = mcts.LeafParallelMCTS(
+                self.workers, self.batch_size, self.virtual_loss
+            )
+        return self.parallel_search
+
+    def _run(self, run_playouts, is_settled, start: float, step: int = 1):
+        """Runs the simulations of a decision: n_simulations, or as many as
+        fit in the time budget (stopping early if the best action is settled,
+        with early_stop). Returns the number run and the number saved."""
+        if not self.early_stop:
+            is_settled = None
+        elif self.stop_confidence is not None:
+            is_settled = functools.partial(is_settled, confidence=self.stop_confidence)
+
+        if self.time_budget_ms is None:
+            if is_settled is None:
+                run_playouts(self.n_simulations)
+                return self.n_simulations, 0
+            simulations = mcts.run_until_settled(
+                run_playouts, self.n_simulations, is_settled, step
+            )
+            return simulations, self.n_simulations - simulations
+
+        budget = self.time_budget_ms / 1000
+        if self.bank_time:
+            budget += self.banked_seconds
+        deadline = start + budget - DEADLINE_MARGIN_SECONDS
+        simulations = mcts.run_until(run_playouts, deadline, step, is_settled)
+        end = time.perf_counter()
+        left = max(deadline - end, 0.0)
+        if self.bank_time:
+            limit = MAX_BANKED_BUDGETS * self.time_budget_ms / 1000
+            self.banked_seconds = min(left, limit)
+        if is_settled is None or end <= start:
+            return simulations, 0
+        return simulations, round(simulations * left / (end - start))
 
+    def _report(self, game, best_action, inherited, simulations, saved, start):
+        report = DecisionReport(
+            game.state.num_turns,
+            inherited,
+            simulations,
+            time.perf_counter() - start,
+            saved,
+        )
+        self.reports.append(report)
         if self.debug:
             print(
                 f"Move {game.state.num_turns}: MCTS bot performed action {best_action}"
+                f" ({inherited} simulations inherited, {simulations} run at"
+                f" {report.simulations_per_second:.0f}/s, {saved} saved)"
             )
 
+    def _decide_in_parallel(self, game, start: float) -> Action:
+        if self.parallel_search is None:  # reused across decisions (and games)
+            self.parallel_search = mcts.RootParallelMCTS(
+                self.workers, **self._node_options()
+            )
+        stats = self.parallel_search.search(game, self.color, self.n_simulations)
+        best_action = max(stats, key=lambda action: stats[action][0])
+        self.reports.append(
+            DecisionReport(
+                game.state.num_turns, 0, self.n_simulations, time.perf_counter() - start
+            )
+        )
+        if self.debug:
+            turn = game.state.num_turns
+            print(f"Move {turn}: MCTS bot performed action {best_action}")
+        return best_action
+
+    def _decide_with_transpositions(self, game, start: float) -> Action:
+        table = None
+        if self.reuse_tree and self.table is not None:  # of this game
+            table = self.table
+        search = mcts.TranspositionMCTS(
+            game.copy(), self.color, table=table, **self._playout_options()
+        )
+        inherited = search.root.visits
+        simulations, saved = self._run(search.run_playouts, search.is_settled, start)
+        if search.root.edges:
+            best_action = search.find_best_action()
+        else:  # out of time: the action the search would have tried first
+            best_action = search.root.untried_actions[-1]
+        if self.reuse_tree:
+            self.table = search.table
+        self._report(game, best_action, inherited, simulations, saved, start)
         return best_action
+
+    def _playout_options(self):
+        return dict(rollout_turns=self.rollout_turns, evaluator=self.evaluator)
+
+    def _node_options(self):
+        return dict(
+            self._playout_options(),
+            widening=self.widening,
+            widening_exponent=self.widening_exponent,
+        )
+
+    def close(self):
+        """Stops the worker processes (of workers > 1), if any."""
+        if self.parallel_search is not None:
+            self.parallel_search.close()
+
+    def _reused_root(self, game) -> Optional[mcts.MCTSNode]:
+        """Subtree of the last search matching game (by the actions played
+        since), detached from the rest of the tree. None if not found."""
+        root = self.root
+        if root is None or root.game.id != game.id:
+            return None
+        played = len(root.game.state.actions)
+        actions = game.state.actions
+        if len(actions) < played or (
+            played and actions[played - 1] != root.game.state.actions[-1]
+        ):
+            return None
+
+        node = root.find_descendant(actions[played:])
+        if node is None or node.current_color != self.color:
+            return None
+        node.detach()
+        return node
+
+    def reset_state(self):
+        # called by decide when the game changes
+        self.root = None
+        self.table = None
+        self.reports = []
+        self.banked_seconds = 0.0
+        self.game_id = None
+
+    def __getstate__(self):
+        # games (with their players) get pickled, e.g. by the server (on every
+        # move): leave the search tree and reports out
+        state = self.__dict__.copy()
+        state["root"] = None
+        state["table"] = None
+        state["reports"] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update({**_DEFAULTS, "reports": [], **state})
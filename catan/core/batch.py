@@ -0,0 +1,1128 @@
+"""
+Vectorized engine that plays many random games in lockstep with NumPy.
+
+BatchState keeps G games as struct-of-arrays (the leading axis of every
+array is the game), following the rules of catan.core.rollout.RolloutState
+(and thus catan.core.state.apply_action). Each step builds a
+[G, num_slots] legality mask, samples one action per game from it and
+applies all of them together, masking by prompt and action kind. Branchy
+and rare transitions (longest road, plowed roads, discards) fall back to
+per-game Python code.
+
+Differences with the full engine (none change the distribution of
+random games):
+    - Discards are random, so they are resolved as part of the 7 roll
+      (there is no DISCARD slot nor prompt).
+    - Longest road is only recomputed when the builder could take or
+      extend the award, so road_lengths is a lower bound otherwise.
+
+Action slots encode (action type, param) pairs with the same params
+as catan.core.rollout (see BatchState.slot_action).
+"""
+
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from catan.core.game import TURNS_LIMIT, Game
+from catan.core.models.decks import (
+    CITY_COST_FREQDECK,
+    DEVELOPMENT_CARD_COST_FREQDECK,
+    ROAD_COST_FREQDECK,
+    SETTLEMENT_COST_FREQDECK,
+    starting_devcard_bank,
+    starting_resource_bank,
+)
+from catan.core.models.enums import DEVELOPMENT_CARDS, RESOURCES, ActionType
+from catan.core.models.map import (
+    BASE_MAP_TEMPLATE,
+    PORT_DIRECTION_TO_NODEREFS,
+    CatanMap,
+    MapTemplate,
+)
+from catan.core.models.player import Color
+from catan.core.rollout import (
+    ACTION_TYPES,
+    BUILD_CITY,
+    BUILD_ROAD,
+    BUILD_SETTLEMENT,
+    BUY_DEVELOPMENT_CARD,
+    DISCARD,
+    DISCARDING,
+    END_TURN,
+    INITIAL_ROAD,
+    INITIAL_SETTLEMENT,
+    KNIGHT_INDEX,
+    MARITIME_TRADE,
+    MONOPOLY_INDEX,
+    MOVE_ROBBER,
+    MOVING_ROBBER,
+    NUM_ACTION_TYPES,
+    PLAY_KNIGHT_CARD,
+    PLAY_MONOPOLY,
+    PLAY_ROAD_BUILDING,
+    PLAY_TURN,
+    PLAY_YEAR_OF_PLENTY,
+    PLAYABLE_DEV_INDEXES,
+    ROAD_BUILDING_INDEX,
+    ROLL,
+    VICTORY_POINT_INDEX,
+    YEAR_OF_PLENTY_INDEX,
+    YEAR_OF_PLENTY_OPTIONS,
+    RolloutState,
+    RolloutTopology,
+    dfs_walk,
+    get_rollout_topology,
+    longest_road_length,
+    longest_road_through,
+)
+
+NUM_RESOURCES = len(RESOURCES)
+
+# Fields with a leading game axis (copied / compacted together).
+GAME_FIELDS = [
+    "hands",
+    "bank",
+    "dev_hands",
+    "owned_at_start",
+    "dev_deck",
+    "dev_deck_size",
+    "played_dev_in_turn",
+    "has_rolled",
+    "knights_played",
+    "roads_available",
+    "settlements_available",
+    "cities_available",
+    "victory_points",
+    "actual_victory_points",
+    "road_lengths",
+    "road_owner",
+    "road_length",
+    "army_owner",
+    "rates",
+    "node_owner",
+    "node_is_city",
+    "edge_owner",
+    "buildable_nodes",
+    "reach",
+    "tile_weights",
+    "robber_tile",
+    "current_player",
+    "current_turn",
+    "num_turns",
+    "prompt",
+    "is_initial_build_phase",
+    "is_road_building",
+    "free_roads_available",
+    "last_settlement",
+    "tile_numbers",
+    "tile_resources",
+    "number_tiles",
+    "node_rates",
+]
+
+YEAR_OF_PLENTY_CARDS = np.zeros((len(YEAR_OF_PLENTY_OPTIONS), NUM_RESOURCES), np.int32)
+for _param, _cards in enumerate(YEAR_OF_PLENTY_OPTIONS):
+    for _resource in _cards:
+        YEAR_OF_PLENTY_CARDS[_param, _resource] += 1
+YEAR_OF_PLENTY_PAIRS = [
+    (i, j) for i in range(NUM_RESOURCES) for j in range(i, NUM_RESOURCES)
+]
+
+
+class BatchState:
+    """Struct-of-arrays state of many games on maps of the same topology.
+
+    Per-game arrays are indexed [game, ...]; per-player ones [game, seat, ...].
+    Nodes, edges and tiles are indexed as in RolloutTopology. Arrays with a
+    trailing "sink" entry (edge_owner, buildable_nodes, tile_weights,
+    tile_numbers, tile_resources) let padded lookup tables be used in
+    fancy indexing (sink values are meaningless).
+
+    Attributes:
+        colors (List[List[Color]]): seating order of each game.
+        num_slots (int): size of the action space (second axis of masks).
+        slot_types (np.ndarray): slot => index into ACTION_TYPES.
+        slot_params (np.ndarray): slot => rollout param of the action.
+    """
+
+    def __init__(
+        self,
+        topology: RolloutTopology,
+        num_games: int,
+        num_players: int,
+        vps_to_win: int = 10,
+        discard_limit: int = 7,
+        seed: Optional[int] = None,
+    ):
+        """Allocates (empty) arrays. Use from_states or new_games instead."""
+        self.topology = topology
+        self.num_players = num_players
+        self.vps_to_win = vps_to_win
+        self.discard_limit = discard_limit
+        self.rng = np.random.default_rng(seed)
+        self.colors: List[List[Color]] = [[] for _ in range(num_games)]
+
+        num_nodes = len(topology.node_edges)
+        num_edges = len(topology.edges)
+        num_tiles = len(topology.tile_nodes)
+        self.num_nodes = num_nodes
+        self.num_edges = num_edges
+        self.num_tiles = num_tiles
+        self.edge_a = np.array([a for a, _ in topology.edges])
+        self.edge_b = np.array([b for _, b in topology.edges])
+        self.node_tiles = _padded(topology.node_tiles, num_tiles)
+        self.node_neighbors = _padded(
+            [[n for n in ns if n < num_nodes] for ns in topology.node_neighbors],
+            num_nodes,
+        )
+        self.node_edges = _padded(
+            [[edge for edge, _ in edges] for edges in topology.node_edges], num_edges
+        )
+        self._build_slots()
+
+        G, P, N, E, T, R = (
+            num_games,
+            num_players,
+            num_nodes,
+            num_edges,
+            num_tiles,
+            NUM_RESOURCES,
+        )
+        self.hands = np.zeros((G, P, R), np.int32)
+        self.bank = np.zeros((G, R), np.int32)
+        self.dev_hands = np.zeros((G, P, len(DEVELOPMENT_CARDS)), np.int32)
+        self.owned_at_start = np.zeros((G, P, len(PLAYABLE_DEV_INDEXES)), bool)
+        self.dev_deck = np.full((G, len(starting_devcard_bank())), -1, np.int32)
+        self.dev_deck_size = np.zeros(G, np.int32)
+        self.played_dev_in_turn = np.zeros((G, P), bool)
+        self.has_rolled = np.zeros((G, P), bool)
+        self.knights_played = np.zeros((G, P), np.int32)
+        self.roads_available = np.zeros((G, P), np.int32)
+        self.settlements_available = np.zeros((G, P), np.int32)
+        self.cities_available = np.zeros((G, P), np.int32)
+        self.victory_points = np.zeros((G, P), np.int32)
+        self.actual_victory_points = np.zeros((G, P), np.int32)
+        self.road_lengths = np.zeros((G, P), np.int32)
+        self.road_owner = np.full(G, -1, np.int32)
+        self.road_length = np.zeros(G, np.int32)
+        self.army_owner = np.full(G, -1, np.int32)
+        self.rates = np.full((G, P, R), 4, np.int32)
+
+        self.node_owner = np.full((G, N), -1, np.int32)
+        self.node_is_city = np.zeros((G, N), bool)
+        self.edge_owner = np.full((G, E + 1), -1, np.int32)
+        self.buildable_nodes = np.zeros((G, N + 1), bool)
+        self.reach = np.zeros((G, P, N), bool)
+        self.tile_weights = np.zeros((G, T + 1, P), np.int32)
+        self.robber_tile = np.zeros(G, np.int32)
+
+        self.current_player = np.zeros(G, np.int32)
+        self.current_turn = np.zeros(G, np.int32)
+        self.num_turns = np.zeros(G, np.int32)
+        self.prompt = np.full(G, INITIAL_SETTLEMENT, np.int32)
+        self.is_initial_build_phase = np.ones(G, bool)
+        self.is_road_building = np.zeros(G, bool)
+        self.free_roads_available = np.zeros(G, np.int32)
+        self.last_settlement = np.zeros(G, np.int32)
+
+        # Per-game map (numbers, resources and port rates)
+        self.tile_numbers = np.zeros((G, T + 1), np.int32)
+        self.tile_resources = np.full((G, T + 1), -1, np.int32)  # -1 desert
+        self.number_tiles = np.full((G, 13, 1), T, np.int32)  # see _index_numbers
+        self.node_rates = np.full((G, N, R), 4, np.int32)
+
+    @property
+    def num_games(self) -> int:
+        return len(self.current_player)
+
+    def _build_slots(self):
+        P = self.num_players
+        layout = [
+            (ROLL, [0]),
+            (END_TURN, [0]),
+            (BUY_DEVELOPMENT_CARD, [0]),
+            (PLAY_KNIGHT_CARD, [0]),
+            (PLAY_ROAD_BUILDING, [0]),
+            (PLAY_YEAR_OF_PLENTY, range(len(YEAR_OF_PLENTY_OPTIONS))),
+            (PLAY_MONOPOLY, range(NUM_RESOURCES)),
+            (MARITIME_TRADE, range(NUM_RESOURCES * NUM_RESOURCES)),
+            (BUILD_ROAD, range(self.num_edges)),
+            (BUILD_SETTLEMENT, range(self.num_nodes)),
+            (BUILD_CITY, range(self.num_nodes)),
+            (MOVE_ROBBER, range(self.num_tiles * (P + 1))),
+        ]
+        self.slot_offsets: Dict[int, int] = dict()
+        slot_types, slot_params = [], []
+        for action_type, params in layout:
+            self.slot_offsets[action_type] = len(slot_types)
+            slot_types.extend(action_type for _ in params)
+            slot_params.extend(params)
+        self.num_slots = len(slot_types)
+        self.slot_types = np.array(slot_types)
+        self.slot_params = np.array(slot_params)
+
+    def slot_action(self, slot: int) -> int:
+        """Rollout encoding (see catan.core.rollout) of the action at slot"""
+        return int(self.slot_params[slot]) * NUM_ACTION_TYPES + int(
+            self.slot_types[slot]
+        )
+
+    # ===== Constructors
+    @staticmethod
+    def from_states(
+        states: Sequence[RolloutState], seed: Optional[int] = None
+    ) -> "BatchState":
+        """Stacks rollout states (of maps with the same topology) into a batch.
+
+        Args:
+            states (Sequence[RolloutState]): states to copy. Must have the same
+                number of players, vps_to_win and discard_limit.
+            seed (int, optional): Seed of the batch random generator.
+
+        Returns:
+            BatchState: batch with a game per state, in order
+        """
+        # Discards are random, so resolve pending ones like the batch would.
+        states = list(states)
+        for i, state in enumerate(states):
+            if state.prompt == DISCARDING:
+                states[i] = state = state.copy()
+                while state.prompt == DISCARDING:
+                    state.apply(DISCARD)
+        first = states[0]
+        self = BatchState(
+            first.topology,
+            len(states),
+            first.num_players,
+            first.vps_to_win,
+            first.discard_limit,
+            seed,
+        )
+        N, E = self.num_nodes, self.num_edges
+        for g, state in enumerate(states):
+            topology = state.topology
+            if (
+                state.num_players != self.num_players
+                or topology.edges != first.topology.edges
+                or topology.tile_nodes != first.topology.tile_nodes
+            ):
+                raise ValueError("All states must share players count and topology")
+            self.colors[g] = list(state.colors)
+            self.hands[g] = state.hands
+            self.bank[g] = state.bank
+            self.dev_hands[g] = state.dev_hands
+            self.owned_at_start[g] = state.owned_at_start
+            self.dev_deck_size[g] = len(state.dev_deck)
+            self.dev_deck[g, : len(state.dev_deck)] = [
+                DEVELOPMENT_CARDS.index(card) for card in state.dev_deck
+            ]
+            self.played_dev_in_turn[g] = state.played_dev_in_turn
+            self.has_rolled[g] = state.has_rolled
+            self.knights_played[g] = state.knights_played
+            self.roads_available[g] = state.roads_available
+            self.settlements_available[g] = state.settlements_available
+            self.cities_available[g] = state.cities_available
+            self.victory_points[g] = state.victory_points
+            self.actual_victory_points[g] = state.actual_victory_points
+            self.road_lengths[g] = state.road_lengths
+            self.road_owner[g] = state.road_owner
+            self.road_length[g] = state.road_length
+            self.army_owner[g] = state.army_owner
+            self.rates[g] = state.rates
+
+            self.node_owner[g] = state.node_owner[:N]
+            self.node_is_city[g] = state.node_is_city[:N]
+            self.edge_owner[g, :E] = state.edge_owner
+            self.buildable_nodes[g, :N] = state.buildable_nodes[:N]
+            for player, nodes in enumerate(state.reach):
+                self.reach[g, player, list(nodes)] = True
+            self.tile_weights[g, :-1] = state.tile_weights
+            self.robber_tile[g] = state.robber_tile
+
+            self.current_player[g] = state.current_player
+            self.current_turn[g] = state.current_turn
+            self.num_turns[g] = state.num_turns
+            self.prompt[g] = state.prompt
+            self.is_initial_build_phase[g] = state.is_initial_build_phase
+            self.is_road_building[g] = state.is_road_building
+            self.free_roads_available[g] = state.free_roads_available
+            settlements = state.settlements[state.current_player]
+            self.last_settlement[g] = settlements[-1] if settlements else 0
+
+            self.tile_resources[g, :-1] = topology.tile_resources
+            for number, tiles in topology.number_tiles.items():
+                self.tile_numbers[g, tiles] = number
+            for node, ports in enumerate(topology.node_ports[:N]):
+                for port in ports:
+                    if port == -1:
+                        np.minimum(
+                            self.node_rates[g, node], 3, out=self.node_rates[g, node]
+                        )
+                    else:
+                        self.node_rates[g, node, port] = 2
+        self._index_numbers()
+        return self
+
+    @staticmethod
+    def from_games(games: Sequence[Game], seed: Optional[int] = None) -> "BatchState":
+        """Batch with a copy of the current state of each game"""
+        return BatchState.from_states(
+            [RolloutState.from_game(game) for game in games], seed
+        )
+
+    @staticmethod
+    def new_games(
+        num_games: int,
+        num_players: int = 4,
+        catan_map: Optional[CatanMap] = None,
+        map_template: MapTemplate = BASE_MAP_TEMPLATE,
+        vps_to_win: int = 10,
+        discard_limit: int = 7,
+        seed: Optional[int] = None,
+    ) -> "BatchState":
+        """Batch of games at the start of the initial build phase.
+
+        Args:
+            num_games (int): number of games
+            num_players (int, optional): players per game. Defaults to 4.
+            catan_map (CatanMap, optional): Map to play all games in. Defaults
+                to None (a random map of map_template per game).
+            map_template (MapTemplate, optional): Template to shuffle when
+                catan_map is None. Defaults to BASE_MAP_TEMPLATE.
+            vps_to_win (int, optional): Defaults to 10.
+            discard_limit (int, optional): Defaults to 7.
+            seed (int, optional): Seed of the batch random generator.
+
+        Returns:
+            BatchState: new games, seated as list(Color)[:num_players]
+        """
+        reference = catan_map or CatanMap.from_template(map_template)
+        topology = get_rollout_topology(reference)
+        self = BatchState(
+            topology, num_games, num_players, vps_to_win, discard_limit, seed
+        )
+        rng = self.rng
+        G, N, T = num_games, self.num_nodes, self.num_tiles
+        colors = list(Color)[:num_players]
+        self.colors = [colors for _ in range(G)]
+
+        self.bank[:] = starting_resource_bank()
+        self.dev_deck[:] = rng.permuted(
+            np.tile(
+                [DEVELOPMENT_CARDS.index(c) for c in starting_devcard_bank()], (G, 1)
+            ),
+            axis=1,
+        )
+        self.dev_deck_size[:] = self.dev_deck.shape[1]
+        self.roads_available[:] = 15
+        self.settlements_available[:] = 5
+        self.cities_available[:] = 4
+        self.buildable_nodes[:, topology.land_nodes] = True
+
+        if catan_map is not None:
+            resources = np.tile(topology.tile_resources, (G, 1))
+            numbers = np.zeros((G, T), np.int32)
+            for number, tiles in topology.number_tiles.items():
+                numbers[:, tiles] = number
+            port_resources = None
+        else:
+            # Same distribution as initialize_tiles: uniform shuffles of
+            # tile resources, numbers (skipping desert) and port resources.
+            template_resources = [
+                -1 if r is None else RESOURCES.index(r)
+                for r in map_template.tile_resources
+            ]
+            resources = rng.permuted(np.tile(template_resources, (G, 1)), axis=1)
+            numbers = np.zeros((G, T), np.int32)
+            numbers[resources != -1] = rng.permuted(
+                np.tile(map_template.numbers, (G, 1)), axis=1
+            ).ravel()
+            port_resources = rng.permuted(
+                np.tile(
+                    [
+                        -1 if r is None else RESOURCES.index(r)
+                        for r in map_template.port_resources
+                    ],
+                    (G, 1),
+                ),
+                axis=1,
+            )
+        self.tile_numbers[:, :T] = numbers
+        self.tile_resources[:, :T] = resources
+        self.robber_tile[:] = np.argmax(resources == -1, axis=1)
+
+        if port_resources is None:
+            for node, ports in enumerate(topology.node_ports[:N]):
+                for port in ports:
+                    if port == -1:
+                        np.minimum(
+                            self.node_rates[:, node], 3, out=self.node_rates[:, node]
+                        )
+                    else:
+                        self.node_rates[:, node, port] = 2
+        else:
+            ports = sorted(reference.ports_by_id.values(), key=lambda p: p.id)
+            for slot, port in enumerate(ports):
+                noderefs = PORT_DIRECTION_TO_NODEREFS[port.direction]
+                nodes = [port.nodes[noderef] for noderef in noderefs]
+                resource = port_resources[:, slot]
+                three = np.nonzero(resource == -1)[0]
+                two = np.nonzero(resource != -1)[0]
+                for node in nodes:
+                    self.node_rates[three, node] = np.minimum(
+                        self.node_rates[three, node], 3
+                    )
+                    self.node_rates[two, node, resource[two]] = 2
+        self._index_numbers()
+        return self
+
+    def _index_numbers(self):
+        """Fills number_tiles: [game, dice number] => producing tiles (padded)"""
+        T = self.num_tiles
+        numbers = self.tile_numbers[:, :T]
+        width = max(1, max(int((numbers == n).sum(axis=1).max()) for n in range(2, 13)))
+        self.number_tiles = np.full((self.num_games, 13, width), T, np.int32)
+        for number in range(2, 13):
+            matches = numbers == number
+            order = np.argsort(~matches, axis=1, kind="stable")[:, :width]
+            found = np.take_along_axis(matches, order, axis=1)
+            self.number_tiles[:, number] = np.where(found, order, T)
+
+    def copy(self) -> "BatchState":
+        state = BatchState.__new__(BatchState)
+        state.__dict__.update(self.__dict__)
+        for field in GAME_FIELDS:
+            setattr(state, field, getattr(self, field).copy())
+        state.colors = list(self.colors)
+        return state
+
+    def take(self, games: np.ndarray) -> "BatchState":
+        """New batch with only the given games (indexes), in that order"""
+        state = BatchState.__new__(BatchState)
+        state.__dict__.update(self.__dict__)
+        for field in GAME_FIELDS:
+            setattr(state, field, getattr(self, field)[games])
+        state.colors = [self.colors[g] for g in games]
+        return state
+
+    # ===== Move generation
+    def legal_mask(self, games: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean [len(games), num_slots] mask of playable actions.
+
+        Args:
+            games (np.ndarray, optional): indexes of games to look at.
+                Defaults to None (all of them).
+        """
+        if games is None:
+            games = np.arange(self.num_games)
+        G, P, R = len(games), self.num_players, NUM_RESOURCES
+        N, E = self.num_nodes, self.num_edges
+        player = self.current_player[games]
+        prompt = self.prompt[games]
+        offsets = self.slot_offsets
+        mask = np.zeros((G, self.num_slots), bool)
+        roads = mask[:, offsets[BUILD_ROAD] : offsets[BUILD_ROAD] + E]
+        settlements = mask[:, offsets[BUILD_SETTLEMENT] : offsets[BUILD_SETTLEMENT] + N]
+
+        hand = self.hands[games, player]
+        is_road_building = self.is_road_building[games]
+        turn = (prompt == PLAY_TURN) & ~is_road_building
+        road_building = (prompt == PLAY_TURN) & is_road_building
+        rolled = self.has_rolled[games, player]
+        main = turn & rolled
+        mask[:, offsets[ROLL]] = turn & ~rolled
+        mask[:, offsets[END_TURN]] = main
+
+        can_road = main & (hand[:, 0] >= 1) & (hand[:, 1] >= 1)
+        can_settle = (
+            can_road
+            & (hand[:, 2] >= 1)
+            & (hand[:, 3] >= 1)
+            & (self.settlements_available[games, player] > 0)
+        )
+        can_city = (
+            main
+            & (hand[:, 3] >= 2)
+            & (hand[:, 4] >= 3)
+            & (self.cities_available[games, player] > 0)
+        )
+        mask[:, offsets[BUY_DEVELOPMENT_CARD]] = (
+            main
+            & (hand[:, 2] >= 1)
+            & (hand[:, 3] >= 1)
+            & (hand[:, 4] >= 1)
+            & (self.dev_deck_size[games] > 0)
+        )
+        # Development cards (can be played before rolling)
+        playable = (
+            (self.dev_hands[games, player][:, PLAYABLE_DEV_INDEXES] >= 1)
+            & self.owned_at_start[games, player]
+            & (turn & ~self.played_dev_in_turn[games, player])[:, None]
+        )
+        mask[:, offsets[PLAY_KNIGHT_CARD]] = playable[:, KNIGHT_INDEX]
+        mask[:, offsets[PLAY_MONOPOLY] : offsets[PLAY_MONOPOLY] + R] = playable[
+            :, MONOPOLY_INDEX, None
+        ]
+
+        # Below, only rows where some option could be legal are looked at.
+        rows = np.flatnonzero(
+            can_road | road_building | playable[:, ROAD_BUILDING_INDEX]
+        )
+        if len(rows) > 0:
+            road_ok = self._buildable_edges(games[rows])
+            roads[rows] = road_ok & (can_road | road_building)[rows, None]
+            mask[rows, offsets[PLAY_ROAD_BUILDING]] = playable[
+                rows, ROAD_BUILDING_INDEX
+            ] & road_ok.any(axis=1)
+        rows = np.nonzero(prompt == INITIAL_ROAD)[0]
+        if len(rows) > 0:
+            last = self.last_settlement[games[rows], None]
+            touching = (self.edge_a == last) | (self.edge_b == last)
+            roads[rows] = (self.edge_owner[games[rows], :-1] == -1) & touching
+
+        initial_settlement = prompt == INITIAL_SETTLEMENT
+        rows = np.nonzero(can_settle | initial_settlement)[0]
+        if len(rows) > 0:
+            subset = games[rows]
+            settlements[rows] = self.buildable_nodes[subset, :-1] & (
+                self.reach[subset, player[rows]] | initial_settlement[rows, None]
+            )
+        rows = np.nonzero(can_city)[0]
+        if len(rows) > 0:
+            subset = games[rows]
+            mask[rows, offsets[BUILD_CITY] : offsets[BUILD_CITY] + N] = (
+                self.node_owner[subset] == player[rows, None]
+            ) & ~self.node_is_city[subset]
+
+        rows = np.nonzero(playable[:, YEAR_OF_PLENTY_INDEX])[0]
+        if len(rows) > 0:
+            start = offsets[PLAY_YEAR_OF_PLENTY]
+            mask[rows, start : start + len(YEAR_OF_PLENTY_OPTIONS)] = (
+                self._year_of_plenty_mask(games[rows])
+            )
+
+        # Maritime trades: give (hand >= rate) x get (bank > 0), give != get
+        rows = np.nonzero(main & (hand.max(axis=1) >= 2))[0]
+        if len(rows) > 0:
+            subset = games[rows]
+            trades = (
+                (hand[rows] >= self.rates[subset, player[rows]])[:, :, None]
+                & (self.bank[subset] > 0)[:, None, :]
+                & ~np.eye(R, dtype=bool)
+            )
+            start = offsets[MARITIME_TRADE]
+            mask[rows, start : start + R * R] = trades.reshape(len(rows), R * R)
+
+        # Robber: (tile, victim) with victim 0 meaning no one to steal from
+        rows = np.nonzero(prompt == MOVING_ROBBER)[0]
+        if len(rows) > 0:
+            subset = games[rows]
+            stealable = (self.hands[subset].sum(axis=2) >= 1) & (
+                np.arange(P) != player[rows, None]
+            )
+            victims = (self.tile_weights[subset, :-1] > 0) & stealable[:, None, :]
+            options = np.concatenate(
+                [~victims.any(axis=2, keepdims=True), victims], axis=2
+            )
+            options &= (np.arange(self.num_tiles) != self.robber_tile[subset, None])[
+                :, :, None
+            ]
+            mask[rows, offsets[MOVE_ROBBER] :] = options.reshape(len(rows), -1)
+        return mask
+
+    def _buildable_edges(self, games):
+        """[len(games), num_edges] mask of edges current player could build"""
+        player = self.current_player[games]
+        reach = self.reach[games, player]
+        return (
+            (self.edge_owner[games, :-1] == -1)
+            & (reach[:, self.edge_a] | reach[:, self.edge_b])
+            & (self.roads_available[games, player] > 0)[:, None]
+        )
+
+    def _year_of_plenty_mask(self, games):
+        """Same options as RolloutState._year_of_plenty_actions"""
+        bank = self.bank[games]
+        pairs = np.zeros((len(games), len(YEAR_OF_PLENTY_OPTIONS)), bool)
+        singles = np.zeros((len(games), NUM_RESOURCES), bool)
+        for i, j in YEAR_OF_PLENTY_PAIRS:
+            needed = 2 if i == j else 1
+            ok = (bank[:, i] >= needed) & (bank[:, j] >= needed)
+            pairs[:, YEAR_OF_PLENTY_OPTIONS.index((i, j))] = ok
+            singles[:, i] |= ~ok & (bank[:, i] >= 1)
+            singles[:, j] |= ~ok & (bank[:, j] >= 1)
+        pairs[:, len(YEAR_OF_PLENTY_PAIRS) :] = singles
+        return pairs
+
+    # ===== Policies
+    def slot_weights(self, weights: Optional[Mapping[ActionType, float]]) -> np.ndarray:
+        """Per-slot sampling weights out of per-ActionType ones (default 1)"""
+        if weights is None:
+            return np.ones(self.num_slots)
+        type_weights = np.array([weights.get(t, 1) for t in ACTION_TYPES], float)
+        return type_weights[self.slot_types]
+
+    def sample(self, mask: np.ndarray, slot_weights: np.ndarray) -> np.ndarray:
+        """One slot per game, with probability proportional to its weight
+        among legal ones. Games without legal slots get -1."""
+        # Works on the (few) legal entries only, laid out row after row.
+        rows, slots = np.nonzero(mask)
+        cumulative = np.concatenate(([0.0], np.cumsum(slot_weights[slots])))
+        ends = np.cumsum(np.bincount(rows, minlength=len(mask)))
+        starts = np.concatenate(([0], ends[:-1]))
+        before = cumulative[starts]
+        threshold = before + self.rng.random(len(mask)) * (cumulative[ends] - before)
+        picks = np.searchsorted(cumulative, threshold, side="right") - 1
+        # Guard against float rounding landing outside of the game's entries
+        picks = np.clip(picks, starts, np.maximum(ends - 1, starts))
+
+        result = np.full(len(mask), -1)
+        legal = ends > starts
+        result[legal] = slots[picks[legal]]
+        return result
+
+    # ===== State transitions
+    def apply(self, slots: np.ndarray):
+        """Applies the action at slots[g] to each game g (-1 to skip)"""
+        acting = np.nonzero(slots >= 0)[0]
+        types = self.slot_types[slots[acting]]
+        params = self.slot_params[slots[acting]]
+        for action_type in np.unique(types):
+            selected = types == action_type
+            games = acting[selected]
+            self.TRANSITIONS[action_type](self, games, params[selected])
+
+    def _end_turn(self, games, _):
+        player = self.current_player[games]
+        self.played_dev_in_turn[games, player] = False
+        self.has_rolled[games, player] = False
+        self.owned_at_start[games, player] = (
+            self.dev_hands[games, player][:, PLAYABLE_DEV_INDEXES] > 0
+        )
+        self._advance_turn(games, 1)
+        self.prompt[games] = PLAY_TURN
+
+    def _advance_turn(self, games, direction):
+        player = (self.current_player[games] + direction) % self.num_players
+        self.current_player[games] = player
+        self.current_turn[games] = player
+        self.num_turns[games] += 1
+
+    def _roll(self, games, _):
+        dices = self.rng.integers(1, 7, size=(len(games), 2))
+        self.roll(games, dices.sum(axis=1))
+
+    def roll(self, games: np.ndarray, numbers: np.ndarray):
+        """Carries out a ROLL of current player of games with given dice sums"""
+        self.has_rolled[games, self.current_player[games]] = True
+        sevens = games[numbers == 7]
+        games, numbers = games[numbers != 7], numbers[numbers != 7]
+
+        T = self.num_tiles
+        tiles = self.number_tiles[games, numbers]
+        tiles[tiles == self.robber_tile[games, None]] = T
+        payout = np.zeros((len(games), self.num_players, NUM_RESOURCES), np.int32)
+        rows = np.arange(len(games))
+        for tile in tiles.T:
+            producing = tile != T
+            payout[rows, :, self.tile_resources[games, tile]] += (
+                self.tile_weights[games, tile] * producing[:, None]
+            )
+        # Depleted resources aren't yielded to anyone
+        payout *= (payout.sum(axis=1) <= self.bank[games])[:, None, :]
+        self.hands[games] += payout
+        self.bank[games] -= payout.sum(axis=1)
+        self.prompt[games] = PLAY_TURN
+
+        if len(sevens) > 0:
+            sizes = self.hands[sevens].sum(axis=2)
+            for i, player in zip(*np.nonzero(sizes > self.discard_limit)):
+                game = sevens[i]
+                discarded = self.rng.multivariate_hypergeometric(
+                    self.hands[game, player], sizes[i, player] // 2
+                )
+                self.hands[game, player] -= discarded
+                self.bank[game] += discarded
+            self.prompt[sevens] = MOVING_ROBBER
+
+    def _move_robber(self, games, params):
+        stride = self.num_players + 1
+        self.robber_tile[games] = params // stride
+        self.prompt[games] = PLAY_TURN
+        victims = params % stride - 1
+        stealing = victims >= 0
+        games, victims = games[stealing], victims[stealing]
+        if len(games) > 0:
+            victim_hands = self.hands[games, victims]
+            pick = (self.rng.random(len(games)) * victim_hands.sum(axis=1)).astype(
+                np.int32
+            )
+            resource = (np.cumsum(victim_hands, axis=1) <= pick[:, None]).sum(axis=1)
+            self.hands[games, victims, resource] -= 1
+            self.hands[games, self.current_player[games], resource] += 1
+
+    def _pay(self, games, player, cost):
+        self.hands[games, player] -= cost
+        self.bank[games] += cost
+
+    def _build_city(self, games, nodes):
+        player = self.current_player[games]
+        self._pay(games, player, CITY_COST_FREQDECK)
+        self.node_is_city[games, nodes] = True
+        self.tile_weights[games[:, None], self.node_tiles[nodes], player[:, None]] += 1
+        self.settlements_available[games, player] += 1
+        self.cities_available[games, player] -= 1
+        self.victory_points[games, player] += 1
+        self.actual_victory_points[games, player] += 1
+
+    def _buy_development_card(self, games, _):
+        player = self.current_player[games]
+        self._pay(games, player, DEVELOPMENT_CARD_COST_FREQDECK)
+        self.dev_deck_size[games] -= 1
+        cards = self.dev_deck[games, self.dev_deck_size[games]]
+        self.dev_hands[games, player, cards] += 1
+        self.actual_victory_points[games, player] += cards == VICTORY_POINT_INDEX
+
+    def _play_dev(self, games, player, dev_index):
+        self.dev_hands[games, player, dev_index] -= 1
+        self.played_dev_in_turn[games, player] = True
+
+    def _play_knight(self, games, _):
+        player = self.current_player[games]
+        self._play_dev(games, player, KNIGHT_INDEX)
+        self.knights_played[games, player] += 1
+        self.prompt[games] = MOVING_ROBBER
+
+        size = self.knights_played[games, player]
+        previous = self.army_owner[games]
+        previous_size = self.knights_played[games, np.maximum(previous, 0)]
+        takes = (size >= 3) & (
+            (previous == -1) | ((previous != player) & (previous_size < size))
+        )
+        games, player, previous = games[takes], player[takes], previous[takes]
+        self.army_owner[games] = player
+        self.victory_points[games, player] += 2
+        self.actual_victory_points[games, player] += 2
+        had = previous != -1
+        self.victory_points[games[had], previous[had]] -= 2
+        self.actual_victory_points[games[had], previous[had]] -= 2
+
+    def _play_year_of_plenty(self, games, params):
+        player = self.current_player[games]
+        cards = YEAR_OF_PLENTY_CARDS[params]
+        self.hands[games, player] += cards
+        self.bank[games] -= cards
+        self._play_dev(games, player, YEAR_OF_PLENTY_INDEX)
+
+    def _play_monopoly(self, games, resources):
+        player = self.current_player[games]
+        total = self.hands[games, :, resources].sum(axis=1)
+        self.hands[games, :, resources] = 0
+        self.hands[games, player, resources] = total
+        self._play_dev(games, player, MONOPOLY_INDEX)
+
+    def _play_road_building(self, games, _):
+        self._play_dev(games, self.current_player[games], ROAD_BUILDING_INDEX)
+        self.is_road_building[games] = True
+        self.free_roads_available[games] = 2
+
+    def _maritime_trade(self, games, params):
+        player = self.current_player[games]
+        give, get = np.divmod(params, NUM_RESOURCES)
+        rate = self.rates[games, player, give]
+        self.hands[games, player, give] -= rate
+        self.bank[games, give] += rate
+        self.hands[games, player, get] += 1
+        self.bank[games, get] -= 1
+
+    def _build_settlement(self, games, nodes):
+        player = self.current_player[games]
+        self.node_owner[games, nodes] = player
+        self.tile_weights[games[:, None], self.node_tiles[nodes], player[:, None]] += 1
+        self.settlements_available[games, player] -= 1
+        self.victory_points[games, player] += 1
+        self.actual_victory_points[games, player] += 1
+        self.rates[games, player] = np.minimum(
+            self.rates[games, player], self.node_rates[games, nodes]
+        )
+        self.buildable_nodes[games, nodes] = False
+        self.buildable_nodes[games[:, None], self.node_neighbors[nodes]] = False
+
+        initial = self.is_initial_build_phase[games]
+        if initial.any():
+            i_games, i_nodes, i_player = games[initial], nodes[initial], player[initial]
+            self.reach[i_games, i_player, i_nodes] = True
+            second = (self.node_owner[i_games] == i_player[:, None]).sum(axis=1) == 2
+            s_games, s_player = i_games[second], i_player[second]
+            for tile in self.node_tiles[i_nodes[second]].T:
+                resource = self.tile_resources[s_games, tile]
+                has = (tile != self.num_tiles) & (resource != -1)
+                self.hands[s_games[has], s_player[has], resource[has]] += 1
+                self.bank[s_games[has], resource[has]] -= 1
+            self.last_settlement[i_games] = i_nodes
+            self.prompt[i_games] = INITIAL_ROAD
+
+        initial = ~initial
+        if initial.any():
+            games, nodes, player = games[initial], nodes[initial], player[initial]
+            self._pay(games, player, SETTLEMENT_COST_FREQDECK)
+            # Enemy roads passing through node (2 edges of same owner) get cut
+            owners = self.edge_owner[games[:, None], self.node_edges[nodes]]
+            for other in range(self.num_players):
+                cut = ((owners == other).sum(axis=1) == 2) & (player != other)
+                for game, node in zip(games[cut], nodes[cut]):
+                    self._cut_roads(game, node)
+
+    def _cut_roads(self, game, node):
+        """Same as RolloutState._maybe_cut_roads for a single game"""
+        topology = self.topology
+        edge_owner = self.edge_owner[game].tolist()
+        node_owner = self.node_owner[game].tolist()
+        player = node_owner[node]
+        ends_by_player: List[List[int]] = [[] for _ in range(self.num_players)]
+        for edge, other_node in topology.node_edges[node]:
+            owner = edge_owner[edge]
+            if owner != -1 and owner != player:
+                ends_by_player[owner].append(other_node)
+        for other, ends in enumerate(ends_by_player):
+            if len(ends) == 2:
+                for end in ends:
+                    nodes = dfs_walk(topology, edge_owner, node_owner, end, other)
+                    self.reach[game, other, list(nodes)] = True
+
+        # road_lengths may be stale (lower bounds); refresh them all.
+        for other in range(self.num_players):
+            self.road_lengths[game, other] = longest_road_length(
+                topology,
+                edge_owner,
+                node_owner,
+                other,
+                np.nonzero(self.reach[game, other])[0].tolist(),
+            )
+        previous_owner = self.road_owner[game]
+        best = int(np.argmax(self.road_lengths[game]))
+        self.road_owner[game] = best
+        self.road_length[game] = self.road_lengths[game, best]
+        self._transfer_road_points(game, previous_owner)
+
+    def _transfer_road_points(self, game, previous_owner):
+        owner = self.road_owner[game]
+        if owner == -1 or owner == previous_owner:
+            return
+        self.victory_points[game, owner] += 2
+        self.actual_victory_points[game, owner] += 2
+        if previous_owner != -1:
+            self.victory_points[game, previous_owner] -= 2
+            self.actual_victory_points[game, previous_owner] -= 2
+
+    def _build_road(self, games, edges):
+        player = self.current_player[games]
+        self.edge_owner[games, edges] = player
+        self.roads_available[games, player] -= 1
+
+        a, b = self.edge_a[edges], self.edge_b[edges]
+        a_owner, b_owner = self.node_owner[games, a], self.node_owner[games, b]
+        a_enemy = (a_owner != -1) & (a_owner != player)
+        b_enemy = (b_owner != -1) & (b_owner != player)
+        add_b = self.reach[games, player, a] & ~b_enemy
+        add_a = ~add_b & self.reach[games, player, b] & ~a_enemy
+        self.reach[games, player, b] |= add_b
+        self.reach[games, player, a] |= add_a
+
+        initial = self.is_initial_build_phase[games]
+        if initial.any():
+            self._next_initial_prompt(games[initial])
+
+        free = (
+            ~initial
+            & self.is_road_building[games]
+            & (self.free_roads_available[games] > 0)
+        )
+        if free.any():
+            f_games = games[free]
+            self.free_roads_available[f_games] -= 1
+            any_road = self._buildable_edges(f_games).any(axis=1)
+            done = f_games[(self.free_roads_available[f_games] == 0) | ~any_road]
+            self.is_road_building[done] = False
+            self.free_roads_available[done] = 0
+
+        paid = ~initial & ~free
+        if paid.any():
+            self._pay(games[paid], player[paid], ROAD_COST_FREQDECK)
+
+        # Only a player with more roads than current longest can take/extend it
+        games, player, edges = games[~initial], player[~initial], edges[~initial]
+        num_roads = (self.edge_owner[games] == player[:, None]).sum(axis=1)
+        candidates = (num_roads >= 5) & (num_roads > self.road_length[games])
+        for game, p, edge in zip(
+            games[candidates], player[candidates], edges[candidates]
+        ):
+            self._maintain_longest_road(game, int(p), int(edge))
+
+    def _next_initial_prompt(self, games):
+        """Snake order of RolloutState._build_road initial phase"""
+        P = self.num_players
+        num_buildings = (self.node_owner[games] != -1).sum(axis=1)
+        forward = games[num_buildings < P]
+        self._advance_turn(forward, 1)
+        backward = games[(num_buildings > P) & (num_buildings < 2 * P)]
+        self._advance_turn(backward, -1)
+        self.prompt[games] = INITIAL_SETTLEMENT
+        finished = games[num_buildings == 2 * P]
+        self.is_initial_build_phase[finished] = False
+        self.prompt[finished] = PLAY_TURN
+
+    def _maintain_longest_road(self, game, player, edge):
+        # Skipped recomputations (see _build_road) never involved lengths
+        # that could take the award, so trails through edge are enough.
+        length = max(
+            self.road_lengths[game, player],
+            longest_road_through(
+                self.topology,
+                self.edge_owner[game].tolist(),
+                self.node_owner[game].tolist(),
+                player,
+                set(np.nonzero(self.reach[game, player])[0].tolist()),
+                edge,
+            ),
+        )
+        self.road_lengths[game, player] = max(self.road_lengths[game, player], length)
+        previous_owner = self.road_owner[game]
+        if length >= 5 and length > self.road_length[game]:
+            self.road_owner[game] = player
+            self.road_length[game] = length
+        self._transfer_road_points(game, previous_owner)
+
+    TRANSITIONS = {
+        END_TURN: _end_turn,
+        ROLL: _roll,
+        MOVE_ROBBER: _move_robber,
+        BUILD_ROAD: _build_road,
+        BUILD_SETTLEMENT: _build_settlement,
+        BUILD_CITY: _build_city,
+        BUY_DEVELOPMENT_CARD: _buy_development_card,
+        PLAY_KNIGHT_CARD: _play_knight,
+        PLAY_YEAR_OF_PLENTY: _play_year_of_plenty,
+        PLAY_MONOPOLY: _play_monopoly,
+        PLAY_ROAD_BUILDING: _play_road_building,
+        MARITIME_TRADE: _maritime_trade,
+    }
+
+    # ===== Playouts
+    def winners(self) -> np.ndarray:
+        """Seating index of winner per game (last one over vps_to_win, as
+        Game.winning_color), -1 if none yet"""
+        won = self.actual_victory_points >= self.vps_to_win
+        last = self.num_players - 1 - np.argmax(won[:, ::-1], axis=1)
+        return np.where(won.any(axis=1), last, -1)
+
+    def step(self, slot_weights: np.ndarray, games: Optional[np.ndarray] = None):
+        """Samples (see sample) and applies an action in each of the games.
+
+        Args:
+            slot_weights (np.ndarray): see slot_weights
+            games (np.ndarray, optional): indexes of games to advance.
+                Defaults to None (all of them).
+        """
+        if games is None:
+            games = np.arange(self.num_games)
+        slots = np.full(self.num_games, -1)
+
+        # Most plies are a forced ROLL or END_TURN; skip masks for those.
+        player = self.current_player[games]
+        hand = self.hands[games, player]
+        turn = (self.prompt[games] == PLAY_TURN) & ~self.is_road_building[games]
+        rolled = self.has_rolled[games, player]
+        no_dev = (
+            ~(
+                self.owned_at_start[games, player]
+                & (self.dev_hands[games, player][:, PLAYABLE_DEV_INDEXES] >= 1)
+            ).any(axis=1)
+            | self.played_dev_in_turn[games, player]
+        )
+        broke = (
+            ((hand[:, 0] == 0) | (hand[:, 1] == 0))
+            & ((hand[:, 3] < 2) | (hand[:, 4] < 3))
+            & ((hand[:, 2] == 0) | (hand[:, 3] == 0) | (hand[:, 4] == 0))
+            & (hand < self.rates[games, player]).all(axis=1)
+        )
+        forced_roll = turn & ~rolled & no_dev
+        forced_end = turn & rolled & no_dev & broke
+        slots[games[forced_roll]] = self.slot_offsets[ROLL]
+        slots[games[forced_end]] = self.slot_offsets[END_TURN]
+
+        games = games[~forced_roll & ~forced_end]
+        if len(games) > 0:
+            slots[games] = self.sample(self.legal_mask(games), slot_weights)
+        self.apply(slots)
+
+    def play(
+        self,
+        weights: Optional[Mapping[ActionType, float]] = None,
+        turns_limit: int = TURNS_LIMIT,
+    ) -> np.ndarray:
+        """Plays out (mutating) all games at random until each one ends.
+
+        Finished games are dropped from the arrays as the batch goes (so
+        afterwards the batch only keeps the unfinished ones, if any).
+
+        Args:
+            weights (Mapping[ActionType, float], optional): Relative weight
+                to sample actions of each type with (missing types weigh 1).
+                Defaults to None (uniformly at random, like RandomPlayer).
+            turns_limit (int, optional): Same as TURNS_LIMIT in Game.
+
+        Returns:
+            np.ndarray: seating index of winner per (original) game, -1 if
+                truncated at turns_limit.
+        """
+        slot_weights = self.slot_weights(weights)
+        results = np.full(self.num_games, -1)
+        ids = np.arange(self.num_games)
+        active = np.ones(self.num_games, bool)
+        state = self
+        while True:
+            winners = state.winners()
+            over = active & ((winners != -1) | (state.num_turns >= turns_limit))
+            results[ids[over]] = winners[over]
+            active &= ~over
+            if not active.any():
+                break
+            if 4 * np.count_nonzero(~active) > len(active):
+                kept = np.nonzero(active)[0]
+                state, ids, active = state.take(kept), ids[kept], active[kept]
+            state.step(slot_weights, np.nonzero(active)[0])
+        self.__dict__.update(state.take(np.nonzero(active)[0]).__dict__)
+        return results
+
+
+def _padded(lists: List[List[int]], fill: int) -> np.ndarray:
+    width = max(len(values) for values in lists)
+    array = np.full((len(lists), width), fill, np.int64)
+    for i, values in enumerate(lists):
+        array[i, : len(values)] = values
+    return array
+
+
+def play_batch(
+    num_games: int,
+    num_players: int = 4,
+    weights: Optional[Mapping[ActionType, float]] = None,
+    catan_map: Optional[CatanMap] = None,
+    vps_to_win: int = 10,
+    turns_limit: int = TURNS_LIMIT,
+    seed: Optional[int] = None,
+) -> List[Optional[Color]]:
+    """Plays num_games new games at random, all in lockstep.
+
+    Returns:
+        List[Optional[Color]]: winning color per game (None if truncated),
+            seated as list(Color)[:num_players].
+    """
+    batch = BatchState.new_games(
+        num_games, num_players, catan_map, vps_to_win=vps_to_win, seed=seed
+    )
+    colors = list(Color)[:num_players]
+    winners = batch.play(weights, turns_limit)
+    return [None if w == -1 else colors[w] for w in winners]
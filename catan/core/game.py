@@ -8,7 +8,7 @@ import pickle
 from typing import List, Union, Optional
 
 from catan.core.models.enums import Action, ActionPrompt, ActionType
-from catan.core.state import State, apply_action
+from catan.core.state import ChanceStreams, State, apply_action
 from catan.core.state_functions import player_key, player_has_rolled
 from catan.core.models.map import CatanMap
 from catan.core.models.player import Color, Player
@@ -33,9 +33,12 @@ class Game:
         players: List[Player],
         seed: int = None,
         discard_limit: int = 7,
+        max_discard_options: int = 0,
         vps_to_win: int = 10,
         catan_map: Optional[CatanMap] = None,
         initialize: bool = True,
+        shuffle_players: bool = True,
+        chance: Optional[ChanceStreams] = None,
     ):
         """Creates a game (doesn't run it).
 
@@ -43,9 +46,17 @@ class Game:
             players (List[Player]): list of players, should be at most 4.
             seed (int, optional): Random seed to use (for reproducing games). Defaults to None.
             discard_limit (int, optional): Discard limit to use. Defaults to 7.
+            max_discard_options (int, optional): Max number of explicit DISCARD
+                actions to offer, best-ranked first. 0 discards at random instead
+                (no decision). Defaults to 0.
             vps_to_win (int, optional): Victory Points needed to win. Defaults to 10.
             catan_map (CatanMap, optional): Map to use. Defaults to None.
             initialize (bool, optional): Whether to initialize. Defaults to True.
+            shuffle_players (bool, optional): Seat players in random order. If
+                False, they play in the given order. Defaults to True.
+            chance (ChanceStreams, optional): Randomness of chance events (dice,
+                steals, dev deck, random discards). Defaults to None (global
+                random module, seeded with seed).
         """
         if initialize:
             self.seed = seed
@@ -58,7 +69,14 @@ class Game:
                 self.id = str(uuid.UUID(version=4, int=seed))
 
             self.vps_to_win = vps_to_win
-            self.state = State(players, catan_map, discard_limit=discard_limit)
+            self.state = State(
+                players,
+                catan_map,
+                discard_limit=discard_limit,
+                max_discard_options=max_discard_options,
+                shuffle_players=shuffle_players,
+                chance=chance,
+            )
 
     def finished(self):
         return not (self.winning_color() is None and self.state.num_turns < TURNS_LIMIT)
@@ -31,6 +31,9 @@ def action_from_json(data):
         victim = Color[victim] if victim else None
         value = (coordinate, victim, None)
         action = Action(color, action_type, value)
+    elif action_type == ActionType.DISCARD:
+        value = None if data[2] is None else tuple(data[2])
+        action = Action(color, action_type, value)
     elif action_type == ActionType.MARITIME_TRADE:
         value = tuple(data[2])
         action = Action(color, action_type, value)
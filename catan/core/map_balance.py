@@ -0,0 +1,178 @@
+"""
+Vectorized generation of "balanced" maps, for fairer bot ladders.
+
+Maps are sampled in NumPy batches (same codes as MapPool), scored in bulk
+over the template's tile adjacency and only those within BalanceCriteria
+are kept. Metrics (per map):
+
+    adjacent_red: pairs of neighboring tiles that are both 6 or 8.
+    pip_spread: max - min over resources of the mean pips (dots on the
+        number token, i.e. ways to roll it out of 36) per tile.
+    port_pips: max over 2:1 ports of the pips of the port's own resource on
+        the tiles touching the port (high values let a single settlement
+        farm and trade that resource).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from catan.core.map_pool import MapPool
+from catan.core.models.enums import RESOURCES
+from catan.core.models.map import (
+    BASE_MAP_TEMPLATE,
+    DICE_PROBAS,
+    LandTile,
+    MapTemplate,
+    Port,
+    PORT_DIRECTION_TO_NODEREFS,
+    get_template_topology,
+)
+
+# Pips by number (0 for the desert's 0)
+PIPS = np.array([round(DICE_PROBAS[n] * 36) if n > 1 else 0 for n in range(13)])
+
+
+@dataclass(frozen=True)
+class BalanceCriteria:
+    """Bounds a map must satisfy to be accepted (None disables a bound)."""
+
+    max_adjacent_red: Optional[int] = 0
+    max_pip_spread: Optional[float] = 1.0
+    max_port_pips: Optional[int] = 5
+
+
+class MapBalancer:
+    """Scores and filters batches of maps of a template.
+
+    Example:
+        balancer = MapBalancer(seed=0)
+        pool = balancer.generate(10_000)  # MapPool of accepted maps
+        print(balancer.maps_per_second)
+    """
+
+    def __init__(
+        self,
+        criteria: BalanceCriteria = BalanceCriteria(),
+        map_template: MapTemplate = BASE_MAP_TEMPLATE,
+        seed: Union[int, np.random.Generator, None] = None,
+    ):
+        self.criteria = criteria
+        self.map_template = map_template
+        self.rng = np.random.default_rng(seed)
+
+        topology = get_template_topology(map_template)
+        land = [e for e in topology.entries if e[1] == LandTile]
+        ports = [e for e in topology.entries if e[1] == Port]
+        tile_nodes = [set(nodes.values()) for _, _, _, nodes, _ in land]
+        self.num_tiles = len(land)
+
+        # Tiles sharing an edge share 2 nodes. Upper triangle, to count pairs.
+        self.tile_adjacency = np.array(
+            [
+                [i < j and len(a & b) == 2 for j, b in enumerate(tile_nodes)]
+                for i, a in enumerate(tile_nodes)
+            ],
+            dtype=np.int32,
+        )
+        # port => touching land tiles
+        self.port_tiles = np.zeros((len(ports), self.num_tiles), dtype=bool)
+        for p, (_, _, direction, nodes, _) in enumerate(ports):
+            port_nodes = {nodes[ref] for ref in PORT_DIRECTION_TO_NODEREFS[direction]}
+            for t, other in enumerate(tile_nodes):
+                self.port_tiles[p, t] = bool(port_nodes & other)
+
+        self.sampled = 0
+        self.accepted = 0
+        self.elapsed = 0.0
+
+    @property
+    def maps_per_second(self) -> float:
+        """Sampled (and scored) maps per second so far."""
+        return self.sampled / self.elapsed if self.elapsed else 0.0
+
+    def scores(self, codes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Balance metrics of a batch of maps.
+
+        Args:
+            codes (np.ndarray): [num_maps, width] map codes (see MapPool)
+
+        Returns:
+            Dict[str, np.ndarray]: metric name => [num_maps] values
+        """
+        T = self.num_tiles
+        resources = codes[:, :T].astype(np.intp)
+        numbers = codes[:, T : 2 * T].astype(np.intp)
+        port_resources = codes[:, 2 * T :].astype(np.intp)
+        pips = PIPS[numbers]
+
+        red = ((numbers == 6) | (numbers == 8)).astype(np.int32)
+        adjacent_red = np.einsum("gi,ij,gj->g", red, self.tile_adjacency, red)
+
+        one_hot = resources[:, :, None] == np.arange(len(RESOURCES))  # [G, T, R]
+        totals = np.einsum("gt,gtr->gr", pips, one_hot)
+        counts = one_hot.sum(axis=1)
+        means = totals / np.maximum(counts, 1)
+        pip_spread = means.max(axis=1) - means.min(axis=1)
+
+        # [G, P, T]: tile touches port and produces the port's resource
+        same_resource = resources[:, None, :] == port_resources[:, :, None]
+        synergy = self.port_tiles & same_resource
+        port_pips = (synergy * pips[:, None, :]).sum(axis=2)
+        port_pips[port_resources == -1] = 0  # 3:1 ports
+        return {
+            "adjacent_red": adjacent_red,
+            "pip_spread": pip_spread,
+            "port_pips": port_pips.max(axis=1, initial=0),
+        }
+
+    def accept(self, codes: np.ndarray) -> np.ndarray:
+        """[num_maps] mask of maps within the criteria."""
+        scores = self.scores(codes)
+        criteria = self.criteria
+        mask = np.ones(len(codes), dtype=bool)
+        if criteria.max_adjacent_red is not None:
+            mask &= scores["adjacent_red"] <= criteria.max_adjacent_red
+        if criteria.max_pip_spread is not None:
+            mask &= scores["pip_spread"] <= criteria.max_pip_spread + 1e-9
+        if criteria.max_port_pips is not None:
+            mask &= scores["port_pips"] <= criteria.max_port_pips
+        return mask
+
+    def generate(
+        self, num_maps: int, batch_size: int = 10_000, max_batches: int = 10_000
+    ) -> MapPool:
+        """Samples batches until num_maps maps are accepted.
+
+        Args:
+            num_maps (int): accepted maps to return
+            batch_size (int, optional): maps sampled per batch. Defaults to 10_000.
+            max_batches (int, optional): give up after this many batches.
+
+        Raises:
+            ValueError: if criteria are too strict to fill num_maps in time.
+
+        Returns:
+            MapPool: accepted maps (use pool[i] for CatanMap objects).
+        """
+        accepted = []
+        found = 0
+        for _ in range(max_batches):
+            if found >= num_maps:
+                break
+            start = time.perf_counter()
+            codes = MapPool.generate(batch_size, self.map_template, self.rng).codes
+            kept = codes[self.accept(codes)]
+            self.elapsed += time.perf_counter() - start
+            self.sampled += len(codes)
+            self.accepted += len(kept)
+            accepted.append(kept)
+            found += len(kept)
+        if found < num_maps:
+            raise ValueError(
+                f"Only {found} of {num_maps} maps accepted after {self.sampled} "
+                "samples. Loosen the criteria or raise max_batches."
+            )
+        return MapPool(np.concatenate(accepted)[:num_maps], self.map_template)
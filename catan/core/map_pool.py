@@ -0,0 +1,151 @@
+"""
+Pre-generated pools of random maps, stored compactly and loaded memory-mapped.
+
+A map of a given MapTemplate is fully described by the resource and number
+of each land tile and the resource of each port (see TemplateTopology), so a
+pool is just an int8 array with one row per map:
+
+    [tile resources (T) | tile numbers (T) | port resources (P)]
+
+where resources are RESOURCES indexes (-1 for desert / 3:1 port) and the
+desert's number is 0. Maps are rebuilt on access, so drawing map i is
+instant and reproducible.
+"""
+
+import os
+import random
+from typing import Iterable, Sequence, Union, overload
+
+import numpy as np
+
+from catan.core.models.enums import RESOURCES
+from catan.core.models.map import (
+    BASE_MAP_TEMPLATE,
+    CatanMap,
+    MapTemplate,
+    get_template_topology,
+)
+
+
+def _resource_index(resource) -> int:
+    return -1 if resource is None else RESOURCES.index(resource)
+
+
+class MapPool(Sequence[CatanMap]):
+    """Sequence of maps of the same template, backed by an int8 array.
+
+    Example:
+        pool = MapPool.generate(10_000, seed=0)
+        pool.save("maps.npy")
+        pool = MapPool.load("maps.npy")  # memory-mapped
+        game = Game(players, catan_map=pool[42])
+    """
+
+    def __init__(
+        self, codes: np.ndarray, map_template: MapTemplate = BASE_MAP_TEMPLATE
+    ):
+        topology = get_template_topology(map_template)
+        self.map_template = map_template
+        self.num_tiles = len(topology.land_coordinates)
+        self.num_ports = len(topology.port_coordinates)
+        width = 2 * self.num_tiles + self.num_ports
+        if codes.ndim != 2 or codes.shape[1] != width:
+            raise ValueError(
+                f"Map codes must have shape (num_maps, {width}) for this template"
+            )
+        self.codes = codes
+
+    @staticmethod
+    def generate(
+        size: int,
+        map_template: MapTemplate = BASE_MAP_TEMPLATE,
+        seed: Union[int, np.random.Generator, None] = None,
+    ) -> "MapPool":
+        """Shuffles size maps at once (same distribution as initialize_tiles).
+
+        Args:
+            size (int): number of maps
+            map_template (MapTemplate, optional): Defaults to BASE_MAP_TEMPLATE.
+            seed (int | np.random.Generator, optional): Seed (or generator to
+                draw from), for reproducible pools.
+        """
+        rng = np.random.default_rng(seed)
+        T = len(get_template_topology(map_template).land_coordinates)
+        if len(map_template.tile_resources) != T:
+            raise ValueError("Template must have one tile resource per land tile")
+        resources = rng.permuted(
+            np.tile(list(map(_resource_index, map_template.tile_resources)), (size, 1)),
+            axis=1,
+        )
+        num_numbered = int(np.count_nonzero(resources[0] != -1))
+        numbers = np.zeros((size, T), np.int8)
+        numbers[resources != -1] = rng.permuted(
+            np.tile(map_template.numbers, (size, 1)), axis=1
+        )[:, :num_numbered].ravel()
+        ports = rng.permuted(
+            np.tile(list(map(_resource_index, map_template.port_resources)), (size, 1)),
+            axis=1,
+        )
+        codes = np.concatenate([resources, numbers, ports], axis=1).astype(np.int8)
+        return MapPool(codes, map_template)
+
+    @staticmethod
+    def from_maps(
+        maps: Iterable[CatanMap], map_template: MapTemplate = BASE_MAP_TEMPLATE
+    ) -> "MapPool":
+        """Encodes existing maps (built from map_template) into a pool."""
+        rows = []
+        for catan_map in maps:
+            tiles = sorted(catan_map.tiles_by_id.values(), key=lambda t: t.id)
+            ports = sorted(catan_map.ports_by_id.values(), key=lambda p: p.id)
+            rows.append(
+                [_resource_index(t.resource) for t in tiles]
+                + [t.number or 0 for t in tiles]
+                + [_resource_index(p.resource) for p in ports]
+            )
+        topology = get_template_topology(map_template)
+        width = 2 * len(topology.land_coordinates) + len(topology.port_coordinates)
+        codes = np.array(rows, dtype=np.int8).reshape(len(rows), width)
+        return MapPool(codes, map_template)
+
+    def save(self, path: Union[str, os.PathLike]):
+        """Writes the pool as a .npy file (see load)."""
+        np.save(path, np.ascontiguousarray(self.codes, dtype=np.int8))
+
+    @staticmethod
+    def load(
+        path: Union[str, os.PathLike],
+        map_template: MapTemplate = BASE_MAP_TEMPLATE,
+        mmap: bool = True,
+    ) -> "MapPool":
+        """Opens a pool written by save. With mmap, maps are only read from
+        disk as they are accessed, so huge pools open instantly."""
+        codes = np.load(path, mmap_mode="r" if mmap else None)
+        if codes.dtype != np.int8:
+            raise ValueError(f"{path} is not a map pool (dtype {codes.dtype})")
+        return MapPool(codes, map_template)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> CatanMap: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "MapPool": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MapPool(self.codes[index], self.map_template)
+
+        T = self.num_tiles
+        row = self.codes[index].tolist()
+        resources = [None if r == -1 else RESOURCES[r] for r in row[:T]]
+        ports = [None if r == -1 else RESOURCES[r] for r in row[2 * T :]]
+        topology = get_template_topology(self.map_template)
+        tiles = topology.build_tiles(resources, row[T : 2 * T], ports)
+        return CatanMap.from_tiles(tiles)
+
+    def sample(self, rng=None) -> CatanMap:
+        """Random map of the pool (rng: a random.Random, defaults to module's)"""
+        return self[(rng or random).randrange(len(self))]
@@ -0,0 +1,119 @@
+"""Persistent (parent-linked) log of actions, cheap to copy.
+
+Each entry points to the entry before it, so copies of a log share the
+whole history and appending to one copy doesn't affect the others.
+Copying and appending are O(1); len() and [-1] are O(1) too, while
+other reads walk back from the end (O(distance to the end)).
+"""
+
+from typing import Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+from catan.core.models.enums import Action
+
+
+class _Entry:
+    __slots__ = ("action", "parent", "length", "prefix")
+
+    def __init__(self, action: Action, parent: Optional["_Entry"]):
+        self.action = action
+        self.parent = parent
+        self.length = 1 if parent is None else parent.length + 1
+        # Tuple of all actions up to (and including) this one, filled lazily
+        # on full reads so that reading again doesn't walk the whole chain.
+        self.prefix: Optional[tuple] = None
+
+
+class ActionLog(Sequence[Action]):
+    """List-like log of actions with O(1) copy and append.
+
+    Supports len(), indexing (also negative), slicing (returns a list),
+    iteration and equality against other sequences (e.g. lists).
+    """
+
+    __slots__ = ("_last",)
+
+    def __init__(self, actions: Iterable[Action] = ()):
+        self._last: Optional[_Entry] = None
+        for action in actions:
+            self.append(action)
+
+    def append(self, action: Action):
+        self._last = _Entry(action, self._last)
+
+    def copy(self) -> "ActionLog":
+        """O(1) copy. Both logs share current history."""
+        log = ActionLog.__new__(ActionLog)
+        log._last = self._last
+        return log
+
+    def to_tuple(self) -> tuple:
+        entry = self._last
+        if entry is None:
+            return ()
+        if entry.prefix is not None:
+            return entry.prefix
+
+        newer: List[Action] = []
+        while entry is not None and entry.prefix is None:
+            newer.append(entry.action)
+            entry = entry.parent
+        newer.reverse()
+        if entry is None:
+            prefix = ()
+        else:
+            prefix = entry.prefix
+            entry.prefix = None  # only keep the newest one, to bound memory
+        self._last.prefix = prefix + tuple(newer)
+        return self._last.prefix
+
+    def __len__(self) -> int:
+        return 0 if self._last is None else self._last.length
+
+    @overload
+    def __getitem__(self, index: int) -> Action:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Action]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Action, List[Action]]:
+        if isinstance(index, slice):
+            return list(self.to_tuple()[index])
+
+        length = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("action log index out of range")
+        entry = self._last
+        while entry.length - 1 != index:  # type: ignore
+            if entry.prefix is not None:  # type: ignore
+                return entry.prefix[index]  # type: ignore
+            entry = entry.parent  # type: ignore
+        return entry.action  # type: ignore
+
+    def __iter__(self) -> Iterator[Action]:
+        return iter(self.to_tuple())
+
+    def __reversed__(self) -> Iterator[Action]:
+        entry = self._last
+        while entry is not None:
+            yield entry.action
+            entry = entry.parent
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ActionLog) and other._last is self._last:
+            return True
+        if not isinstance(other, (ActionLog, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and self.to_tuple() == tuple(other)
+
+    __hash__ = None  # type: ignore  # mutable, like list
+
+    def __repr__(self) -> str:
+        return f"ActionLog({list(self.to_tuple())!r})"
+
+    def __reduce__(self):
+        # Pickle flat (a chain of entries would pickle recursively)
+        return (ActionLog, (self.to_tuple(),))
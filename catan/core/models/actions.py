@@ -3,9 +3,11 @@ Move-generation functions (these return a list of actions that can be taken
 by current player). Main function is generate_playable_actions.
 """
 
+import heapq
+import itertools
 import operator as op
 from functools import reduce
-from typing import Any, Dict, List, Set, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from catan.core.models.decks import (
     CITY_COST_FREQDECK,
@@ -15,6 +17,7 @@ from catan.core.models.decks import (
     freqdeck_contains,
     freqdeck_count,
     freqdeck_from_listdeck,
+    listdeck_from_freqdeck,
 )
 from catan.core.models.enums import (
     RESOURCES,
@@ -86,7 +89,7 @@ def generate_playable_actions(state) -> List[Action]:
             actions.extend(maritime_trade_possibilities(state, color))
         return actions
     elif action_prompt == ActionPrompt.DISCARD:
-        return discard_possibilities(color)
+        return discard_possibilities(state, color)
     else:
         raise RuntimeError("Unknown ActionPrompt: " + str(action_prompt))
 
@@ -96,19 +99,22 @@ def monopoly_possibilities(color) -> List[Action]:
 
 
 def year_of_plenty_possibilities(color, freqdeck: List[int]) -> List[Action]:
-    options: Set[Union[Tuple[FastResource, FastResource], Tuple[FastResource]]] = set()
+    # dict as an ordered set, so options come in the same order in every process
+    options: Dict[
+        Union[Tuple[FastResource, FastResource], Tuple[FastResource]], None
+    ] = {}
     for i, first_card in enumerate(RESOURCES):
         for j in range(i, len(RESOURCES)):
             second_card = RESOURCES[j]  # doing it this way to not repeat
 
             to_draw = freqdeck_from_listdeck([first_card, second_card])
             if freqdeck_contains(freqdeck, to_draw):
-                options.add((first_card, second_card))
+                options[(first_card, second_card)] = None
             else:  # try allowing player select 1 card only.
                 if freqdeck_can_draw(freqdeck, 1, first_card):
-                    options.add((first_card,))
+                    options[(first_card,)] = None
                 if freqdeck_can_draw(freqdeck, 1, second_card):
-                    options.add((second_card,))
+                    options[(second_card,)] = None
 
     return list(
         map(
@@ -180,6 +186,14 @@ def city_possibilities(state, color) -> List[Action]:
 
 
 def robber_possibilities(state, color) -> List[Action]:
+    # Players with cards to steal; the same for every candidate tile.
+    stealable_colors = {
+        candidate_color
+        for candidate_color in state.colors
+        if candidate_color != color  # can't play yourself
+        and player_num_resource_cards(state, candidate_color) >= 1
+    }
+
     actions = []
     for coordinate, tile in state.board.map.land_tiles.items():
         if coordinate == state.board.robber_coordinate:
@@ -187,16 +201,11 @@ def robber_possibilities(state, color) -> List[Action]:
 
         # each tile can yield a (move-but-cant-steal) action or
         #   several (move-and-steal-from-x) actions.
-        to_steal_from = set()  # set of player_indexs
-        for node_id in tile.nodes.values():
-            building = state.board.buildings.get(node_id, None)
-            if building is not None:
-                candidate_color = building[0]
-                if (
-                    player_num_resource_cards(state, candidate_color) >= 1
-                    and color != candidate_color  # can't play yourself
-                ):
-                    to_steal_from.add(candidate_color)
+        to_steal_from = [
+            candidate_color
+            for candidate_color in state.board.tile_buildings[tile.id]
+            if candidate_color in stealable_colors
+        ]
 
         if len(to_steal_from) == 0:
             actions.append(
@@ -224,28 +233,103 @@ def initial_road_possibilities(state, color) -> List[Action]:
     return [Action(color, ActionType.BUILD_ROAD, edge) for edge in buildable_edges]
 
 
-def discard_possibilities(color) -> List[Action]:
-    return [Action(color, ActionType.DISCARD, None)]
-    # TODO: Be robust to high dimensionality of DISCARD
-    # hand = player.resource_deck.to_array()
-    # num_cards = player.resource_deck.num_cards()
-    # num_to_discard = num_cards // 2
+def discard_possibilities(state, color) -> List[Action]:
+    if state.max_discard_options == 0:
+        # Discard randomly (at apply time) so that decision tree doesnt explode.
+        return [Action(color, ActionType.DISCARD, None)]
+
+    hand_freqdeck = get_player_freqdeck(state, color)
+    num_to_discard = sum(hand_freqdeck) // 2
+
+    def remaining_hand_balance(discard_freqdeck):
+        """Prefers discarding surplus cards, keeping a diverse hand"""
+        return -sum((h - d) ** 2 for h, d in zip(hand_freqdeck, discard_freqdeck))
+
+    discards = discard_freqdeck_options(
+        hand_freqdeck,
+        num_to_discard,
+        limit=state.max_discard_options,
+        key=remaining_hand_balance,
+    )
+    return [
+        Action(color, ActionType.DISCARD, tuple(listdeck_from_freqdeck(discard)))
+        for discard in discards
+    ]
 
-    # num_possibilities = ncr(num_cards, num_to_discard)
-    # if num_possibilities > 100:  # if too many, just take first N
-    #     return [Action(player, ActionType.DISCARD, hand[:num_to_discard])]
 
-    # to_discard = itertools.combinations(hand, num_to_discard)
-    # return list(
-    #     map(
-    #         lambda combination: Action(player, ActionType.DISCARD, combination),
-    #         to_discard,
-    #     )
-    # )
+def num_discard_possibilities(hand_freqdeck: List[int], num_to_discard: int) -> int:
+    """Number of distinct discards (sub-multisets of hand of the given size).
+
+    Closed form via inclusion-exclusion over the per-resource caps: counts
+    solutions of d_0 + ... + d_4 = num_to_discard with 0 <= d_i <= hand_i.
+    """
+    total = 0
+    for capped in itertools.product((False, True), repeat=len(hand_freqdeck)):
+        remaining = num_to_discard
+        sign = 1
+        for is_capped, amount in zip(capped, hand_freqdeck):
+            if is_capped:
+                remaining -= amount + 1
+                sign = -sign
+        if remaining >= 0:
+            total += sign * ncr(remaining + len(hand_freqdeck) - 1, remaining)
+    return total
+
+
+def iter_discard_possibilities(
+    hand_freqdeck: List[int], num_to_discard: int
+) -> Iterator[List[int]]:
+    """Lazily yields every distinct discard (as a freqdeck) in lexicographic
+    order of the freqdeck, i.e. discarding the fewest WOODs first.
+
+    Branches that can't complete the discard are pruned, so each discard
+    costs O(1) amortized and memory stays O(len(hand_freqdeck)).
+    """
+    n = len(hand_freqdeck)
+    # cards_after[i]: cards in hand in resources after index i (to prune)
+    cards_after = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        cards_after[i] = cards_after[i + 1] + hand_freqdeck[i]
+    if num_to_discard < 0 or num_to_discard > cards_after[0]:
+        return
+
+    discard = [0] * n
+
+    def walk(i, left):
+        if i == n:
+            yield discard.copy()
+            return
+        lowest = max(0, left - cards_after[i + 1])
+        highest = min(hand_freqdeck[i], left)
+        for amount in range(lowest, highest + 1):
+            discard[i] = amount
+            yield from walk(i + 1, left - amount)
+
+    yield from walk(0, num_to_discard)
+
+
+def discard_freqdeck_options(
+    hand_freqdeck: List[int],
+    num_to_discard: int,
+    limit: Optional[int] = None,
+    key: Optional[Callable[[List[int]], Any]] = None,
+) -> List[List[int]]:
+    """Materializes at most `limit` discards (None means all).
+
+    If `key` is given, returns the top-`limit` discards by it (highest first,
+    ties in lexicographic order); else the first `limit` in lexicographic order.
+    Never holds more than `limit` discards in memory.
+    """
+    discards = iter_discard_possibilities(hand_freqdeck, num_to_discard)
+    if key is None:
+        return list(itertools.islice(discards, limit))
+    if limit is None:
+        return sorted(discards, key=key, reverse=True)
+    return heapq.nlargest(limit, discards, key=key)
 
 
 def ncr(n, r):
-    """n choose r. helper for discard_possibilities"""
+    """n choose r. helper for num_discard_possibilities"""
     r = min(r, n - r)
     numer = reduce(op.mul, range(n, n - r, -1), 1)
     denom = reduce(op.mul, range(1, r + 1), 1)
@@ -268,7 +352,8 @@ def maritime_trade_possibilities(state, color) -> List[Action]:
 
 def inner_maritime_trade_possibilities(hand_freqdeck, bank_freqdeck, port_resources):
     """This inner function is to make this logic more shareable"""
-    trade_offers = set()
+    # dict as an ordered set (hash(None) varies between processes)
+    trade_offers: Dict[Tuple, None] = {}
 
     # Get lowest rate per resource
     rates: Dict[FastResource, int] = {WOOD: 4, BRICK: 4, SHEEP: 4, WHEAT: 4, ORE: 4}
@@ -290,6 +375,6 @@ def inner_maritime_trade_possibilities(hand_freqdeck, bank_freqdeck, port_resour
                     and freqdeck_count(bank_freqdeck, j_resource) > 0
                 ):
                     trade_offer = tuple(resource_out + [j_resource])
-                    trade_offers.add(trade_offer)
+                    trade_offers[trade_offer] = None
 
-    return trade_offers
+    return list(trade_offers)
@@ -4,8 +4,6 @@ from collections import defaultdict
 from typing import Any, Set, Dict, Tuple, List
 import functools
 
-import networkx as nx
-
 from catan.core.models.player import Color
 from catan.core.models.map import (
     DEFAULT_MAP,
@@ -16,15 +14,14 @@ from catan.core.models.map import (
 from catan.core.models.enums import FastBuildingType, SETTLEMENT, CITY
 
 
-STATIC_GRAPH = nx.Graph()
-for tile in DEFAULT_MAP.tiles.values():
-    STATIC_GRAPH.add_nodes_from(tile.nodes.values())
-    STATIC_GRAPH.add_edges_from(tile.edges.values())
+# Graph of the base map's topology. Boards use their map's (board.static_graph).
+STATIC_GRAPH = DEFAULT_MAP.static_graph
 
 
-@functools.lru_cache(1)
-def get_node_distances():
-    return nx.floyd_warshall(STATIC_GRAPH)
+def get_node_distances(catan_map=None):
+    """[N, N] uint8 matrix of edges between nodes (255 if unreachable).
+    Defaults to the base map's. See catan.core.models.node_distances."""
+    return (catan_map or DEFAULT_MAP).node_distances
 
 
 @functools.lru_cache(3)  # None, range(54), range(24)
@@ -45,12 +42,17 @@ class Board:
             datastructure to speed up maintaining longest road computation.
             To be queried by Color. Value is a list of node sets.
         board_buildable_ids (Set[NodeId]): Cache of buildable node ids in board.
+        tile_buildings (Dict[int, Dict[Color, int]]): Cache of buildings touching
+            each land tile. Maps tile id to color to production weight there
+            (1 per settlement, 2 per city).
         road_color (Color): Color of player with longest road.
         road_length (int): Number of roads of longest road
         robber_coordinate (Coordinate): Coordinate where robber is.
+        static_graph (Graph): Node/edge graph of the map (map.static_graph).
     """
 
     def __init__(self, catan_map=None, initialize=True):
+        self.static_graph: Any = None
         self.buildable_subgraph: Any = None
         self.buildable_edges_cache = {}
         self.player_port_resources_cache = {}
@@ -66,6 +68,9 @@ class Board:
             #   nodes in sets are incidental (might not be owned by player)
             self.connected_components: Any = defaultdict(list)
             self.board_buildable_ids = set(self.map.land_nodes)
+            self.tile_buildings: Dict[int, Dict[Color, int]] = {
+                tile.id: dict() for tile in self.map.land_tiles.values()
+            }
             self.road_lengths = defaultdict(int)
             self.road_color = None
             self.road_length = 0
@@ -77,7 +82,8 @@ class Board:
             ).__next__()
 
             # Cache buildable subgraph
-            self.buildable_subgraph = STATIC_GRAPH.subgraph(self.map.land_nodes)
+            self.static_graph = self.map.static_graph
+            self.buildable_subgraph = self.static_graph.subgraph(self.map.land_nodes)
 
     def build_settlement(self, color, node_id, initial_build_phase=False):
         """Adds a settlement, and ensures is a valid place to build.
@@ -101,6 +107,7 @@ class Board:
             raise ValueError("Invalid Settlement Placement: a building exists there")
 
         self.buildings[node_id] = (color, SETTLEMENT)
+        self._add_tile_production(color, node_id)
 
         previous_road_color = self.road_color
         if initial_build_phase:
@@ -108,7 +115,7 @@ class Board:
         else:
             # Maybe cut connected components.
             edges_by_color = defaultdict(list)
-            for edge in STATIC_GRAPH.edges(node_id):
+            for edge in self.static_graph.edges(node_id):
                 edges_by_color[self.roads.get(edge, None)].append(edge)
 
             for edge_color, edges in edges_by_color.items():
@@ -141,7 +148,7 @@ class Board:
                     )
 
         self.board_buildable_ids.discard(node_id)
-        for n in STATIC_GRAPH.neighbors(node_id):
+        for n in self.static_graph.neighbors(node_id):
             self.board_buildable_ids.discard(n)
 
         self.buildable_edges_cache = {}  # Reset buildable_edges
@@ -169,7 +176,7 @@ class Board:
             if self.is_enemy_node(n, color):
                 continue  # end of the road
 
-            neighbors = [v for v in STATIC_GRAPH.neighbors(n) if v not in visited]
+            neighbors = [v for v in self.static_graph.neighbors(n) if v not in visited]
             expandable = [v for v in neighbors if self.roads.get((n, v), None) == color]
             agenda.extend(expandable)
 
@@ -232,6 +239,12 @@ class Board:
             raise ValueError("Invalid City Placement: no player settlement there")
 
         self.buildings[node_id] = (color, CITY)
+        self._add_tile_production(color, node_id)
+
+    def _add_tile_production(self, color, node_id):
+        for tile in self.map.adjacent_tiles[node_id]:
+            weights = self.tile_buildings[tile.id]
+            weights[color] = weights.get(color, 0) + 1
 
     def buildable_node_ids(self, color: Color, initial_build_phase=False):
         if initial_build_phase:
@@ -279,7 +292,7 @@ class Board:
     def find_connected_components(self, color: Color):
         """
         Returns:
-            nx.Graph[]: connected subgraphs. subgraphs
+            List[Set[NodeId]]: connected subgraphs, as sets of nodes. subgraphs
                 might include nodes that color doesnt own (on the way and on ends),
                 just to make it is "closed" and easier for buildable_nodes to operate.
         """
@@ -301,11 +314,15 @@ class Board:
             pickle.dumps(self.connected_components)
         )
         board.board_buildable_ids = self.board_buildable_ids.copy()
+        board.tile_buildings = {
+            tile_id: weights.copy() for tile_id, weights in self.tile_buildings.items()
+        }
         board.road_lengths = self.road_lengths.copy()
         board.road_color = self.road_color
         board.road_length = self.road_length
 
         board.robber_coordinate = self.robber_coordinate
+        board.static_graph = self.static_graph
         board.buildable_subgraph = self.buildable_subgraph
         board.buildable_edges_cache = copy.deepcopy(self.buildable_edges_cache)
         board.player_port_resources_cache = copy.deepcopy(
@@ -353,7 +370,7 @@ def longest_acyclic_path(board: Board, node_set: Set[int], color: Color):
             node, path_thus_far = agenda.pop()
 
             able_to_navigate = False
-            for neighbor_node in STATIC_GRAPH.neighbors(node):
+            for neighbor_node in board.static_graph.neighbors(node):
                 edge = tuple(sorted((node, neighbor_node)))
 
                 # Must travel on a friendly road.
@@ -1,3 +1,4 @@
+from collections import deque
 from enum import Enum
 
 
@@ -32,10 +33,7 @@ def add(acoord, bcoord):
 
 def num_tiles_for(layer):
     """Including inner-layer tiles"""
-    if layer == 0:
-        return 1
-
-    return 6 * layer + num_tiles_for(layer - 1)
+    return 3 * layer * (layer + 1) + 1
 
 
 def generate_coordinate_system(num_layers):
@@ -45,20 +43,41 @@ def generate_coordinate_system(num_layers):
     """
     num_tiles = num_tiles_for(num_layers)
 
-    agenda = [(0, 0, 0)]
+    agenda = deque([(0, 0, 0)])
+    seen = {(0, 0, 0)}  # visited or in agenda
     visited = set()
     while len(visited) < num_tiles:
-        node = agenda.pop(0)
+        node = agenda.popleft()
         visited.add(node)
 
-        neighbors = [add(node, UNIT_VECTORS[d]) for d in Direction]
-        new_neighbors = filter(
-            lambda x: x not in visited and x not in agenda, neighbors
-        )
-        agenda.extend(new_neighbors)
+        for direction in Direction:
+            neighbor = add(node, UNIT_VECTORS[direction])
+            if neighbor not in seen:
+                seen.add(neighbor)
+                agenda.append(neighbor)
     return visited
 
 
+def ring_coordinates(radius):
+    """Coordinates at the given distance from the center, walking the ring in
+    order (clockwise, starting at the north-west corner)."""
+    if radius == 0:
+        return [(0, 0, 0)]
+
+    coordinate = tuple(radius * x for x in UNIT_VECTORS[Direction.NORTHWEST])
+    ring = []
+    for direction in Direction:  # enum order goes around clockwise
+        for _ in range(radius):
+            ring.append(coordinate)
+            coordinate = add(coordinate, UNIT_VECTORS[direction])
+    return ring
+
+
+def cube_distance(coordinate):
+    """Number of steps from the center tile (i.e. layer of the coordinate)"""
+    return max(map(abs, coordinate))
+
+
 def cube_to_axial(cube):
     q = cube[0]
     r = cube[2]
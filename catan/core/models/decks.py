@@ -17,6 +17,7 @@ from catan.core.models.enums import (
     SHEEP,
     WHEAT,
     ORE,
+    RESOURCES,
     FastDevCard,
     FastResource,
 )
@@ -60,6 +61,13 @@ def freqdeck_from_listdeck(listdeck: Iterable[FastResource]):
     return freqdeck
 
 
+def listdeck_from_freqdeck(freqdeck):
+    listdeck = []
+    for resource, amount in zip(RESOURCES, freqdeck):
+        listdeck.extend([resource] * amount)
+    return listdeck
+
+
 def starting_devcard_proba(card: FastDevCard):
     starting_deck = starting_devcard_bank()
     return starting_deck.count(card) / len(starting_deck)
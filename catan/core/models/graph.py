@@ -0,0 +1,90 @@
+"""
+Minimal undirected graph, so the engine doesn't need networkx at runtime.
+
+Implements the subset of networkx.Graph's API used on map topologies, with
+the same iteration orders (insertion order of nodes and neighbors), so code
+written against networkx behaves the same. Use to_networkx() for anything
+else (e.g. analysis).
+"""
+
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+
+class Graph:
+    def __init__(self):
+        self._adj: Dict[Hashable, Dict[Hashable, None]] = {}
+
+    def add_node(self, node):
+        if node not in self._adj:
+            self._adj[node] = {}
+
+    def add_nodes_from(self, nodes: Iterable):
+        for node in nodes:
+            self.add_node(node)
+
+    def add_edge(self, a, b):
+        self.add_node(a)
+        self.add_node(b)
+        self._adj[a][b] = None
+        self._adj[b][a] = None
+
+    def add_edges_from(self, edges: Iterable[Tuple]):
+        for a, b in edges:
+            self.add_edge(a, b)
+
+    def __contains__(self, node) -> bool:
+        try:
+            return node in self._adj
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator:
+        return iter(self._adj)
+
+    def __len__(self) -> int:
+        return len(self._adj)
+
+    def nodes(self) -> List:
+        return list(self._adj)
+
+    def neighbors(self, node) -> Iterator:
+        return iter(self._adj[node])
+
+    def degree(self) -> List[Tuple]:
+        return [(node, len(adjacent)) for node, adjacent in self._adj.items()]
+
+    def edges(self, nbunch=None) -> List[Tuple]:
+        """Each edge once, as (node, neighbor), walking nbunch (a node, an
+        iterable of nodes, or None for all) in order. Like networkx."""
+        if nbunch is None:
+            nodes: Iterable = self._adj
+        elif nbunch in self:
+            nodes = [nbunch]
+        else:
+            nodes = [node for node in nbunch if node in self._adj]
+
+        edges = []
+        seen = set()
+        for node in nodes:
+            for neighbor in self._adj[node]:
+                if neighbor not in seen:
+                    edges.append((node, neighbor))
+            seen.add(node)
+        return edges
+
+    def subgraph(self, nodes: Iterable) -> "Graph":
+        """Induced subgraph (a copy; graphs here are static)."""
+        keep = set(nodes)
+        graph = Graph()
+        for node, adjacent in self._adj.items():
+            if node in keep:
+                graph._adj[node] = {n: None for n in adjacent if n in keep}
+        return graph
+
+    def to_networkx(self):
+        import networkx as nx
+
+        graph = nx.Graph()
+        graph.add_nodes_from(self._adj)
+        graph.add_edges_from(self.edges())
+        return graph
@@ -2,9 +2,29 @@ import typing
 from dataclasses import dataclass
 import random
 from collections import Counter, defaultdict
-from typing import Dict, FrozenSet, List, Literal, Mapping, Set, Tuple, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
-from catan.core.models.coordinate_system import Direction, add, UNIT_VECTORS
+from catan.core.models.coordinate_system import (
+    Direction,
+    add,
+    cube_distance,
+    ring_coordinates,
+    UNIT_VECTORS,
+)
 from catan.core.models.enums import (
     FastResource,
     WOOD,
@@ -12,10 +32,16 @@ from catan.core.models.enums import (
     SHEEP,
     WHEAT,
     ORE,
+    RESOURCES,
     EdgeRef,
     NodeRef,
 )
+from catan.core.models.graph import Graph
+
+if TYPE_CHECKING:  # numpy is only imported when compiling a map
+    import numpy as np
 
+# Sizes of the base map. Other maps: CatanMap.num_nodes/num_edges/num_tiles
 NUM_NODES = 54
 NUM_EDGES = 72
 NUM_TILES = 19
@@ -161,6 +187,51 @@ BASE_MAP_TEMPLATE = MapTemplate(
 )
 
 
+def build_map_template(num_layers: int) -> MapTemplate:
+    """Hexagonal template with num_layers rings of land tiles (3 is the base
+    map's size) surrounded by water, for bigger games (e.g. 5-6 players
+    with 4 layers) and stress tests.
+
+    Every other water tile is a port. Resources, numbers and 2:1/3:1 port
+    ratios repeat those of BASE_MAP_TEMPLATE, with one desert per 19 tiles.
+    """
+    if num_layers < 2:
+        raise ValueError("num_layers must be at least 2")
+    topology: Dict[Coordinate, Any] = {}
+    for layer in range(num_layers):
+        for coordinate in ring_coordinates(layer):
+            topology[coordinate] = LandTile
+    num_ports = 0
+    for index, coordinate in enumerate(ring_coordinates(num_layers)):
+        if index % 2 == 1:
+            topology[coordinate] = Water
+            continue
+        inward = next(
+            direction
+            for direction in Direction
+            if cube_distance(add(coordinate, UNIT_VECTORS[direction])) < num_layers
+        )
+        topology[coordinate] = (Port, inward)
+        num_ports += 1
+
+    num_land = sum(1 for tile_type in topology.values() if tile_type == LandTile)
+    num_deserts = max(1, round(num_land / len(BASE_MAP_TEMPLATE.tile_resources)))
+    resources = [r for r in BASE_MAP_TEMPLATE.tile_resources if r is not None]
+    num_two_to_one = round(num_ports * 5 / len(BASE_MAP_TEMPLATE.port_resources))
+    return MapTemplate(
+        numbers=_cycle(BASE_MAP_TEMPLATE.numbers, num_land - num_deserts),
+        port_resources=(
+            _cycle(RESOURCES, num_two_to_one) + [None] * (num_ports - num_two_to_one)
+        ),
+        tile_resources=_cycle(resources, num_land - num_deserts) + [None] * num_deserts,
+        topology=topology,
+    )
+
+
+def _cycle(values: List, length: int) -> List:
+    return [values[i % len(values)] for i in range(length)]
+
+
 class CatanMap:
     """Represents a randomly initialized map."""
 
@@ -183,6 +254,66 @@ class CatanMap:
         self.node_production = node_production
         self.tiles_by_id = tiles_by_id
         self.ports_by_id = ports_by_id
+        self._compiled = None
+        self._static_graph = None
+        self._land_edges = None
+        self._node_distances = None
+
+    @property
+    def static_graph(self) -> Graph:
+        """Graph of all nodes and edges of the map's tiles (water included).
+        Built on first access and shared by all boards of this map."""
+        graph = getattr(self, "_static_graph", None)  # may be unpickled w/o it
+        if graph is None:
+            graph = Graph()
+            for tile in self.tiles.values():
+                graph.add_nodes_from(tile.nodes.values())
+                graph.add_edges_from(tile.edges.values())
+            self._static_graph = graph
+        return graph
+
+    @property
+    def land_edges(self) -> List[EdgeId]:
+        """Edges between land nodes (where roads can be built)."""
+        edges = getattr(self, "_land_edges", None)
+        if edges is None:
+            edges = list(self.static_graph.subgraph(self.land_nodes).edges())
+            self._land_edges = edges
+        return edges
+
+    @property
+    def node_distances(self) -> "np.ndarray":
+        """[N, N] uint8 matrix of edges between nodes (see node_distances)"""
+        distances = getattr(self, "_node_distances", None)
+        if distances is None:
+            from catan.core.models.node_distances import get_node_distances
+
+            distances = get_node_distances(self.static_graph)
+            self._node_distances = distances
+        return distances
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.land_nodes)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.land_edges)
+
+    @property
+    def num_tiles(self) -> int:
+        return len(self.land_tiles)
+
+    def compile(self) -> "CompiledMap":
+        """Dense NumPy lookup tables of this map. Computed on first call and
+        cached on the instance, so copies of a board (which share the map)
+        share the tables too. The arrays are read-only.
+        """
+        compiled = getattr(self, "_compiled", None)  # may be unpickled w/o it
+        if compiled is None:
+            compiled = CompiledMap.from_map(self)
+            self._compiled = compiled
+        return compiled
 
     @staticmethod
     def from_template(map_template: MapTemplate):
@@ -216,6 +347,104 @@ class CatanMap:
         return self
 
 
+@dataclass(frozen=True)
+class CompiledMap:
+    """Read-only dense tables of a CatanMap, for vectorized lookups.
+
+    Tiles are indexed by LandTile.id, nodes by NodeId and resources by their
+    position in RESOURCES. Use CatanMap.compile() to get (cached) instances.
+    """
+
+    num_nodes: int
+    num_tiles: int
+    tile_coordinates: "np.ndarray"  # [T, 3] tile id => cube coordinate
+    coordinate_to_tile: Dict[Coordinate, int]  # cube coordinate => tile id
+    tile_resources: "np.ndarray"  # [T] resource index, -1 if desert
+    tile_numbers: "np.ndarray"  # [T] dice number, 0 if desert
+    tile_probabilities: "np.ndarray"  # [T] chance of producing per roll
+    tile_nodes: "np.ndarray"  # [T, 6] node ids, in NodeRef order
+    node_tiles: "np.ndarray"  # [N, 3] tile ids, padded with -1
+    node_tile_mask: "np.ndarray"  # [N, T] True if node touches tile
+    node_production: "np.ndarray"  # [N, 5] chance of producing each resource
+    node_ports: "np.ndarray"  # [N, 6] True if port; last column is 3:1 port
+    number_tiles: Dict[int, Tuple[int, ...]]  # number => tile ids
+
+    @staticmethod
+    def from_map(catan_map: "CatanMap") -> "CompiledMap":
+        import numpy as np
+
+        tiles = sorted(catan_map.land_tiles.items(), key=lambda item: item[1].id)
+        if [tile.id for _, tile in tiles] != list(range(len(tiles))):
+            raise ValueError("Land tile ids must be 0..len(land_tiles)-1")
+        port_nodes = set().union(*catan_map.port_nodes.values())
+        num_nodes = max(catan_map.land_nodes | port_nodes, default=-1) + 1
+        num_tiles = len(tiles)
+
+        tile_coordinates = np.array(
+            [coordinate for coordinate, _ in tiles], dtype=np.int8
+        ).reshape(num_tiles, 3)
+        tile_resources = np.array(
+            [
+                -1 if tile.resource is None else RESOURCES.index(tile.resource)
+                for _, tile in tiles
+            ],
+            dtype=np.int8,
+        )
+        tile_numbers = np.array([tile.number or 0 for _, tile in tiles], dtype=np.int8)
+        tile_probabilities = np.array(
+            [
+                0.0 if tile.resource is None else number_probability(tile.number)
+                for _, tile in tiles
+            ]
+        )
+        tile_nodes = np.array(
+            [[tile.nodes[ref] for ref in NodeRef] for _, tile in tiles],
+            dtype=np.int16,
+        ).reshape(num_tiles, len(NodeRef))
+
+        node_tile_mask = np.zeros((num_nodes, num_tiles), dtype=bool)
+        node_tile_mask[tile_nodes, np.arange(num_tiles)[:, None]] = True
+        node_tiles = np.full((num_nodes, 3), -1, dtype=np.int16)
+        for node, tile_ids in enumerate(map(np.flatnonzero, node_tile_mask)):
+            node_tiles[node, : len(tile_ids)] = tile_ids
+
+        producing = np.flatnonzero(tile_resources >= 0)
+        tile_yields = np.zeros((num_tiles, len(RESOURCES)))
+        rates = tile_probabilities[producing]
+        tile_yields[producing, tile_resources[producing]] = rates
+        node_production = node_tile_mask @ tile_yields
+
+        node_ports = np.zeros((num_nodes, len(RESOURCES) + 1), dtype=bool)
+        for resource, node_ids in catan_map.port_nodes.items():
+            column = -1 if resource is None else RESOURCES.index(resource)
+            node_ports[list(node_ids), column] = True
+
+        number_tiles: Dict[int, Tuple[int, ...]] = {
+            number: tuple(np.flatnonzero(tile_numbers == number).tolist())
+            for number in range(2, 13)
+        }
+        return CompiledMap(
+            num_nodes=num_nodes,
+            num_tiles=num_tiles,
+            tile_coordinates=_read_only(tile_coordinates),
+            coordinate_to_tile={coordinate: tile.id for coordinate, tile in tiles},
+            tile_resources=_read_only(tile_resources),
+            tile_numbers=_read_only(tile_numbers),
+            tile_probabilities=_read_only(tile_probabilities),
+            tile_nodes=_read_only(tile_nodes),
+            node_tiles=_read_only(node_tiles),
+            node_tile_mask=_read_only(node_tile_mask),
+            node_production=_read_only(node_production),
+            node_ports=_read_only(node_ports),
+            number_tiles=number_tiles,
+        )
+
+
+def _read_only(array: "np.ndarray") -> "np.ndarray":
+    array.setflags(write=False)
+    return array
+
+
 def init_port_nodes_cache(
     tiles: Dict[Coordinate, Tile],
 ) -> Dict[Union[FastResource, None], Set[int]]:
@@ -263,11 +492,11 @@ def get_node_counter_production(
     adjacent_tiles: Dict[int, List[LandTile]], node_id: NodeId
 ):
     tiles = adjacent_tiles[node_id]
-    production = defaultdict(float)
+    production: Counter = Counter()
     for tile in tiles:
         if tile.resource is not None:
-            production[tile.resource] += number_probability(tile.number)
-    return Counter(production)
+            production[tile.resource] += DICE_PROBAS[tile.number]
+    return production
 
 
 def build_dice_probas():
@@ -294,8 +523,8 @@ def initialize_tiles(
     """Initializes a new random board, based on the MapTemplate.
 
     It first shuffles tiles, ports, and numbers. Then goes satisfying the
-    topology (i.e. placing tiles on coordinates); ensuring to "attach" these to
-    neighbor tiles (so as to not repeat nodes or edges objects).
+    topology (i.e. placing tiles on coordinates). Node and edge ids only
+    depend on the topology, so these come from the (cached) TemplateTopology.
 
     Args:
         map_template (MapTemplate): Template to initialize.
@@ -316,40 +545,128 @@ def initialize_tiles(
         map_template.numbers, len(map_template.numbers)
     )
 
-    # for each topology entry, place a tile. keep track of nodes and edges
-    all_tiles: Dict[Coordinate, Tile] = {}
-    node_autoinc = 0
-    tile_autoinc = 0
-    port_autoinc = 0
-    for coordinate, tile_type in map_template.topology.items():
-        nodes, edges, node_autoinc = get_nodes_and_edges(
-            all_tiles, coordinate, node_autoinc
-        )
+    # Tiles are placed popping from the end of the shuffled lists
+    tile_resources = shuffled_tile_resources[::-1]
+    numbers = iter(shuffled_numbers[::-1])
+    tile_numbers = [None if r is None else next(numbers) for r in tile_resources]
+    return get_template_topology(map_template).build_tiles(
+        tile_resources, tile_numbers, shuffled_port_resources[::-1]
+    )
+
+
+class TemplateTopology:
+    """Node and edge numbering of a MapTemplate's topology, computed once.
 
-        # create and save tile
-        if isinstance(tile_type, tuple):  # is port
-            (_, direction) = tile_type
-            port = Port(
-                port_autoinc, shuffled_port_resources.pop(), direction, nodes, edges
-            )
-            all_tiles[coordinate] = port
-            port_autoinc += 1
-        elif tile_type == LandTile:
-            resource = shuffled_tile_resources.pop()
-            if resource != None:
-                number = shuffled_numbers.pop()
-                tile = LandTile(tile_autoinc, resource, number, nodes, edges)
+    Only resources, numbers and ports change between maps of the same
+    template, so maps can be built by handing those out over fixed ids:
+    the i-th LandTile (Port) in topology order gets id i. Node and edge
+    dicts are shared by all tiles built from this topology (and must not
+    be mutated).
+    """
+
+    def __init__(
+        self,
+        map_template: MapTemplate,
+        precomputed: Optional[Mapping[Coordinate, Tuple[tuple, tuple]]] = None,
+    ):
+        """
+        Args:
+            map_template (MapTemplate): Template whose topology to number.
+            precomputed (Mapping[Coordinate, Tuple[tuple, tuple]], optional):
+                Output of to_static() for this topology, to skip computing it.
+        """
+        if precomputed is not None and list(precomputed) != list(map_template.topology):
+            raise ValueError("Precomputed topology doesn't match the template")
+
+        self.entries: List[
+            Tuple[Coordinate, Type[Tile], Union[Direction, None], Dict, Dict]
+        ] = []
+        placed: Dict[Coordinate, Water] = {}
+        node_autoinc = 0
+        for coordinate, tile_type in map_template.topology.items():
+            if precomputed is not None:
+                node_ids, edge_ids = precomputed[coordinate]
+                nodes = dict(zip(NodeRef, node_ids))
+                edges = dict(zip(EdgeRef, edge_ids))
+                node_autoinc = max(node_autoinc, max(node_ids) + 1)
             else:
-                tile = LandTile(tile_autoinc, None, None, nodes, edges)  # desert
-            all_tiles[coordinate] = tile
-            tile_autoinc += 1
-        elif tile_type == Water:
-            water_tile = Water(nodes, edges)
-            all_tiles[coordinate] = water_tile
-        else:
-            raise ValueError("Invalid tile")
+                nodes, edges, node_autoinc = get_nodes_and_edges(
+                    placed, coordinate, node_autoinc
+                )
+                placed[coordinate] = Water(nodes, edges)
+            if isinstance(tile_type, tuple):  # is port
+                self.entries.append((coordinate, Port, tile_type[1], nodes, edges))
+            elif tile_type == LandTile or tile_type == Water:
+                self.entries.append((coordinate, tile_type, None, nodes, edges))
+            else:
+                raise ValueError("Invalid tile")
+
+        self.land_coordinates = [e[0] for e in self.entries if e[1] == LandTile]
+        self.port_coordinates = [e[0] for e in self.entries if e[1] == Port]
+        self.num_nodes = node_autoinc
+
+    def to_static(self) -> Dict[Coordinate, Tuple[tuple, tuple]]:
+        """coordinate => (node ids in NodeRef order, edges in EdgeRef order)"""
+        return {
+            coordinate: (tuple(nodes.values()), tuple(edges.values()))
+            for coordinate, _, _, nodes, edges in self.entries
+        }
+
+    def build_tiles(
+        self,
+        tile_resources: Sequence[Union[FastResource, None]],
+        tile_numbers: Sequence[Union[int, None]],
+        port_resources: Sequence[Union[FastResource, None]],
+    ) -> Dict[Coordinate, Tile]:
+        """Places the given contents over the topology.
+
+        Args:
+            tile_resources (Sequence[Union[FastResource, None]]): resource of
+                each land tile, by tile id (None is desert).
+            tile_numbers (Sequence[Union[int, None]]): number of each land tile,
+                by tile id (ignored for the desert).
+            port_resources (Sequence[Union[FastResource, None]]): resource of
+                each port, by port id (None is 3:1).
+
+        Returns:
+            Dict[Coordinate, Tile]: Coordinate to initialized Tile mapping.
+        """
+        tiles: Dict[Coordinate, Tile] = {}
+        tile_id = 0
+        port_id = 0
+        for coordinate, tile_type, direction, nodes, edges in self.entries:
+            if tile_type == LandTile:
+                resource = tile_resources[tile_id]
+                number = None if resource is None else tile_numbers[tile_id]
+                tiles[coordinate] = LandTile(tile_id, resource, number, nodes, edges)
+                tile_id += 1
+            elif tile_type == Port:
+                resource = port_resources[port_id]
+                tiles[coordinate] = Port(port_id, resource, direction, nodes, edges)
+                port_id += 1
+            else:
+                tiles[coordinate] = Water(nodes, edges)
+        return tiles
+
+
+_TEMPLATE_TOPOLOGIES: Dict[int, Tuple[MapTemplate, TemplateTopology]] = {}
+
+
+def get_template_topology(map_template: MapTemplate) -> TemplateTopology:
+    """Cached TemplateTopology of map_template (by identity, as templates
+    hold lists and so aren't hashable)."""
+    cached = _TEMPLATE_TOPOLOGIES.get(id(map_template))
+    if cached is None or cached[0] is not map_template:
+        precomputed = None
+        if map_template is BASE_MAP_TEMPLATE:
+            from catan.core.models.static_topology import BASE_TOPOLOGY
 
-    return all_tiles
+            # If stale (template changed), compute it; regenerate the module.
+            if list(BASE_TOPOLOGY) == list(map_template.topology):
+                precomputed = BASE_TOPOLOGY
+        cached = (map_template, TemplateTopology(map_template, precomputed))
+        _TEMPLATE_TOPOLOGIES[id(map_template)] = cached
+    return cached[1]
 
 
 def get_nodes_and_edges(tiles, coordinate: Coordinate, node_autoinc):
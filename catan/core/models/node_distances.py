@@ -0,0 +1,159 @@
+"""
+All-pairs node distances (number of edges) of a map's topology.
+
+Computed once per topology with a BFS from every node at once, stored as a
+uint8 matrix (255 = unreachable) and cached in memory and on disk as a .npy
+file named after a fingerprint of the topology, so later processes just
+memory-map it. The cache directory is $CATAN_CACHE_DIR, or
+$XDG_CACHE_HOME/catan (~/.cache/catan). Distances are topological: other
+players' pieces are not taken into account.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from catan.core.models.graph import Graph
+
+UNREACHABLE = 255
+
+# Precomputed tables shipped with the package (e.g. the base map's)
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# fingerprint => distances
+_DISTANCES: Dict[str, np.ndarray] = {}
+
+
+def get_cache_dir() -> str:
+    if "CATAN_CACHE_DIR" in os.environ:
+        return os.environ["CATAN_CACHE_DIR"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "catan")
+
+
+def get_node_distances(graph: Graph) -> np.ndarray:
+    """Read-only [N, N] uint8 distance matrix of graph (see
+    compute_node_distances), from memory, disk or computed (and saved)."""
+    fingerprint = topology_fingerprint(graph)
+    distances = _DISTANCES.get(fingerprint)
+    if distances is None:
+        distances = _load(fingerprint, graph)
+        if distances is None:
+            distances = compute_node_distances(graph)
+            distances.setflags(write=False)
+            _save(fingerprint, distances)
+        _DISTANCES[fingerprint] = distances
+    return distances
+
+
+def _filename(fingerprint: str) -> str:
+    return f"node_distances-{fingerprint}.npy"
+
+
+def _load(fingerprint: str, graph: Graph) -> Optional[np.ndarray]:
+    num_nodes = max(graph.nodes(), default=-1) + 1
+    for directory in (DATA_DIR, get_cache_dir()):
+        path = os.path.join(directory, _filename(fingerprint))
+        try:
+            distances = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            continue
+        if distances.dtype == np.uint8 and distances.shape == (num_nodes,) * 2:
+            return distances
+    return None
+
+
+def _save(fingerprint: str, distances: np.ndarray):
+    """Best effort (e.g. read-only home directories are fine)"""
+    directory = get_cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # write + rename, so concurrent processes never read half a file
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            np.save(file, distances)
+        os.replace(file.name, os.path.join(directory, _filename(fingerprint)))
+    except OSError:
+        pass
+
+
+def topology_fingerprint(graph: Graph) -> str:
+    """Short hash identifying a graph by its (sorted) nodes and edges."""
+    edges = sorted(tuple(sorted(edge)) for edge in graph.edges())
+    payload = repr((sorted(graph.nodes()), edges)).encode()
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def compute_node_distances(graph: Graph) -> np.ndarray:
+    """BFS from all nodes in lockstep.
+
+    Returns:
+        np.ndarray: [N, N] uint8 matrix indexed by node id (N = max id + 1).
+            UNREACHABLE for pairs in different components (or missing ids).
+    """
+    num_nodes = max(graph.nodes(), default=-1) + 1
+    degree = max((d for _, d in graph.degree()), default=0)
+    # neighbors padded with a sink column (num_nodes) that is never reached
+    neighbors = np.full((num_nodes, max(degree, 1)), num_nodes)
+    for node in graph.nodes():
+        adjacent = list(graph.neighbors(node))
+        neighbors[node, : len(adjacent)] = adjacent
+
+    distances = np.full((num_nodes, num_nodes), UNREACHABLE, dtype=np.uint8)
+    present = np.array([node in graph for node in range(num_nodes)], dtype=bool)
+    # frontier[source, node] (plus an always-False sink column)
+    frontier = np.zeros((num_nodes, num_nodes + 1), dtype=bool)
+    frontier[np.flatnonzero(present), np.flatnonzero(present)] = True
+    reached = frontier[:, :-1].copy()
+    distance = 0
+    while True:
+        distances[frontier[:, :-1]] = distance
+        # node is one step further if any of its neighbors is on the frontier
+        step = frontier[:, neighbors].any(axis=2) & ~reached
+        if not step.any():
+            return distances
+        distance += 1
+        if distance >= UNREACHABLE:
+            raise ValueError("Graph too big: distances must fit in uint8")
+        reached |= step
+        frontier[:, :-1] = step
+
+
+def frontier_distances(board: Any, color: Any) -> np.ndarray:
+    """Distance from color's road network to every node.
+
+    Args:
+        board (Board): board to query
+        color (Color): player's color
+
+    Returns:
+        np.ndarray: [N] uint8 distances by node id (0 on the network).
+            All UNREACHABLE if color has no buildings yet.
+    """
+    distances = board.map.node_distances
+    sources = sorted(set().union(*board.connected_components[color]))
+    if len(sources) == 0:
+        return np.full(len(distances), UNREACHABLE, dtype=np.uint8)
+    return distances[sources].min(axis=0)
+
+
+def nearest_buildable_node(board: Any, color: Any) -> Optional[Tuple[int, int]]:
+    """Closest node to color's road network where a settlement could go
+    (ignoring the roads still needed to get there).
+
+    Returns:
+        Optional[Tuple[int, int]]: (node id, distance), lowest id on ties.
+            None if color has no network or nothing is buildable.
+    """
+    candidates = np.array(sorted(board.board_buildable_ids), dtype=np.intp)
+    if len(candidates) == 0:
+        return None
+    distances = frontier_distances(board, color)[candidates]
+    best = int(np.argmin(distances))
+    if distances[best] == UNREACHABLE:
+        return None
+    return int(candidates[best]), int(distances[best])
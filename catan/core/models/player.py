@@ -9,6 +9,8 @@ class Color(Enum):
     BLUE = "BLUE"
     ORANGE = "ORANGE"
     VIOLET = "VIOLET"
+    WHITE = "WHITE"
+    GREEN = "GREEN"
 
 
 class Player:
@@ -0,0 +1,180 @@
+"""
+Precomputed node/edge numbering of BASE_MAP_TEMPLATE's topology, so it's
+loaded instead of computed at import (see get_template_topology).
+
+Generated by `python -m catan.core.models.static_topology`. Do not edit.
+"""
+
+# coordinate => (node ids in NodeRef order, edges in EdgeRef order)
+BASE_TOPOLOGY = {
+    (0, 0, 0): (
+        (0, 1, 2, 3, 4, 5),
+        ((1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 1)),
+    ),
+    (1, -1, 0): (
+        (6, 7, 8, 9, 2, 1),
+        ((7, 8), (8, 9), (9, 2), (1, 2), (1, 6), (6, 7)),
+    ),
+    (0, -1, 1): (
+        (2, 9, 10, 11, 12, 3),
+        ((9, 10), (10, 11), (11, 12), (12, 3), (2, 3), (9, 2)),
+    ),
+    (-1, 0, 1): (
+        (4, 3, 12, 13, 14, 15),
+        ((12, 3), (12, 13), (13, 14), (14, 15), (15, 4), (3, 4)),
+    ),
+    (-1, 1, 0): (
+        (16, 5, 4, 15, 17, 18),
+        ((4, 5), (15, 4), (15, 17), (17, 18), (18, 16), (16, 5)),
+    ),
+    (0, 1, -1): (
+        (19, 20, 0, 5, 16, 21),
+        ((20, 0), (5, 0), (16, 5), (16, 21), (21, 19), (19, 20)),
+    ),
+    (1, 0, -1): (
+        (22, 23, 6, 1, 0, 20),
+        ((23, 6), (1, 6), (0, 1), (20, 0), (20, 22), (22, 23)),
+    ),
+    (2, -2, 0): (
+        (24, 25, 26, 27, 8, 7),
+        ((25, 26), (26, 27), (27, 8), (7, 8), (7, 24), (24, 25)),
+    ),
+    (1, -2, 1): (
+        (8, 27, 28, 29, 10, 9),
+        ((27, 28), (28, 29), (29, 10), (9, 10), (8, 9), (27, 8)),
+    ),
+    (0, -2, 2): (
+        (10, 29, 30, 31, 32, 11),
+        ((29, 30), (30, 31), (31, 32), (32, 11), (10, 11), (29, 10)),
+    ),
+    (-1, -1, 2): (
+        (12, 11, 32, 33, 34, 13),
+        ((32, 11), (32, 33), (33, 34), (34, 13), (12, 13), (11, 12)),
+    ),
+    (-2, 0, 2): (
+        (14, 13, 34, 35, 36, 37),
+        ((34, 13), (34, 35), (35, 36), (36, 37), (37, 14), (13, 14)),
+    ),
+    (-2, 1, 1): (
+        (17, 15, 14, 37, 38, 39),
+        ((14, 15), (37, 14), (37, 38), (38, 39), (39, 17), (15, 17)),
+    ),
+    (-2, 2, 0): (
+        (40, 18, 17, 39, 41, 42),
+        ((17, 18), (39, 17), (39, 41), (41, 42), (42, 40), (40, 18)),
+    ),
+    (-1, 2, -1): (
+        (43, 21, 16, 18, 40, 44),
+        ((16, 21), (18, 16), (40, 18), (40, 44), (44, 43), (43, 21)),
+    ),
+    (0, 2, -2): (
+        (45, 46, 19, 21, 43, 47),
+        ((46, 19), (21, 19), (43, 21), (43, 47), (47, 45), (45, 46)),
+    ),
+    (1, 1, -2): (
+        (48, 49, 22, 20, 19, 46),
+        ((49, 22), (20, 22), (19, 20), (46, 19), (46, 48), (48, 49)),
+    ),
+    (2, 0, -2): (
+        (50, 51, 52, 23, 22, 49),
+        ((51, 52), (52, 23), (22, 23), (49, 22), (49, 50), (50, 51)),
+    ),
+    (2, -1, -1): (
+        (52, 53, 24, 7, 6, 23),
+        ((53, 24), (7, 24), (6, 7), (23, 6), (52, 23), (52, 53)),
+    ),
+    (3, -3, 0): (
+        (54, 55, 56, 57, 26, 25),
+        ((55, 56), (56, 57), (57, 26), (25, 26), (25, 54), (54, 55)),
+    ),
+    (2, -3, 1): (
+        (26, 57, 58, 59, 28, 27),
+        ((57, 58), (58, 59), (59, 28), (27, 28), (26, 27), (57, 26)),
+    ),
+    (1, -3, 2): (
+        (28, 59, 60, 61, 30, 29),
+        ((59, 60), (60, 61), (61, 30), (29, 30), (28, 29), (59, 28)),
+    ),
+    (0, -3, 3): (
+        (30, 61, 62, 63, 64, 31),
+        ((61, 62), (62, 63), (63, 64), (64, 31), (30, 31), (61, 30)),
+    ),
+    (-1, -2, 3): (
+        (32, 31, 64, 65, 66, 33),
+        ((64, 31), (64, 65), (65, 66), (66, 33), (32, 33), (31, 32)),
+    ),
+    (-2, -1, 3): (
+        (34, 33, 66, 67, 68, 35),
+        ((66, 33), (66, 67), (67, 68), (68, 35), (34, 35), (33, 34)),
+    ),
+    (-3, 0, 3): (
+        (36, 35, 68, 69, 70, 71),
+        ((68, 35), (68, 69), (69, 70), (70, 71), (71, 36), (35, 36)),
+    ),
+    (-3, 1, 2): (
+        (38, 37, 36, 71, 72, 73),
+        ((36, 37), (71, 36), (71, 72), (72, 73), (73, 38), (37, 38)),
+    ),
+    (-3, 2, 1): (
+        (41, 39, 38, 73, 74, 75),
+        ((38, 39), (73, 38), (73, 74), (74, 75), (75, 41), (39, 41)),
+    ),
+    (-3, 3, 0): (
+        (76, 42, 41, 75, 77, 78),
+        ((41, 42), (75, 41), (75, 77), (77, 78), (78, 76), (76, 42)),
+    ),
+    (-2, 3, -1): (
+        (79, 44, 40, 42, 76, 80),
+        ((40, 44), (42, 40), (76, 42), (76, 80), (80, 79), (79, 44)),
+    ),
+    (-1, 3, -2): (
+        (81, 47, 43, 44, 79, 82),
+        ((43, 47), (44, 43), (79, 44), (79, 82), (82, 81), (81, 47)),
+    ),
+    (0, 3, -3): (
+        (83, 84, 45, 47, 81, 85),
+        ((84, 45), (47, 45), (81, 47), (81, 85), (85, 83), (83, 84)),
+    ),
+    (1, 2, -3): (
+        (86, 87, 48, 46, 45, 84),
+        ((87, 48), (46, 48), (45, 46), (84, 45), (84, 86), (86, 87)),
+    ),
+    (2, 1, -3): (
+        (88, 89, 50, 49, 48, 87),
+        ((89, 50), (49, 50), (48, 49), (87, 48), (87, 88), (88, 89)),
+    ),
+    (3, 0, -3): (
+        (90, 91, 92, 51, 50, 89),
+        ((91, 92), (92, 51), (50, 51), (89, 50), (89, 90), (90, 91)),
+    ),
+    (3, -1, -2): (
+        (92, 93, 94, 53, 52, 51),
+        ((93, 94), (94, 53), (52, 53), (51, 52), (92, 51), (92, 93)),
+    ),
+    (3, -2, -1): (
+        (94, 95, 54, 25, 24, 53),
+        ((95, 54), (25, 54), (24, 25), (53, 24), (94, 53), (94, 95)),
+    ),
+}
+
+
+def _generate() -> str:
+    from catan.core.models.map import BASE_MAP_TEMPLATE, TemplateTopology
+
+    static = TemplateTopology(BASE_MAP_TEMPLATE).to_static()
+    lines = ["BASE_TOPOLOGY = {"]
+    for coordinate, (nodes, edges) in static.items():
+        lines.append(f"    {coordinate!r}: (")
+        lines.append(f"        {nodes!r},")
+        lines.append(f"        {edges!r},")
+        lines.append("    ),")
+    return "\n".join(lines + ["}"])
+
+
+if __name__ == "__main__":
+    with open(__file__) as file:
+        source = file.read()
+    start = source.index("BASE_TOPOLOGY = {")
+    end = source.index("\n\n\ndef _generate")
+    with open(__file__, "w") as file:
+        file.write(source[:start] + _generate() + source[end:])
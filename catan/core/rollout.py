@@ -0,0 +1,1046 @@
+"""
+Stripped-down game engine specialized for random playouts (e.g. MCTS rollouts).
+
+RolloutState mirrors the rules of catan.core.state.apply_action, but keeps
+state in flat per-player lists, encodes actions as small ints and skips the
+action log, playable_actions bookkeeping and validation. It only answers
+"who won?" (and optionally final scores).
+
+Actions are encoded as `param * NUM_ACTION_TYPES + action_type_index`,
+where action_type_index indexes ACTION_TYPES. See encode_action/decode_action
+to convert from/to catan.core.models.enums.Action.
+"""
+
+import functools
+import random
+import time
+from typing import (
+    Container,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from catan.core.game import TURNS_LIMIT, Game
+from catan.core.models.decks import (
+    CITY_COST_FREQDECK,
+    DEVELOPMENT_CARD_COST_FREQDECK,
+    ROAD_COST_FREQDECK,
+    SETTLEMENT_COST_FREQDECK,
+)
+from catan.core.models.enums import (
+    CITY,
+    DEVELOPMENT_CARDS,
+    RESOURCES,
+    SETTLEMENT,
+    Action,
+    ActionPrompt,
+    ActionType,
+)
+from catan.core.models.map import CatanMap
+from catan.core.models.player import Color
+from catan.core.state import State
+from catan.core.state_functions import get_player_freqdeck, player_key
+
+ACTION_TYPES = list(ActionType)
+NUM_ACTION_TYPES = len(ACTION_TYPES)
+ACTION_TYPE_INDEX = {action_type: i for i, action_type in enumerate(ACTION_TYPES)}
+
+ROLL = ACTION_TYPE_INDEX[ActionType.ROLL]
+MOVE_ROBBER = ACTION_TYPE_INDEX[ActionType.MOVE_ROBBER]
+DISCARD = ACTION_TYPE_INDEX[ActionType.DISCARD]
+BUILD_ROAD = ACTION_TYPE_INDEX[ActionType.BUILD_ROAD]
+BUILD_SETTLEMENT = ACTION_TYPE_INDEX[ActionType.BUILD_SETTLEMENT]
+BUILD_CITY = ACTION_TYPE_INDEX[ActionType.BUILD_CITY]
+BUY_DEVELOPMENT_CARD = ACTION_TYPE_INDEX[ActionType.BUY_DEVELOPMENT_CARD]
+PLAY_KNIGHT_CARD = ACTION_TYPE_INDEX[ActionType.PLAY_KNIGHT_CARD]
+PLAY_YEAR_OF_PLENTY = ACTION_TYPE_INDEX[ActionType.PLAY_YEAR_OF_PLENTY]
+PLAY_MONOPOLY = ACTION_TYPE_INDEX[ActionType.PLAY_MONOPOLY]
+PLAY_ROAD_BUILDING = ACTION_TYPE_INDEX[ActionType.PLAY_ROAD_BUILDING]
+MARITIME_TRADE = ACTION_TYPE_INDEX[ActionType.MARITIME_TRADE]
+END_TURN = ACTION_TYPE_INDEX[ActionType.END_TURN]
+
+# Prompts as ints
+PROMPTS = list(ActionPrompt)
+PROMPT_INDEX = {prompt: i for i, prompt in enumerate(PROMPTS)}
+INITIAL_SETTLEMENT = PROMPT_INDEX[ActionPrompt.BUILD_INITIAL_SETTLEMENT]
+INITIAL_ROAD = PROMPT_INDEX[ActionPrompt.BUILD_INITIAL_ROAD]
+PLAY_TURN = PROMPT_INDEX[ActionPrompt.PLAY_TURN]
+DISCARDING = PROMPT_INDEX[ActionPrompt.DISCARD]
+MOVING_ROBBER = PROMPT_INDEX[ActionPrompt.MOVE_ROBBER]
+
+# Indexes into RESOURCES / DEVELOPMENT_CARDS
+KNIGHT_INDEX = DEVELOPMENT_CARDS.index("KNIGHT")
+YEAR_OF_PLENTY_INDEX = DEVELOPMENT_CARDS.index("YEAR_OF_PLENTY")
+MONOPOLY_INDEX = DEVELOPMENT_CARDS.index("MONOPOLY")
+ROAD_BUILDING_INDEX = DEVELOPMENT_CARDS.index("ROAD_BUILDING")
+VICTORY_POINT_INDEX = DEVELOPMENT_CARDS.index("VICTORY_POINT")
+PLAYABLE_DEV_INDEXES = [
+    KNIGHT_INDEX,
+    YEAR_OF_PLENTY_INDEX,
+    MONOPOLY_INDEX,
+    ROAD_BUILDING_INDEX,
+]
+
+# Year of plenty params: pairs (i <= j) and then single cards.
+YEAR_OF_PLENTY_OPTIONS: List[Tuple[int, ...]] = [
+    (i, j) for i in range(len(RESOURCES)) for j in range(i, len(RESOURCES))
+] + [(i,) for i in range(len(RESOURCES))]
+YEAR_OF_PLENTY_PARAM = {cards: p for p, cards in enumerate(YEAR_OF_PLENTY_OPTIONS)}
+
+# All 36 equally likely dice outcomes, so a roll only needs one random() call.
+DICE_OUTCOMES = [(i, j) for i in range(1, 7) for j in range(1, 7)]
+
+
+class RolloutTopology:
+    """Static (per map) lookup tables, with nodes/edges/tiles as list indexes.
+    Tile tables are plain-list copies of CatanMap.compile() (indexed by tile id),
+    as list indexing is faster than NumPy's for scalar reads.
+
+    Attributes:
+        edges (List[Tuple[int, int]]): Land edges, in n1 < n2 order.
+        edge_index (Dict[Tuple[int, int], int]): Edge (both orientations) to index.
+        node_edges (List[List[Tuple[int, int]]]): node => (edge index, other node)
+            for land edges.
+        node_neighbors (List[List[int]]): node => adjacent nodes.
+        tile_coordinates (List[Coordinate]): land tile index => coordinate.
+        tile_resources (List[int]): land tile index => resource index (-1 desert).
+        tile_nodes (List[List[int]]): land tile index => nodes.
+        node_tiles (List[List[int]]): node => adjacent land tile indexes.
+        number_tiles (Dict[int, List[int]]): dice number => producing tile indexes.
+        node_ports (List[List[int]]): node => port resource indexes (-1 is 3:1).
+    """
+
+    def __init__(self, catan_map: CatanMap):
+        num_nodes = max(catan_map.land_nodes) + 1
+        self.land_nodes = sorted(catan_map.land_nodes)
+        self.edges = [tuple(sorted(edge)) for edge in catan_map.land_edges]
+        self.edge_index = dict()
+        self.node_edges: List[List[Tuple[int, int]]] = [[] for _ in range(num_nodes)]
+        for index, (a, b) in enumerate(self.edges):
+            self.edge_index[(a, b)] = index
+            self.edge_index[(b, a)] = index
+            self.node_edges[a].append((index, b))
+            self.node_edges[b].append((index, a))
+        self.node_neighbors = [
+            list(catan_map.static_graph.neighbors(node)) for node in range(num_nodes)
+        ]
+
+        compiled = catan_map.compile()
+        self.tile_coordinates = list(map(tuple, compiled.tile_coordinates.tolist()))
+        self.tile_index = dict(compiled.coordinate_to_tile)
+        self.tile_resources = compiled.tile_resources.tolist()
+        self.tile_nodes = compiled.tile_nodes.tolist()
+        self.node_tiles: List[List[int]] = [
+            [tile for tile in tiles if tile >= 0]
+            for tiles in compiled.node_tiles[:num_nodes].tolist()
+        ]
+        self.number_tiles: Dict[int, List[int]] = {
+            number: list(tiles) for number, tiles in compiled.number_tiles.items()
+        }
+
+        port_columns = list(range(len(RESOURCES))) + [-1]  # last column is 3:1
+        self.node_ports: List[List[int]] = [
+            [port for port, has_port in zip(port_columns, ports) if has_port]
+            for ports in compiled.node_ports[:num_nodes].tolist()
+        ]
+
+
+@functools.lru_cache(maxsize=16)
+def get_rollout_topology(catan_map: CatanMap) -> RolloutTopology:
+    return RolloutTopology(catan_map)
+
+
+def longest_road_length(
+    topology: RolloutTopology,
+    edge_owner: Sequence[int],
+    node_owner: Sequence[int],
+    player: int,
+    nodes: Iterable[int],
+) -> int:
+    """Number of edges in longest trail (no repeated edges) of player roads,
+    not going through enemy nodes. Same as longest_acyclic_path.
+
+    Args:
+        topology (RolloutTopology): map lookup tables
+        edge_owner (Sequence[int]): edge index => seating index (-1 if none)
+        node_owner (Sequence[int]): node => seating index (-1 if none)
+        player (int): seating index of player to measure
+        nodes (Iterable[int]): nodes reachable by player (e.g. its reach)
+
+    Returns:
+        int: length of longest road
+    """
+    node_edges = topology.node_edges
+    walkable: Dict[int, List[Tuple[int, int]]] = dict()
+    starts = []
+    for node in nodes:
+        # Only player roads that don't lead into an enemy node can be walked.
+        walkable[node] = [
+            (1 << edge, other)
+            for edge, other in node_edges[node]
+            if edge_owner[edge] == player
+            and (node_owner[other] == -1 or node_owner[other] == player)
+        ]
+        # A longest trail can always be taken to start at a dead end or
+        # a fork (or anywhere in a pure cycle, see below).
+        if len(walkable[node]) != 2 or node_owner[node] not in (-1, player):
+            starts.append(node)
+
+    best = 0
+    seen = set()
+
+    def walk(start):
+        nonlocal best
+        agenda = [(start, 0, 0)]  # node, bitmask of edges used, length
+        while agenda:
+            node, used, length = agenda.pop()
+            seen.add(node)
+            if length > best:
+                best = length
+            for bit, other in walkable.get(node, ()):
+                if not used & bit:
+                    agenda.append((other, used | bit, length + 1))
+
+    for start in starts:
+        walk(start)
+    for start in walkable:
+        if start not in seen:  # pure cycles have no dead ends or forks
+            walk(start)
+    return best
+
+
+def longest_road_through(
+    topology: RolloutTopology,
+    edge_owner: Sequence[int],
+    node_owner: Sequence[int],
+    player: int,
+    nodes: Container[int],
+    edge: int,
+) -> int:
+    """Number of edges in longest trail of player roads that uses edge (with
+    the same rules as longest_road_length). Since adding a road can only
+    create trails through it, the new longest road after building edge is
+    max(previous length, longest_road_through(..., edge)).
+    """
+    node_edges = topology.node_edges
+
+    def is_enemy(node):
+        return node_owner[node] != -1 and node_owner[node] != player
+
+    def longest_from(start, used):
+        best = 0
+        agenda = [(start, used, 0)]
+        while agenda:
+            node, used, length = agenda.pop()
+            if length > best:
+                best = length
+            if node not in nodes:
+                continue
+            for e, other in node_edges[node]:
+                bit = 1 << e
+                if edge_owner[e] == player and not used & bit and not is_enemy(other):
+                    agenda.append((other, used | bit, length + 1))
+        return best
+
+    best = 0
+    a, b = topology.edges[edge]
+    for tail, head in ((a, b), (b, a)):
+        if is_enemy(head) or tail not in nodes:
+            continue  # can't walk into an enemy node
+        # Walk backwards from tail (trails that end going tail => head) ...
+        agenda = [(tail, 1 << edge, 0)]
+        while agenda:
+            node, used, length = agenda.pop()
+            # ... and forward from head for each of them.
+            best = max(best, length + 1 + longest_from(head, used))
+            if is_enemy(node):
+                continue  # trails can only start at an enemy node
+            for e, other in node_edges[node]:
+                bit = 1 << e
+                if edge_owner[e] == player and not used & bit and other in nodes:
+                    agenda.append((other, used | bit, length + 1))
+    return best
+
+
+def dfs_walk(
+    topology: RolloutTopology,
+    edge_owner: Sequence[int],
+    node_owner: Sequence[int],
+    node: int,
+    player: int,
+) -> Set[int]:
+    """Nodes connected to node by player roads. Same as Board.dfs_walk"""
+    agenda = [node]
+    visited = set()
+    while agenda:
+        n = agenda.pop()
+        visited.add(n)
+        if node_owner[n] != -1 and node_owner[n] != player:
+            continue  # end of the road
+        for edge, other in topology.node_edges[n]:
+            if other not in visited and edge_owner[edge] == player:
+                agenda.append(other)
+    return visited
+
+
+class RolloutState:
+    """Array-based game state that can be played out at random quickly.
+
+    Per-player lists are indexed by seating index (as State.colors),
+    resource lists are indexed as RESOURCES and development card lists
+    as DEVELOPMENT_CARDS (owned_at_start only has the playable first four).
+    Actions without parameters (e.g. ROLL) encode as their type index.
+    """
+
+    def copy(self) -> "RolloutState":
+        state = RolloutState.__new__(RolloutState)
+        state.topology = self.topology
+        state.colors = self.colors
+        state.num_players = self.num_players
+        state.vps_to_win = self.vps_to_win
+        state.discard_limit = self.discard_limit
+
+        state.hands = [hand.copy() for hand in self.hands]
+        state.bank = self.bank.copy()
+        state.dev_hands = [hand.copy() for hand in self.dev_hands]
+        state.owned_at_start = [owned.copy() for owned in self.owned_at_start]
+        state.dev_deck = self.dev_deck.copy()
+        state.played_dev_in_turn = self.played_dev_in_turn.copy()
+        state.has_rolled = self.has_rolled.copy()
+        state.knights_played = self.knights_played.copy()
+        state.roads_available = self.roads_available.copy()
+        state.settlements_available = self.settlements_available.copy()
+        state.cities_available = self.cities_available.copy()
+        state.victory_points = self.victory_points.copy()
+        state.actual_victory_points = self.actual_victory_points.copy()
+        state.road_lengths = self.road_lengths.copy()
+        state.road_owner = self.road_owner
+        state.road_length = self.road_length
+        state.army_owner = self.army_owner
+        state.rates = [rates.copy() for rates in self.rates]
+
+        state.node_owner = self.node_owner.copy()
+        state.node_is_city = self.node_is_city.copy()
+        state.edge_owner = self.edge_owner.copy()
+        state.buildable_nodes = self.buildable_nodes.copy()
+        state.buildable_edges_cache = self.buildable_edges_cache.copy()
+        state.tile_weights = [weights.copy() for weights in self.tile_weights]
+        state.reach = [nodes.copy() for nodes in self.reach]
+        state.settlements = [nodes.copy() for nodes in self.settlements]
+        state.cities = [nodes.copy() for nodes in self.cities]
+        state.robber_tile = self.robber_tile
+
+        state.current_player = self.current_player
+        state.current_turn = self.current_turn
+        state.num_turns = self.num_turns
+        state.prompt = self.prompt
+        state.is_initial_build_phase = self.is_initial_build_phase
+        state.is_road_building = self.is_road_building
+        state.free_roads_available = self.free_roads_available
+        return state
+
+    @staticmethod
+    def from_game(game: Game) -> "RolloutState":
+        return RolloutState.from_state(game.state, game.vps_to_win)
+
+    @staticmethod
+    def from_state(state: State, vps_to_win: int = 10) -> "RolloutState":
+        """Builds a RolloutState out of a (full) State. State is not modified."""
+        topology = get_rollout_topology(state.board.map)
+        num_nodes = len(topology.node_edges)
+        self = RolloutState.__new__(RolloutState)
+        self.topology = topology
+        self.colors = state.colors
+        self.num_players = len(state.colors)
+        self.vps_to_win = vps_to_win
+        self.discard_limit = state.discard_limit
+
+        def values(suffix):
+            return [
+                state.player_state[f"{player_key(state, color)}_{suffix}"]
+                for color in state.colors
+            ]
+
+        self.hands = [get_player_freqdeck(state, color) for color in state.colors]
+        self.bank = list(state.resource_freqdeck)
+        self.dev_hands = [
+            [state.player_state[f"{key}_{card}_IN_HAND"] for card in DEVELOPMENT_CARDS]
+            for key in map(lambda c: player_key(state, c), state.colors)
+        ]
+        self.owned_at_start = [
+            [
+                state.player_state[f"{key}_{DEVELOPMENT_CARDS[i]}_OWNED_AT_START"]
+                for i in PLAYABLE_DEV_INDEXES
+            ]
+            for key in map(lambda c: player_key(state, c), state.colors)
+        ]
+        self.dev_deck = state.development_listdeck.copy()
+        self.played_dev_in_turn = values("HAS_PLAYED_DEVELOPMENT_CARD_IN_TURN")
+        self.has_rolled = values("HAS_ROLLED")
+        self.knights_played = values("PLAYED_KNIGHT")
+        self.roads_available = values("ROADS_AVAILABLE")
+        self.settlements_available = values("SETTLEMENTS_AVAILABLE")
+        self.cities_available = values("CITIES_AVAILABLE")
+        self.victory_points = values("VICTORY_POINTS")
+        self.actual_victory_points = values("ACTUAL_VICTORY_POINTS")
+        board = state.board
+        self.road_lengths = [board.road_lengths.get(c, 0) for c in state.colors]
+        self.road_owner = (
+            -1 if board.road_color is None else state.color_to_index[board.road_color]
+        )
+        self.road_length = board.road_length
+        has_army = values("HAS_ARMY")
+        self.army_owner = has_army.index(True) if any(has_army) else -1
+
+        self.node_owner = [-1] * num_nodes
+        self.node_is_city = [False] * num_nodes
+        for node, (color, building_type) in board.buildings.items():
+            self.node_owner[node] = state.color_to_index[color]
+            self.node_is_city[node] = building_type == CITY
+        self.edge_owner = [-1] * len(topology.edges)
+        for edge, color in board.roads.items():
+            self.edge_owner[topology.edge_index[edge]] = state.color_to_index[color]
+        self.buildable_nodes = [False] * num_nodes
+        for node in board.board_buildable_ids:
+            self.buildable_nodes[node] = True
+        self.reach = [
+            set().union(*board.connected_components[color]) for color in state.colors
+        ]
+        self.settlements = [
+            list(state.buildings_by_color[color][SETTLEMENT]) for color in state.colors
+        ]
+        self.cities = [
+            list(state.buildings_by_color[color][CITY]) for color in state.colors
+        ]
+        self.rates = [[4] * len(RESOURCES) for _ in state.colors]
+        for index, color in enumerate(state.colors):
+            for resource in board.get_player_port_resources(color):
+                self._add_port(index, resource)
+        self.buildable_edges_cache = [None] * self.num_players
+        self.tile_weights = [
+            [tile_buildings.get(color, 0) for color in state.colors]
+            for tile_buildings in map(
+                board.tile_buildings.__getitem__, range(len(topology.tile_nodes))
+            )
+        ]
+        self.robber_tile = topology.tile_index[board.robber_coordinate]
+
+        self.current_player = state.current_player_index
+        self.current_turn = state.current_turn_index
+        self.num_turns = state.num_turns
+        self.prompt = PROMPT_INDEX[state.current_prompt]
+        self.is_initial_build_phase = state.is_initial_build_phase
+        self.is_road_building = state.is_road_building
+        self.free_roads_available = state.free_roads_available
+        return self
+
+    def _add_port(self, player, resource):
+        rates = self.rates[player]
+        if resource is None or resource == -1:
+            for i in range(len(rates)):
+                rates[i] = min(rates[i], 3)
+        else:
+            index = resource if isinstance(resource, int) else RESOURCES.index(resource)
+            rates[index] = 2
+
+    # ===== Move generation
+    def playable_actions(self) -> List[int]:
+        """Encoded equivalent of generate_playable_actions"""
+        player = self.current_player
+        prompt = self.prompt
+        if prompt == PLAY_TURN:
+            if self.is_road_building:
+                return self._road_actions(player)
+            if self.played_dev_in_turn[player] or not any(self.owned_at_start[player]):
+                actions = []
+            else:
+                actions = self._dev_card_actions(player)
+            if not self.has_rolled[player]:
+                actions.append(ROLL)
+                return actions
+
+            actions.append(END_TURN)
+            hand = self.hands[player]
+            if hand[0] >= 1 and hand[1] >= 1:
+                actions.extend(self._road_actions(player))
+                if hand[2] >= 1 and hand[3] >= 1:
+                    actions.extend(self._settlement_actions(player))
+            if hand[3] >= 2 and hand[4] >= 3 and self.cities_available[player] > 0:
+                actions.extend(
+                    node * NUM_ACTION_TYPES + BUILD_CITY
+                    for node in self.settlements[player]
+                )
+            if (
+                hand[2] >= 1
+                and hand[3] >= 1
+                and hand[4] >= 1
+                and len(self.dev_deck) > 0
+            ):
+                actions.append(BUY_DEVELOPMENT_CARD)
+            actions.extend(self._maritime_trade_actions(player))
+            return actions
+        elif prompt == INITIAL_SETTLEMENT:
+            buildable = self.buildable_nodes
+            return [
+                node * NUM_ACTION_TYPES + BUILD_SETTLEMENT
+                for node in self.topology.land_nodes
+                if buildable[node]
+            ]
+        elif prompt == INITIAL_ROAD:
+            node = self.settlements[player][-1]
+            edge_owner = self.edge_owner
+            return [
+                edge * NUM_ACTION_TYPES + BUILD_ROAD
+                for edge, _ in self.topology.node_edges[node]
+                if edge_owner[edge] == -1
+            ]
+        elif prompt == MOVING_ROBBER:
+            return self._robber_actions(player)
+        else:  # DISCARDING
+            return [DISCARD]
+
+    def _dev_card_actions(self, player):
+        dev_hand = self.dev_hands[player]
+        owned_at_start = self.owned_at_start[player]
+        actions = []
+        if dev_hand[YEAR_OF_PLENTY_INDEX] >= 1 and owned_at_start[YEAR_OF_PLENTY_INDEX]:
+            actions.extend(self._year_of_plenty_actions())
+        if dev_hand[MONOPOLY_INDEX] >= 1 and owned_at_start[MONOPOLY_INDEX]:
+            actions.extend(
+                r * NUM_ACTION_TYPES + PLAY_MONOPOLY for r in range(len(RESOURCES))
+            )
+        if dev_hand[KNIGHT_INDEX] >= 1 and owned_at_start[KNIGHT_INDEX]:
+            actions.append(PLAY_KNIGHT_CARD)
+        if (
+            dev_hand[ROAD_BUILDING_INDEX] >= 1
+            and owned_at_start[ROAD_BUILDING_INDEX]
+            and len(self._road_actions(player)) > 0
+        ):
+            actions.append(PLAY_ROAD_BUILDING)
+        return actions
+
+    def _road_actions(self, player):
+        if self.roads_available[player] <= 0:
+            return []
+        actions = self.buildable_edges_cache[player]
+        if actions is None:
+            edge_owner = self.edge_owner
+            node_edges = self.topology.node_edges
+            edges = set()
+            for node in self.reach[player]:
+                for edge, _ in node_edges[node]:
+                    if edge_owner[edge] == -1:
+                        edges.add(edge)
+            actions = [edge * NUM_ACTION_TYPES + BUILD_ROAD for edge in edges]
+            self.buildable_edges_cache[player] = actions
+        return actions
+
+    def _settlement_actions(self, player):
+        if self.settlements_available[player] <= 0:
+            return []
+        buildable = self.buildable_nodes
+        return [
+            node * NUM_ACTION_TYPES + BUILD_SETTLEMENT
+            for node in self.reach[player]
+            if buildable[node]
+        ]
+
+    def _year_of_plenty_actions(self):
+        bank = self.bank
+        options = set()
+        for i in range(len(RESOURCES)):
+            for j in range(i, len(RESOURCES)):
+                needed = 2 if i == j else 1
+                if bank[i] >= needed and bank[j] >= needed:
+                    options.add((i, j))
+                else:
+                    if bank[i] >= 1:
+                        options.add((i,))
+                    if bank[j] >= 1:
+                        options.add((j,))
+        return [
+            YEAR_OF_PLENTY_PARAM[cards] * NUM_ACTION_TYPES + PLAY_YEAR_OF_PLENTY
+            for cards in options
+        ]
+
+    def _maritime_trade_actions(self, player):
+        hand = self.hands[player]
+        rates = self.rates[player]
+        bank = self.bank
+        actions = []
+        if max(hand) < 2:
+            return actions  # best rate is 2:1
+        for give in range(len(RESOURCES)):
+            if hand[give] < rates[give]:
+                continue
+            for get in range(len(RESOURCES)):
+                if give != get and bank[get] > 0:
+                    param = give * len(RESOURCES) + get
+                    actions.append(param * NUM_ACTION_TYPES + MARITIME_TRADE)
+        return actions
+
+    def _robber_actions(self, player):
+        stride = self.num_players + 1
+        stealable = [
+            p != player and sum(hand) >= 1 for p, hand in enumerate(self.hands)
+        ]
+        actions = []
+        for tile, weights in enumerate(self.tile_weights):
+            if tile == self.robber_tile:
+                continue
+            param = tile * stride
+            found = False
+            for victim, weight in enumerate(weights):
+                if weight and stealable[victim]:
+                    actions.append(
+                        (param + victim + 1) * NUM_ACTION_TYPES + MOVE_ROBBER
+                    )
+                    found = True
+            if not found:
+                actions.append(param * NUM_ACTION_TYPES + MOVE_ROBBER)
+        return actions
+
+    # ===== State transitions
+    def apply(self, action: int):
+        """Carries out encoded action. Doesn't validate it."""
+        action_type = action % NUM_ACTION_TYPES
+        param = action // NUM_ACTION_TYPES
+        player = self.current_player
+
+        if action_type == END_TURN:
+            self.played_dev_in_turn[player] = False
+            self.has_rolled[player] = False
+            dev_hand = self.dev_hands[player]
+            self.owned_at_start[player] = [
+                dev_hand[i] > 0 for i in PLAYABLE_DEV_INDEXES
+            ]
+            self._advance_turn()
+            self.prompt = PLAY_TURN
+        elif action_type == ROLL:
+            self.roll(DICE_OUTCOMES[int(random.random() * 36)])
+        elif action_type == BUILD_ROAD:
+            self._build_road(player, param)
+        elif action_type == BUILD_SETTLEMENT:
+            self._build_settlement(player, param)
+        elif action_type == BUILD_CITY:
+            self._pay(player, CITY_COST_FREQDECK)
+            self.node_is_city[param] = True
+            for tile in self.topology.node_tiles[param]:
+                self.tile_weights[tile][player] += 1
+            self.settlements[player].remove(param)
+            self.cities[player].append(param)
+            self.settlements_available[player] += 1
+            self.cities_available[player] -= 1
+            self.victory_points[player] += 1
+            self.actual_victory_points[player] += 1
+        elif action_type == BUY_DEVELOPMENT_CARD:
+            self._pay(player, DEVELOPMENT_CARD_COST_FREQDECK)
+            card = self.dev_deck.pop()  # already shuffled
+            dev_index = DEVELOPMENT_CARDS.index(card)
+            self.dev_hands[player][dev_index] += 1
+            if dev_index == VICTORY_POINT_INDEX:
+                self.actual_victory_points[player] += 1
+        elif action_type == MOVE_ROBBER:
+            stride = self.num_players + 1
+            self.robber_tile = param // stride
+            victim = param % stride - 1
+            if victim != -1:
+                victim_hand = self.hands[victim]
+                pick = random.randrange(sum(victim_hand))
+                for resource, amount in enumerate(victim_hand):
+                    if pick < amount:
+                        break
+                    pick -= amount
+                victim_hand[resource] -= 1
+                self.hands[player][resource] += 1
+            self.prompt = PLAY_TURN
+        elif action_type == DISCARD:
+            self._discard(player)
+        elif action_type == PLAY_KNIGHT_CARD:
+            self._play_dev(player, KNIGHT_INDEX)
+            self.knights_played[player] += 1
+            self._maintain_largest_army(player)
+            self.prompt = MOVING_ROBBER
+        elif action_type == PLAY_YEAR_OF_PLENTY:
+            hand = self.hands[player]
+            for resource in YEAR_OF_PLENTY_OPTIONS[param]:
+                hand[resource] += 1
+                self.bank[resource] -= 1
+            self._play_dev(player, YEAR_OF_PLENTY_INDEX)
+        elif action_type == PLAY_MONOPOLY:
+            stolen = 0
+            for other, hand in enumerate(self.hands):
+                if other != player:
+                    stolen += hand[param]
+                    hand[param] = 0
+            self.hands[player][param] += stolen
+            self._play_dev(player, MONOPOLY_INDEX)
+        elif action_type == PLAY_ROAD_BUILDING:
+            self._play_dev(player, ROAD_BUILDING_INDEX)
+            self.is_road_building = True
+            self.free_roads_available = 2
+        elif action_type == MARITIME_TRADE:
+            give, get = divmod(param, len(RESOURCES))
+            rate = self.rates[player][give]
+            hand = self.hands[player]
+            hand[give] -= rate
+            self.bank[give] += rate
+            hand[get] += 1
+            self.bank[get] -= 1
+        else:
+            raise ValueError("Unknown action " + str(action))
+
+    def roll(self, dices: Tuple[int, int]):
+        """Carries out a ROLL of current player with the given dices"""
+        player = self.current_player
+        self.has_rolled[player] = True
+        number = dices[0] + dices[1]
+        if number == 7:
+            discarders = [sum(hand) > self.discard_limit for hand in self.hands]
+            if any(discarders):
+                self.current_player = discarders.index(True)
+                self.prompt = DISCARDING
+            else:
+                self.prompt = MOVING_ROBBER
+            return
+
+        topology = self.topology
+        payout = [[0] * len(RESOURCES) for _ in range(self.num_players)]
+        totals = [0] * len(RESOURCES)
+        for tile in topology.number_tiles[number]:
+            if tile == self.robber_tile:
+                continue
+            resource = topology.tile_resources[tile]
+            for owner, amount in enumerate(self.tile_weights[tile]):
+                if amount:
+                    payout[owner][resource] += amount
+                    totals[resource] += amount
+        bank = self.bank
+        for resource in range(len(RESOURCES)):
+            if totals[resource] == 0 or totals[resource] > bank[resource]:
+                continue  # depleted resources aren't yielded to anyone
+            bank[resource] -= totals[resource]
+            for owner in range(self.num_players):
+                self.hands[owner][resource] += payout[owner][resource]
+        self.prompt = PLAY_TURN
+
+    def _discard(self, player):
+        hand = self.hands[player]
+        listdeck = [r for r in range(len(RESOURCES)) for _ in range(hand[r])]
+        for resource in random.sample(listdeck, k=len(listdeck) // 2):
+            hand[resource] -= 1
+            self.bank[resource] += 1
+
+        # Advance to next discarder (note main engine uses 7 here, not discard_limit)
+        for other in range(player + 1, self.num_players):
+            if sum(self.hands[other]) > 7:
+                self.current_player = other
+                return
+        self.current_player = self.current_turn
+        self.prompt = MOVING_ROBBER
+
+    def _pay(self, player, cost):
+        hand = self.hands[player]
+        bank = self.bank
+        for resource in range(len(RESOURCES)):
+            hand[resource] -= cost[resource]
+            bank[resource] += cost[resource]
+
+    def _play_dev(self, player, dev_index):
+        self.dev_hands[player][dev_index] -= 1
+        self.played_dev_in_turn[player] = True
+
+    def _advance_turn(self, direction=1):
+        self.current_player = (self.current_player + direction) % self.num_players
+        self.current_turn = self.current_player
+        self.num_turns += 1
+
+    def _build_settlement(self, player, node):
+        topology = self.topology
+        self.node_owner[node] = player
+        self.settlements[player].append(node)
+        for tile in topology.node_tiles[node]:
+            self.tile_weights[tile][player] += 1
+        self.settlements_available[player] -= 1
+        self.victory_points[player] += 1
+        self.actual_victory_points[player] += 1
+        for port in topology.node_ports[node]:
+            self._add_port(player, port)
+
+        if self.is_initial_build_phase:
+            self.reach[player].add(node)
+            if len(self.settlements[player]) == 2:  # yield resources
+                hand = self.hands[player]
+                for tile in topology.node_tiles[node]:
+                    resource = topology.tile_resources[tile]
+                    if resource != -1:
+                        self.bank[resource] -= 1
+                        hand[resource] += 1
+            self.prompt = INITIAL_ROAD
+        else:
+            self._pay(player, SETTLEMENT_COST_FREQDECK)
+            self._maybe_cut_roads(player, node)
+
+        self.buildable_edges_cache = [None] * self.num_players
+        self.buildable_nodes[node] = False
+        for neighbor in topology.node_neighbors[node]:
+            if neighbor < len(self.buildable_nodes):
+                self.buildable_nodes[neighbor] = False
+
+    def _maybe_cut_roads(self, player, node):
+        """Recomputes longest road of enemies whose road got split at node"""
+        ends_by_player: List[List[int]] = [[] for _ in range(self.num_players)]
+        for edge, other_node in self.topology.node_edges[node]:
+            owner = self.edge_owner[edge]
+            if owner != -1 and owner != player:
+                ends_by_player[owner].append(other_node)
+        plowed = [p for p, ends in enumerate(ends_by_player) if len(ends) == 2]
+        if len(plowed) == 0:
+            return
+
+        previous_owner = self.road_owner
+        for other in plowed:
+            for end in ends_by_player[other]:
+                self.reach[other].update(self._dfs_walk(end, other))
+            self.road_lengths[other] = self._longest_road(other)
+        # Mirror Board.build_settlement: longest road goes to max length player.
+        best = max(range(self.num_players), key=lambda p: self.road_lengths[p])
+        self.road_owner = best
+        self.road_length = self.road_lengths[best]
+        self._transfer_road_points(previous_owner)
+
+    def _dfs_walk(self, node, player):
+        return dfs_walk(self.topology, self.edge_owner, self.node_owner, node, player)
+
+    def _build_road(self, player, edge):
+        self.edge_owner[edge] = player
+        self.roads_available[player] -= 1
+        self.buildable_edges_cache = [None] * self.num_players
+        a, b = self.topology.edges[edge]
+        node_owner = self.node_owner
+        reach = self.reach[player]
+        a_enemy = node_owner[a] != -1 and node_owner[a] != player
+        b_enemy = node_owner[b] != -1 and node_owner[b] != player
+        if a in reach and not b_enemy:
+            reach.add(b)
+        elif b in reach and not a_enemy:
+            reach.add(a)
+
+        if self.is_initial_build_phase:
+            self._maintain_longest_road(player, edge)
+            num_buildings = sum(len(nodes) for nodes in self.settlements)
+            if num_buildings < self.num_players:
+                self._advance_turn()
+                self.prompt = INITIAL_SETTLEMENT
+            elif num_buildings == self.num_players:
+                self.prompt = INITIAL_SETTLEMENT
+            elif num_buildings == 2 * self.num_players:
+                self.is_initial_build_phase = False
+                self.prompt = PLAY_TURN
+            else:
+                self._advance_turn(-1)
+                self.prompt = INITIAL_SETTLEMENT
+        elif self.is_road_building and self.free_roads_available > 0:
+            self._maintain_longest_road(player, edge)
+            self.free_roads_available -= 1
+            if self.free_roads_available == 0 or len(self._road_actions(player)) == 0:
+                self.is_road_building = False
+                self.free_roads_available = 0
+        else:
+            self._pay(player, ROAD_COST_FREQDECK)
+            self._maintain_longest_road(player, edge)
+
+    def _maintain_longest_road(self, player, edge):
+        previous_owner = self.road_owner
+        # New road can only lengthen trails that go through it.
+        length = max(
+            self.road_lengths[player],
+            longest_road_through(
+                self.topology,
+                self.edge_owner,
+                self.node_owner,
+                player,
+                self.reach[player],
+                edge,
+            ),
+        )
+        self.road_lengths[player] = max(self.road_lengths[player], length)
+        if length >= 5 and length > self.road_length:
+            self.road_owner = player
+            self.road_length = length
+        self._transfer_road_points(previous_owner)
+
+    def _transfer_road_points(self, previous_owner):
+        owner = self.road_owner
+        if owner == -1 or owner == previous_owner:
+            return
+        self.victory_points[owner] += 2
+        self.actual_victory_points[owner] += 2
+        if previous_owner != -1:
+            self.victory_points[previous_owner] -= 2
+            self.actual_victory_points[previous_owner] -= 2
+
+    def _longest_road(self, player):
+        return longest_road_length(
+            self.topology, self.edge_owner, self.node_owner, player, self.reach[player]
+        )
+
+    def _maintain_largest_army(self, player):
+        size = self.knights_played[player]
+        if size < 3:
+            return
+        previous = self.army_owner
+        if previous == -1 or (
+            previous != player and self.knights_played[previous] < size
+        ):
+            self.army_owner = player
+            self.victory_points[player] += 2
+            self.actual_victory_points[player] += 2
+            if previous != -1:
+                self.victory_points[previous] -= 2
+                self.actual_victory_points[previous] -= 2
+
+    # ===== Playouts
+    def winner(self) -> int:
+        """Seating index of winning player, or -1 if no one has won yet"""
+        result = -1
+        for player, points in enumerate(self.actual_victory_points):
+            if points >= self.vps_to_win:
+                result = player
+        return result
+
+    def scores(self) -> Dict[Color, int]:
+        return dict(zip(self.colors, self.actual_victory_points))
+
+    def play(
+        self,
+        weights: Optional[Mapping[ActionType, float]] = None,
+        turns_limit: int = TURNS_LIMIT,
+        deadline: Optional[float] = None,
+    ) -> Optional[Color]:
+        """Plays out (mutating) this state at random until someone wins.
+
+        Args:
+            weights (Mapping[ActionType, float], optional): Relative weight
+                to sample actions of each type with (missing types weigh 1).
+                Defaults to None (uniformly at random, like RandomPlayer).
+            turns_limit (int, optional): Same as TURNS_LIMIT in Game.
+            deadline (float, optional): time.perf_counter() time to stop
+                playing at (like reaching turns_limit). Defaults to None.
+
+        Returns:
+            Color: winning color or None if game exceeded turns_limit (or
+                deadline)
+        """
+        type_weights = None
+        if weights is not None:
+            type_weights = [weights.get(t, 1) for t in ACTION_TYPES]
+
+        winner = self.winner()
+        while winner == -1 and self.num_turns < turns_limit:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            actions = self.playable_actions()
+            if len(actions) == 1:
+                action = actions[0]
+            elif type_weights is None:
+                action = actions[int(random.random() * len(actions))]
+            else:
+                action = random.choices(
+                    actions,
+                    weights=[type_weights[a % NUM_ACTION_TYPES] for a in actions],
+                )[0]
+            self.apply(action)
+            if self.actual_victory_points[self.current_player] >= self.vps_to_win:
+                winner = self.winner()
+            elif action % NUM_ACTION_TYPES in (BUILD_SETTLEMENT, BUILD_ROAD):
+                winner = self.winner()  # longest road might have been taken
+        return None if winner == -1 else self.colors[winner]
+
+
+def rollout(
+    game: Game,
+    weights: Optional[Mapping[ActionType, float]] = None,
+    return_scores: bool = False,
+    deadline: Optional[float] = None,
+) -> Union[Optional[Color], Tuple[Optional[Color], Dict[Color, int]]]:
+    """Plays a copy of the game until the end at random. Game is not modified.
+
+    Much faster equivalent of game.copy().play() with random players.
+
+    Args:
+        game (Game): game to play out
+        weights (Mapping[ActionType, float], optional): See RolloutState.play
+        return_scores (bool, optional): Whether to also return final actual
+            victory points by color. Defaults to False.
+        deadline (float, optional): See RolloutState.play
+
+    Returns:
+        Color: winning color (or None if truncated). If return_scores, a
+            2-tuple of it and the color => victory points dictionary.
+    """
+    state = RolloutState.from_game(game)
+    winner = state.play(weights, deadline=deadline)
+    if return_scores:
+        return winner, state.scores()
+    return winner
+
+
+# ===== Encoding
+def encode_action(state: RolloutState, action: Action) -> int:
+    """Converts an Action (as in playable_actions) into its int encoding"""
+    action_type = ACTION_TYPE_INDEX[action.action_type]
+    value = action.value
+    if action.action_type in (ActionType.BUILD_SETTLEMENT, ActionType.BUILD_CITY):
+        param = value
+    elif action.action_type == ActionType.BUILD_ROAD:
+        param = state.topology.edge_index[value]
+    elif action.action_type == ActionType.MOVE_ROBBER:
+        coordinate, victim, _ = value
+        victim_index = -1 if victim is None else state.colors.index(victim)
+        param = (
+            state.topology.tile_index[coordinate] * (state.num_players + 1)
+            + victim_index
+            + 1
+        )
+    elif action.action_type == ActionType.PLAY_YEAR_OF_PLENTY:
+        param = YEAR_OF_PLENTY_PARAM[tuple(sorted(RESOURCES.index(r) for r in value))]
+    elif action.action_type == ActionType.PLAY_MONOPOLY:
+        param = RESOURCES.index(value)
+    elif action.action_type == ActionType.MARITIME_TRADE:
+        param = RESOURCES.index(value[0]) * len(RESOURCES) + RESOURCES.index(value[-1])
+    else:
+        param = 0
+    return param * NUM_ACTION_TYPES + action_type
+
+
+def decode_action(state: RolloutState, action: int) -> Action:
+    """Converts an int encoded action into an Action (as in playable_actions)"""
+    action_type = ACTION_TYPES[action % NUM_ACTION_TYPES]
+    param = action // NUM_ACTION_TYPES
+    color = state.colors[state.current_player]
+    value = None
+    if action_type in (ActionType.BUILD_SETTLEMENT, ActionType.BUILD_CITY):
+        value = param
+    elif action_type == ActionType.BUILD_ROAD:
+        value = state.topology.edges[param]
+    elif action_type == ActionType.MOVE_ROBBER:
+        tile, victim = divmod(param, state.num_players + 1)
+        victim_color = None if victim == 0 else state.colors[victim - 1]
+        value = (state.topology.tile_coordinates[tile], victim_color, None)
+    elif action_type == ActionType.PLAY_YEAR_OF_PLENTY:
+        value = tuple(RESOURCES[r] for r in YEAR_OF_PLENTY_OPTIONS[param])
+    elif action_type == ActionType.PLAY_MONOPOLY:
+        value = RESOURCES[param]
+    elif action_type == ActionType.MARITIME_TRADE:
+        give, get = divmod(param, len(RESOURCES))
+        rate = state.rates[state.current_player][give]
+        value = tuple([RESOURCES[give]] * rate + [None] * (4 - rate) + [RESOURCES[get]])
+    return Action(color, action_type, value)
@@ -7,6 +7,7 @@ import pickle
 from collections import defaultdict
 from typing import Any, List, Tuple, Dict, Iterable
 
+from catan.core.models.action_log import ActionLog
 from catan.core.models.map import BASE_MAP_TEMPLATE, CatanMap
 from catan.core.models.board import Board
 from catan.core.models.enums import (
@@ -76,6 +77,7 @@ PLAYER_INITIAL_STATE = {
     # de-normalized features (for performance since we think they are good features)
     "ACTUAL_VICTORY_POINTS": 0,
     "LONGEST_ROAD_LENGTH": 0,
+    "RESOURCE_CARDS_IN_HAND": 0,
     "KNIGHT_OWNED_AT_START": False,
     "MONOPOLY_OWNED_AT_START": False,
     "YEAR_OF_PLENTY_OWNED_AT_START": False,
@@ -88,6 +90,50 @@ for dev_card in DEVELOPMENT_CARDS:
     PLAYER_INITIAL_STATE[f"PLAYED_{dev_card}"] = 0
 
 
+class ChanceStreams:
+    """Sources of randomness of a game's chance events, one per purpose.
+
+    With a seed, each purpose gets its own random.Random, so e.g. the k-th
+    dice roll of a game is the same whatever the players decide (and however
+    many random numbers they draw). Lets bots be compared on the same luck
+    (see catan.tournament's duplicate mode). Without a seed, all purposes
+    use the global random module (the default).
+
+    Attributes:
+        dice: rolls (2 randint calls each)
+        steal: card stolen by the robber
+        deck: development deck shuffle
+        discard: cards discarded at random on a 7
+    """
+
+    PURPOSES = ("dice", "steal", "deck", "discard")
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        for purpose in self.PURPOSES:
+            rng = random if seed is None else random.Random(f"{seed}:{purpose}")
+            setattr(self, purpose, rng)
+
+    def __getstate__(self):
+        if self.seed is None:  # the random module can't be pickled
+            return {"seed": None}
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if state["seed"] is None:
+            self.__init__()
+        else:
+            self.__dict__.update(state)
+
+
+GLOBAL_CHANCE = ChanceStreams()
+
+
+def get_chance(state) -> ChanceStreams:
+    # states pickled before chance streams existed use the global ones
+    return getattr(state, "chance", GLOBAL_CHANCE)
+
+
 class State:
     """Collection of variables representing state
 
@@ -111,7 +157,8 @@ class State:
         buildings_by_color (Dict[Color, Dict[FastBuildingType, List]]): Cache of
             buildings. Can be used like: `buildings_by_color[Color.RED][SETTLEMENT]`
             to get a list of all node ids where RED has settlements.
-        actions (List[Action]): Log of all actions taken. Fully-specified actions.
+        actions (ActionLog): Log of all actions taken. Fully-specified actions.
+            List-like; copies share history (see ActionLog).
         num_turns (int): number of turns thus far
         current_player_index (int): index per colors array of player that should be
             making a decision now. Not necesarilly the same as current_turn_index
@@ -126,6 +173,12 @@ class State:
         free_roads_available (int): Number of roads available left in Road Building
             phase.
         playable_actions (List[Action]): List of playable actions by current player.
+        max_discard_options (int): How many explicit DISCARD actions to offer
+            (best-ranked first). 0 offers a single action that discards at random.
+        chance (ChanceStreams): Randomness of dice, steals, dev deck and random
+            discards. Copies use the global streams (GLOBAL_CHANCE), so that
+            simulations (e.g. bots' searches) can't peek at, nor advance, the
+            real game's streams.
     """
 
     def __init__(
@@ -133,13 +186,21 @@ class State:
         players: List[Player],
         catan_map=None,
         discard_limit=7,
+        max_discard_options=0,
         initialize=True,
+        shuffle_players=True,
+        chance=None,
     ):
         if initialize:
-            self.players = random.sample(players, len(players))
+            self.chance = chance or GLOBAL_CHANCE
+            if shuffle_players:
+                self.players = random.sample(players, len(players))
+            else:  # seated in the given order (e.g. to rotate seats)
+                self.players = list(players)
             self.colors = tuple([player.color for player in self.players])
             self.board = Board(catan_map or CatanMap.from_template(BASE_MAP_TEMPLATE))
             self.discard_limit = discard_limit
+            self.max_discard_options = max_discard_options
 
             # feature-ready dictionary
             self.player_state = dict()
@@ -152,13 +213,13 @@ class State:
 
             self.resource_freqdeck = starting_resource_bank()
             self.development_listdeck = starting_devcard_bank()
-            random.shuffle(self.development_listdeck)
+            self.chance.deck.shuffle(self.development_listdeck)
 
             # Auxiliary attributes to implement game logic
             self.buildings_by_color: Dict[Color, Dict[Any, Any]] = {
                 p.color: defaultdict(list) for p in players
             }
-            self.actions: List[Action] = []  # log of all action taken by players
+            self.actions = ActionLog()  # log of all action taken by players
             self.num_turns = 0  # num_completed_turns
 
             # Current prompt / player
@@ -194,6 +255,8 @@ class State:
         state_copy = State([], None, initialize=False)
         state_copy.players = self.players
         state_copy.discard_limit = self.discard_limit  # immutable
+        state_copy.max_discard_options = self.max_discard_options  # immutable
+        state_copy.chance = GLOBAL_CHANCE
 
         state_copy.board = self.board.copy()
 
@@ -207,7 +270,7 @@ class State:
         state_copy.buildings_by_color = pickle.loads(
             pickle.dumps(self.buildings_by_color)
         )
-        state_copy.actions = self.actions.copy()
+        state_copy.actions = self.actions.copy()  # O(1), shares history
         state_copy.num_turns = self.num_turns
 
         # Current prompt / player
@@ -226,13 +289,17 @@ class State:
         return state_copy
 
 
-def roll_dice():
+def roll_dice(rng=random):
     """Yields two random numbers
 
+    Args:
+        rng (random.Random, optional): Source of randomness. Defaults to the
+            global random module.
+
     Returns:
         tuple[int, int]: 2-tuple of random numbers from 1 to 6 inclusive.
     """
-    return (random.randint(1, 6), random.randint(1, 6))
+    return (rng.randint(1, 6), rng.randint(1, 6))
 
 
 def yield_resources(board: Board, resource_freqdeck, number):
@@ -253,10 +320,13 @@ def yield_resources(board: Board, resource_freqdeck, number):
         lambda: defaultdict(int)
     )
     resource_totals: Dict[FastResource, int] = defaultdict(int)
-    for coordinate, tile in board.map.land_tiles.items():
-        if tile.number != number or board.robber_coordinate == coordinate:
+    compiled = board.map.compile()
+    robber_tile = compiled.coordinate_to_tile[board.robber_coordinate]
+    for tile_id in compiled.number_tiles.get(number, ()):
+        if tile_id == robber_tile:
             continue  # doesn't yield
 
+        tile = board.map.tiles_by_id[tile_id]
         for node_id in tile.nodes.values():
             building = board.buildings.get(node_id, None)
             assert tile.resource is not None
@@ -341,6 +411,7 @@ def apply_action(state: State, action: Action):
                     if tile.resource != None:
                         freqdeck_draw(state.resource_freqdeck, 1, tile.resource)  # type: ignore
                         state.player_state[f"{key}_{tile.resource}_IN_HAND"] += 1
+                        state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] += 1
 
             # state.current_player_index stays the same
             state.current_prompt = ActionPrompt.BUILD_INITIAL_ROAD
@@ -449,7 +520,7 @@ def apply_action(state: State, action: Action):
         key = player_key(state, action.color)
         state.player_state[f"{key}_HAS_ROLLED"] = True
 
-        dices = action.value or roll_dice()
+        dices = action.value or roll_dice(get_chance(state).dice)
         number = dices[0] + dices[1]
         action = Action(action.color, action.action_type, dices)
 
@@ -486,10 +557,16 @@ def apply_action(state: State, action: Action):
         num_to_discard = len(hand) // 2
         if action.value is None:
             # TODO: Forcefully discard randomly so that decision tree doesnt explode in possibilities.
-            discarded = random.sample(hand, k=num_to_discard)
+            discarded = get_chance(state).discard.sample(hand, k=num_to_discard)
         else:
-            discarded = action.value  # for replay functionality
+            discarded = action.value  # chosen discard or replay functionality
+        if len(discarded) != num_to_discard:
+            raise ValueError(
+                f"Trying to discard {len(discarded)} cards, not {num_to_discard}"
+            )
         to_discard = freqdeck_from_listdeck(discarded)
+        if not player_resource_freqdeck_contains(state, action.color, to_discard):
+            raise ValueError("Trying to discard cards not in hand")
 
         player_freqdeck_subtract(state, action.color, to_discard)
         state.resource_freqdeck = freqdeck_add(state.resource_freqdeck, to_discard)
@@ -515,7 +592,9 @@ def apply_action(state: State, action: Action):
         state.board.robber_coordinate = coordinate
         if robbed_color is not None:
             if robbed_resource is None:
-                robbed_resource = player_deck_random_draw(state, robbed_color)
+                robbed_resource = player_deck_random_draw(
+                    state, robbed_color, get_chance(state).steal
+                )
                 action = Action(
                     action.color,
                     action.action_type,
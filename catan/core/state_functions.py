@@ -18,6 +18,7 @@ from catan.core.models.enums import (
     SETTLEMENT,
     CITY,
     ROAD,
+    RESOURCES,
     FastResource,
 )
 
@@ -173,6 +174,7 @@ def build_settlement(state, color, node_id, is_free):
         state.player_state[f"{key}_BRICK_IN_HAND"] -= 1
         state.player_state[f"{key}_SHEEP_IN_HAND"] -= 1
         state.player_state[f"{key}_WHEAT_IN_HAND"] -= 1
+        state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= 4
 
 
 def build_road(state, color, edge, is_free):
@@ -183,6 +185,7 @@ def build_road(state, color, edge, is_free):
     if not is_free:
         state.player_state[f"{key}_WOOD_IN_HAND"] -= 1
         state.player_state[f"{key}_BRICK_IN_HAND"] -= 1
+        state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= 2
         state.resource_freqdeck = freqdeck_add(
             state.resource_freqdeck, ROAD_COST_FREQDECK
         )  # replenish bank
@@ -201,6 +204,7 @@ def build_city(state, color, node_id):
 
     state.player_state[f"{key}_WHEAT_IN_HAND"] -= 2
     state.player_state[f"{key}_ORE_IN_HAND"] -= 3
+    state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= 5
 
 
 # ===== Deck Functions
@@ -240,6 +244,7 @@ def player_freqdeck_add(state, color, freqdeck):
     state.player_state[f"{key}_SHEEP_IN_HAND"] += freqdeck[2]
     state.player_state[f"{key}_WHEAT_IN_HAND"] += freqdeck[3]
     state.player_state[f"{key}_ORE_IN_HAND"] += freqdeck[4]
+    state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] += sum(freqdeck)
 
 
 def player_freqdeck_subtract(state, color, freqdeck):
@@ -249,6 +254,7 @@ def player_freqdeck_subtract(state, color, freqdeck):
     state.player_state[f"{key}_SHEEP_IN_HAND"] -= freqdeck[2]
     state.player_state[f"{key}_WHEAT_IN_HAND"] -= freqdeck[3]
     state.player_state[f"{key}_ORE_IN_HAND"] -= freqdeck[4]
+    state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= sum(freqdeck)
 
 
 def buy_dev_card(state, color, dev_card):
@@ -265,18 +271,13 @@ def buy_dev_card(state, color, dev_card):
     state.player_state[f"{key}_SHEEP_IN_HAND"] -= 1
     state.player_state[f"{key}_WHEAT_IN_HAND"] -= 1
     state.player_state[f"{key}_ORE_IN_HAND"] -= 1
+    state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= 3
 
 
 def player_num_resource_cards(state, color, card: Optional[FastResource] = None):
     key = player_key(state, color)
     if card is None:
-        return (
-            state.player_state[f"{key}_WOOD_IN_HAND"]
-            + state.player_state[f"{key}_BRICK_IN_HAND"]
-            + state.player_state[f"{key}_SHEEP_IN_HAND"]
-            + state.player_state[f"{key}_WHEAT_IN_HAND"]
-            + state.player_state[f"{key}_ORE_IN_HAND"]
-        )
+        return state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"]
     else:
         return state.player_state[f"{key}_{card}_IN_HAND"]
 
@@ -307,16 +308,19 @@ def player_deck_draw(state, color, card, amount=1):
     key = player_key(state, color)
     assert state.player_state[f"{key}_{card}_IN_HAND"] >= amount
     state.player_state[f"{key}_{card}_IN_HAND"] -= amount
+    if card in RESOURCES:  # also used to draw development cards
+        state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] -= amount
 
 
 def player_deck_replenish(state, color, resource, amount=1):
     key = player_key(state, color)
     state.player_state[f"{key}_{resource}_IN_HAND"] += amount
+    state.player_state[f"{key}_RESOURCE_CARDS_IN_HAND"] += amount
 
 
-def player_deck_random_draw(state, color):
+def player_deck_random_draw(state, color, rng=random):
     deck_array = player_deck_to_array(state, color)
-    resource = random.choice(deck_array)
+    resource = rng.choice(deck_array)
     player_deck_draw(state, color, resource)
     return resource
 
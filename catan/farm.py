@@ -0,0 +1,348 @@
+"""
+Distributed game farm: a coordinator hands tournament games to workers
+(on this or other machines) over TCP.
+
+Workers connect to the coordinator, get the tournament's config (player
+specs, map pool file, vps_to_win) and then play the GameTasks they are sent,
+streaming back one result record per game (see catan.tournament). Games
+are fully determined by their task (seed, seats, map), so results don't
+depend on which or how many workers played them. A game is retried on
+another worker if its worker fails, disconnects or times out.
+
+Protocol: one JSON object per line, in both directions.
+
+    worker -> coordinator: {"hello": "<worker name>"}
+    coordinator -> worker: {"config": {"players": [...], "maps": null,
+                            "vps_to_win": 10}}
+    coordinator -> worker: {"task": {"game": 3, "seed": 3, "seats": [1, 0],
+                            "map_id": null}}        (a few in flight)
+    worker -> coordinator: {"result": {...}} or {"error": {"game": 3,
+                            "message": "..."}}
+    coordinator -> worker: {"stop": true}
+
+Usage (the coordinator is the tournament CLI):
+    python -m catan.tournament R W --games 1000 --listen 0.0.0.0:5555
+    python -m catan.farm HOST:5555 [--processes N]     # on each node
+"""
+
+import argparse
+import json
+import multiprocessing
+import socket
+import subprocess
+import sys
+import threading
+import time
+import queue
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from catan.tournament import GameRunner, GameTask, PlayerSpec
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    """'host:port' (host defaults to localhost) => (host, port)"""
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _send(file, message: Dict[str, Any]):
+    file.write(json.dumps(message).encode() + b"\n")
+    file.flush()
+
+
+def _receive(file) -> Optional[Dict[str, Any]]:
+    """Next message, or None if the connection was closed."""
+    line = file.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class Coordinator:
+    """Serves tasks to workers and collects their results.
+
+    Example:
+        coordinator = Coordinator(specs, tasks, port=5555)
+        coordinator.start()
+        for result in coordinator.results():
+            ...
+        print(coordinator.failed)  # games that ran out of retries
+    """
+
+    def __init__(
+        self,
+        specs: Sequence[PlayerSpec],
+        tasks: Sequence[GameTask],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        maps_path: Optional[str] = None,
+        vps_to_win: int = 10,
+        window: int = 2,
+        max_retries: int = 3,
+        task_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            specs (Sequence[PlayerSpec]): players of the tournament
+            tasks (Sequence[GameTask]): games to play
+            host (str, optional): interface to listen on. Defaults to localhost.
+            port (int, optional): 0 picks a free port (see .address).
+            maps_path (str, optional): MapPool file (must be readable by
+                workers at the same path).
+            vps_to_win (int, optional): Defaults to 10.
+            window (int, optional): tasks in flight per worker, so workers
+                don't wait on the network between games. Defaults to 2.
+            max_retries (int, optional): times a game is retried after its
+                worker failed or was lost, before giving up. Defaults to 3.
+            task_timeout (float, optional): seconds to wait for a worker's
+                next result before considering it lost. None waits forever.
+        """
+        self.config = {
+            "players": [str(spec) for spec in specs],
+            "maps": maps_path,
+            "vps_to_win": vps_to_win,
+        }
+        self.num_tasks = len(tasks)
+        self.window = window
+        self.max_retries = max_retries
+        self.task_timeout = task_timeout
+
+        self.pending: Deque[GameTask] = deque(tasks)
+        self.attempts: Dict[int, int] = {}
+        self.done: Set[int] = set()
+        self.failed: Dict[int, str] = {}  # game => last error
+        self.workers: Dict[str, int] = {}  # worker name => games played
+        self._lock = threading.Condition()
+        self._results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._connections: Set[socket.socket] = set()
+        self._closed = False
+        self._server = socket.create_server((host, port))
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.getsockname()[:2]
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        """Stops serving. Workers see their connection close and exit."""
+        with self._lock:
+            self._closed = True
+            connections = list(self._connections)
+            self._lock.notify_all()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._server.close()
+
+    def finished(self) -> bool:
+        return len(self.done) + len(self.failed) >= self.num_tasks
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """Yields results as they arrive, until every game is done or failed.
+        Closing the generator closes the coordinator."""
+        try:
+            while True:
+                with self._lock:
+                    if self.finished() and self._results.empty():
+                        return
+                try:
+                    yield self._results.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+        finally:
+            self.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:  # closed
+                return
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _next_task(self) -> Optional[GameTask]:
+        with self._lock:
+            while self.pending:
+                task = self.pending.popleft()
+                if task.game not in self.done and task.game not in self.failed:
+                    return task
+            return None
+
+    def _complete(self, worker: str, result: Dict[str, Any]):
+        with self._lock:
+            if result["game"] in self.done:  # e.g. retried after a timeout
+                return
+            self.done.add(result["game"])
+            self.workers[worker] = self.workers.get(worker, 0) + 1
+            self._results.put(result)
+            self._lock.notify_all()
+
+    def _retry(self, task: GameTask, reason: str):
+        with self._lock:
+            if task.game in self.done:
+                return
+            attempts = self.attempts.get(task.game, 0) + 1
+            self.attempts[task.game] = attempts
+            if attempts > self.max_retries:
+                self.failed[task.game] = reason
+            else:
+                self.pending.appendleft(task)
+            self._lock.notify_all()
+
+    def _serve(self, connection: socket.socket):
+        with self._lock:
+            if self._closed:
+                connection.close()
+                return
+            self._connections.add(connection)
+        file = connection.makefile("rwb")
+        in_flight: Dict[int, GameTask] = {}
+        worker = "?"
+        reason = "worker lost"
+        try:
+            hello = _receive(file)
+            if hello is None:
+                return
+            worker = hello.get("hello", "?")
+            _send(file, {"config": self.config})
+            while True:
+                while len(in_flight) < self.window:
+                    task = self._next_task()
+                    if task is None:
+                        break
+                    in_flight[task.game] = task
+                    _send(file, {"task": asdict(task)})
+                if not in_flight:
+                    with self._lock:
+                        if self._closed or self.finished():
+                            break
+                        # others' games may still come back for retry
+                        self._lock.wait(timeout=0.5)
+                    continue
+
+                connection.settimeout(self.task_timeout)
+                message = _receive(file)
+                connection.settimeout(None)
+                if message is None:
+                    return
+                if "result" in message:
+                    result = message["result"]
+                    in_flight.pop(result["game"], None)
+                    self._complete(worker, result)
+                elif "error" in message:
+                    error = message["error"]
+                    task = in_flight.pop(error["game"], None)
+                    if task is not None:
+                        self._retry(task, f"{worker}: {error['message']}")
+            _send(file, {"stop": True})
+        except socket.timeout:
+            reason = f"{worker} timed out"
+        except (OSError, ValueError):
+            pass
+        finally:
+            for task in in_flight.values():
+                self._retry(task, reason)
+            with self._lock:
+                self._connections.discard(connection)
+            try:
+                file.close()
+                connection.close()
+            except OSError:
+                pass
+
+
+def run_worker(address: Tuple[str, int], name: Optional[str] = None, wait: float = 30):
+    """Plays games for the coordinator at address until told to stop (or
+    the connection closes).
+
+    Args:
+        address (Tuple[str, int]): coordinator's (host, port)
+        name (str, optional): worker name, for the coordinator's stats.
+            Defaults to hostname:pid.
+        wait (float, optional): seconds to keep retrying to connect (e.g.
+            if the coordinator isn't up yet). Defaults to 30.
+    """
+    name = name or f"{socket.gethostname()}:{multiprocessing.current_process().pid}"
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            connection = socket.create_connection(address)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    with connection, connection.makefile("rwb") as file:
+        try:
+            _send(file, {"hello": name})
+            message = _receive(file)
+            if message is None:
+                return
+            config = message["config"]
+            runner = GameRunner(
+                [PlayerSpec.parse(text) for text in config["players"]],
+                config["maps"],
+                config["vps_to_win"],
+            )
+            while True:
+                message = _receive(file)
+                if message is None or "stop" in message:
+                    return
+                task = message["task"]
+                task = GameTask(
+                    task["game"], task["seed"], tuple(task["seats"]), task["map_id"]
+                )
+                try:
+                    result = runner.play(task)
+                except Exception as error:  # reported, so the game is retried
+                    _send(file, {"error": {"game": task.game, "message": repr(error)}})
+                    continue
+                _send(file, {"result": result})
+        except OSError:  # coordinator went away
+            return
+
+
+def spawn_local_workers(address: Tuple[str, int], count: int) -> List[subprocess.Popen]:
+    """Starts count worker processes on this machine (e.g. to stand in for
+    nodes)."""
+    host, port = address
+    return [
+        subprocess.Popen([sys.executable, "-m", "catan.farm", f"{host}:{port}"])
+        for _ in range(count)
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Game farm worker")
+    parser.add_argument("address", help="coordinator's host:port")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--wait", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    address = parse_address(args.address)
+    if args.processes == 1:
+        run_worker(address, wait=args.wait)
+        return 0
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(address, None, args.wait))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
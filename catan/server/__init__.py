@@ -11,10 +11,12 @@ def create_app(test_config=None):
 
     database_url = os.environ.get("DATABASE_URL", "sqlite:///:memory:")
     secret_key = os.environ.get("SECRET_KEY", "dev")
+    mcts_time_budget_ms = float(os.environ.get("MCTS_TIME_BUDGET_MS", 500))
     app.config.from_mapping(
         SECRET_KEY=secret_key,
         SQLALCHEMY_DATABASE_URI=database_url,
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        MCTS_TIME_BUDGET_MS=mcts_time_budget_ms,
     )
     if test_config is not None:
         app.config.update(test_config)
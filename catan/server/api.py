@@ -1,8 +1,7 @@
 import json
 from typing import Literal
-from flask import Response, Blueprint, jsonify, abort, request
+from flask import Response, Blueprint, current_app, jsonify, abort, request
 
-from catan.bots.mcts_bot import MCTSBot
 from catan.core.models.map import DEFAULT_MAP
 from catan.server.models import upsert_game_state, get_game_state
 from catan.core.json import GameEncoder, action_from_json
@@ -16,7 +15,10 @@ def player_factory(player_keys: Literal["MCTS", "RANDOM"]):
     players = []
     for player, color in zip(player_keys, Color):
         if player == "MCTS":
-            players.append(MCTSBot(color=color, n_simulations=30))
+            from catan.bots.mcts_bot import MCTSBot  # only load bots when needed
+
+            budget = current_app.config["MCTS_TIME_BUDGET_MS"]
+            players.append(MCTSBot(color=color, time_budget_ms=budget))
 
         if player == "RANDOM":
             players.append(RandomPlayer(color=color))
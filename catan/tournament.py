@@ -0,0 +1,758 @@
+"""
+Bot-vs-bot tournaments, played in parallel over a process pool.
+
+Players are given as specs (see PlayerSpec.parse), e.g. `R`, `W`, `VP` or
+`MCTS:n_simulations=50`. Game i is played with seed `seed + i` and, with
+seat rotation, player p sits at seat `(p - i) % num_players`, so every
+player gets every seat equally often. Games are deterministic given their
+seed, so results don't depend on the number of workers.
+
+Each finished game is appended to the output as a JSON line, e.g.
+
+    {"game": 7, "seed": 7, "map": null, "seats": [1, 2, 0],
+     "players": ["W", "MCTS:n_simulations=25", "R"], "winner": 2,
+     "turns": 78, "vps": [6, 4, 10], "seconds": 0.41}
+
+where seats[s] is the player (index into the specs) at seat s, players[s]
+its spec and winner is the winning seat (null if the game hit TURNS_LIMIT).
+Rerunning with --resume skips the games already in the file.
+
+Chance events (dice, steals, dev deck, random discards) draw from their own
+streams seeded by the game seed (see ChanceStreams), and the map is drawn
+from the seed too, so games with the same seed share their luck whatever
+the players do. Duplicate mode (--duplicate DEALS) uses this to compare
+bots with far fewer games: each deal (seed) is replayed for every seating
+(rotations, or all permutations with --all-seatings) and, with
+--candidates, for every candidate against the same field of players. The
+summary then adds paired differences between players, computed per deal.
+
+Usage:
+    python -m catan.tournament R W MCTS:n_simulations=25 --games 200
+        [--seed 0] [--workers N] [--output results.jsonl] [--resume]
+        [--no-rotate] [--maps maps.npy] [--listen HOST:PORT]
+        [--local-workers N]
+    python -m catan.tournament R R --duplicate 100
+        --candidates MCTS:n_simulations=25 MCTS:n_simulations=50
+
+With --listen (or --local-workers), games are served to catan.farm workers
+over TCP instead of played in a local process pool.
+"""
+
+import argparse
+import ast
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from catan.core.game import Game
+from catan.core.models.player import Color, Player
+from catan.core.state import ChanceStreams
+
+# spec code => (module, class). Class names work as codes too.
+PLAYER_TYPES = {
+    "R": ("catan.core.models.player", "RandomPlayer"),
+    "W": ("catan.core.players.weighted_random", "WeightedRandomPlayer"),
+    "VP": ("catan.core.players.search", "VictoryPointPlayer"),
+    "MCTS": ("catan.bots.mcts_bot", "MCTSBot"),
+}
+for _module, _name in list(PLAYER_TYPES.values()):
+    PLAYER_TYPES[_name] = (_module, _name)
+
+
+def _parse_value(text: str) -> Any:
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+@dataclass(frozen=True)
+class PlayerSpec:
+    """Picklable description of a player: type code plus constructor params
+    (besides color)."""
+
+    code: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Tuple[Tuple[str, Any], ...] = ()
+
+    @staticmethod
+    def parse(text: str) -> "PlayerSpec":
+        """Parses `CODE[:param,...]`, where each param is a value (positional)
+        or key=value. E.g. `MCTS:100` or `MCTS:n_simulations=100`.
+
+        Raises:
+            ValueError: if the code is unknown.
+        """
+        code, _, params = text.partition(":")
+        if code not in PLAYER_TYPES:
+            raise ValueError(
+                f"Unknown player type {code!r}. Use one of {', '.join(PLAYER_TYPES)}"
+            )
+        args, kwargs = [], []
+        for param in filter(None, params.split(",")):
+            key, equals, value = param.partition("=")
+            if equals:
+                kwargs.append((key.strip(), _parse_value(value.strip())))
+            else:
+                args.append(_parse_value(param.strip()))
+        return PlayerSpec(code, tuple(args), tuple(kwargs))
+
+    def build(self, color: Color) -> Player:
+        module, name = PLAYER_TYPES[self.code]
+        player_class = getattr(importlib.import_module(module), name)
+        return player_class(color, *self.args, **dict(self.kwargs))
+
+    def __str__(self):
+        params = [repr(a) for a in self.args]
+        params += [f"{key}={value!r}" for key, value in self.kwargs]
+        return self.code + (":" + ",".join(params) if params else "")
+
+
+@dataclass(frozen=True)
+class GameTask:
+    """One game of a tournament.
+
+    Attributes:
+        game (int): index of the game in the tournament
+        seed (int): game seed
+        seats (Tuple[int, ...]): player (index into the specs) at each seat
+        map_id (int, optional): map of the map pool to play on. None plays
+            on a random base map drawn from the seed.
+    """
+
+    game: int
+    seed: int
+    seats: Tuple[int, ...]
+    map_id: Optional[int] = None
+
+
+def schedule(
+    num_players: int,
+    num_games: int,
+    seed: int = 0,
+    rotate: bool = True,
+    num_maps: Optional[int] = None,
+) -> List[GameTask]:
+    """Tasks of a tournament. Game i uses seed + i and map i % num_maps.
+
+    Args:
+        num_players (int): players per game
+        num_games (int): number of games
+        seed (int, optional): seed of the first game. Defaults to 0.
+        rotate (bool, optional): rotate seats every game. If False, seating
+            is shuffled (from the game seed). Defaults to True.
+        num_maps (int, optional): size of the map pool, if any.
+    """
+    tasks = []
+    for game in range(num_games):
+        if rotate:
+            seats = tuple((s + game) % num_players for s in range(num_players))
+        else:
+            rng = random.Random(seed + game)
+            seats = tuple(rng.sample(range(num_players), k=num_players))
+        map_id = game % num_maps if num_maps else None
+        tasks.append(GameTask(game, seed + game, seats, map_id))
+    return tasks
+
+
+def schedule_duplicate(
+    lineups: Sequence[Sequence[int]],
+    num_deals: int,
+    seed: int = 0,
+    all_seatings: bool = False,
+    num_maps: Optional[int] = None,
+) -> List[GameTask]:
+    """Tasks of a duplicate tournament: deal i (seed + i, map i % num_maps)
+    is played once per lineup and seating.
+
+    Args:
+        lineups (Sequence[Sequence[int]]): players (indexes into the specs)
+            of each table to play every deal with.
+        num_deals (int): number of deals
+        seed (int, optional): seed of the first deal. Defaults to 0.
+        all_seatings (bool, optional): play every permutation of seats
+            instead of just the rotations. Defaults to False.
+        num_maps (int, optional): size of the map pool, if any.
+    """
+    tasks = []
+    for deal in range(num_deals):
+        map_id = deal % num_maps if num_maps else None
+        for lineup in lineups:
+            n = len(lineup)
+            if all_seatings:
+                orders: Iterable = itertools.permutations(range(n))
+            else:
+                orders = ([(s + r) % n for s in range(n)] for r in range(n))
+            for order in orders:
+                seats = tuple(lineup[i] for i in order)
+                tasks.append(GameTask(len(tasks), seed + deal, seats, map_id))
+    return tasks
+
+
+class GameRunner:
+    """Plays GameTasks of a tournament (one per worker process)."""
+
+    def __init__(
+        self,
+        specs: Sequence[PlayerSpec],
+        maps_path: Optional[str] = None,
+        vps_to_win: int = 10,
+    ):
+        self.specs = list(specs)
+        self.vps_to_win = vps_to_win
+        self.maps = None
+        if maps_path is not None:
+            from catan.core.map_pool import MapPool
+
+            self.maps = MapPool.load(maps_path)
+
+    def play(self, task: GameTask) -> Dict[str, Any]:
+        """Plays task's game and returns its result record."""
+        colors = list(Color)[: len(task.seats)]
+        players = [self.specs[p].build(c) for p, c in zip(task.seats, colors)]
+        catan_map = None
+        if task.map_id is not None:
+            if self.maps is None:
+                raise ValueError("Task has a map_id but no map pool was given")
+            catan_map = self.maps[task.map_id]
+
+        start = time.perf_counter()
+        game = Game(
+            players,
+            seed=task.seed,
+            catan_map=catan_map,
+            vps_to_win=self.vps_to_win,
+            shuffle_players=False,
+            chance=ChanceStreams(task.seed),
+        )
+        winner = game.play()
+        seconds = time.perf_counter() - start
+
+        state = game.state
+        return {
+            "game": task.game,
+            "seed": task.seed,
+            "map": task.map_id,
+            "seats": list(task.seats),
+            "players": [str(self.specs[p]) for p in task.seats],
+            "winner": None if winner is None else state.colors.index(winner),
+            "turns": state.num_turns,
+            "vps": [
+                state.player_state[f"P{seat}_ACTUAL_VICTORY_POINTS"]
+                for seat in range(len(task.seats))
+            ],
+            "seconds": round(seconds, 3),
+        }
+
+
+_RUNNER: Optional[GameRunner] = None
+
+
+def _init_worker(specs, maps_path, vps_to_win):
+    global _RUNNER
+    _RUNNER = GameRunner(specs, maps_path, vps_to_win)
+
+
+def _play(task: GameTask) -> Dict[str, Any]:
+    assert _RUNNER is not None
+    return _RUNNER.play(task)
+
+
+def play_games(
+    specs: Sequence[PlayerSpec],
+    tasks: Sequence[GameTask],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    maps_path: Optional[str] = None,
+    vps_to_win: int = 10,
+) -> Iterator[Dict[str, Any]]:
+    """Plays tasks over a process pool, yielding results as they finish
+    (in no particular order). Closing the generator stops the pool.
+
+    Args:
+        specs (Sequence[PlayerSpec]): players of the tournament
+        tasks (Sequence[GameTask]): games to play
+        workers (int, optional): processes. Defaults to os.cpu_count().
+            1 plays in this process.
+        chunksize (int, optional): tasks sent to a worker at a time.
+            Defaults to a few chunks per worker, at most 16 tasks each.
+        maps_path (str, optional): MapPool file, for tasks with map ids.
+        vps_to_win (int, optional): Defaults to 10.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        runner = GameRunner(specs, maps_path, vps_to_win)
+        for task in tasks:
+            yield runner.play(task)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, min(16, len(tasks) // (workers * 4)))
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(specs, maps_path, vps_to_win)
+    ) as pool:
+        yield from pool.imap_unordered(_play, tasks, chunksize=chunksize)
+
+
+def read_results(path: str, repair: bool = False) -> List[Dict[str, Any]]:
+    """Results in a JSON lines file. A truncated last line (e.g. from an
+    interrupted run) is ignored, and removed from the file if repair (so
+    results can be appended again)."""
+    with open(path, "rb") as file:
+        data = file.read()
+    complete = data[: data.rfind(b"\n") + 1]
+    if repair and len(complete) < len(data):
+        with open(path, "r+b") as file:
+            file.truncate(len(complete))
+    return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+
+def check_resumable(
+    results: Iterable[Dict[str, Any]],
+    tasks: Sequence[GameTask],
+    specs: Sequence[PlayerSpec],
+):
+    """Raises ValueError if results weren't played from tasks (and specs)."""
+    for result in results:
+        index = result["game"]
+        task = tasks[index] if 0 <= index < len(tasks) else None
+        if (
+            task is None
+            or result["seed"] != task.seed
+            or tuple(result["seats"]) != task.seats
+            or result["players"] != [str(specs[p]) for p in task.seats]
+            or result["map"] != task.map_id
+        ):
+            raise ValueError(
+                f"Result of game {index} doesn't match this tournament's "
+                "schedule (different players, seed or options?)"
+            )
+
+
+def wilson_interval(
+    successes: int, trials: int, confidence: float = 0.95
+) -> Tuple[float, float]:
+    """Wilson score interval of a binomial proportion ((0, 1) if no trials)."""
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = successes / trials
+    denominator = 1 + z**2 / trials
+    center = (p + z**2 / (2 * trials)) / denominator
+    margin = z * ((p * (1 - p) + z**2 / (4 * trials)) / trials) ** 0.5 / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+@dataclass(frozen=True)
+class PlayerSummary:
+    player: int
+    spec: str
+    games: int
+    wins: int
+    win_rate: float
+    low: float
+    high: float
+
+
+def summarize(
+    results: Iterable[Dict[str, Any]],
+    specs: Sequence[PlayerSpec],
+    confidence: float = 0.95,
+) -> List[PlayerSummary]:
+    """Win rate (with Wilson confidence interval) of each player. Games
+    without a winner count as played but not won."""
+    games = [0] * len(specs)
+    wins = [0] * len(specs)
+    for result in results:
+        for player in result["seats"]:
+            games[player] += 1
+        if result["winner"] is not None:
+            wins[result["seats"][result["winner"]]] += 1
+
+    summaries = []
+    for player, spec in enumerate(specs):
+        low, high = wilson_interval(wins[player], games[player], confidence)
+        win_rate = wins[player] / games[player] if games[player] else 0.0
+        summaries.append(
+            PlayerSummary(
+                player, str(spec), games[player], wins[player], win_rate, low, high
+            )
+        )
+    return summaries
+
+
+@dataclass(frozen=True)
+class PairedSummary:
+    """Win rate difference of player a minus player b, paired by deal.
+
+    Attributes:
+        deals (int): number of deals
+        difference (float): a's minus b's win rate
+        low, high (float): confidence interval of difference
+        variance_ratio (float): variance of difference relative to that of
+            the same number of independent games (lower is better; 0.5 means
+            independent games would need twice as many games).
+    """
+
+    a: int
+    b: int
+    deals: int
+    difference: float
+    low: float
+    high: float
+    variance_ratio: float
+
+
+def paired_difference(
+    results: Sequence[Dict[str, Any]], a: int, b: int, confidence: float = 0.95
+) -> PairedSummary:
+    """Compares the win rates of players a and b.
+
+    The standard error is computed with the games of a deal (same seed)
+    as one cluster, so luck shared by a deal cancels out. The same estimate
+    with each game as its own cluster gives the variance of as many
+    independent games, for variance_ratio.
+    """
+    games = {a: 0, b: 0}
+    wins = {a: 0, b: 0}
+    for result in results:
+        for seat, player in enumerate(result["seats"]):
+            if player in games:
+                games[player] += 1
+                wins[player] += seat == result["winner"]
+    if not games[a] or not games[b]:
+        return PairedSummary(a, b, 0, 0.0, -1.0, 1.0, float("nan"))
+    rates = {player: wins[player] / games[player] for player in games}
+
+    # each game's contribution to rates[a] - rates[b], minus its expectation
+    per_deal: Dict[int, float] = {}
+    independent = 0.0
+    for result in results:
+        influence = 0.0
+        for seat, player in enumerate(result["seats"]):
+            if player in games:
+                sign = 1 if player == a else -1
+                won = seat == result["winner"]
+                influence += sign * (won - rates[player]) / games[player]
+        independent += influence**2
+        per_deal[result["seed"]] = per_deal.get(result["seed"], 0.0) + influence
+
+    n = len(per_deal)
+    difference = rates[a] - rates[b]
+    if n < 2:
+        return PairedSummary(a, b, n, difference, -1.0, 1.0, float("nan"))
+    variance = sum(u**2 for u in per_deal.values()) * n / (n - 1)
+    margin = NormalDist().inv_cdf((1 + confidence) / 2) * variance**0.5
+    ratio = variance / independent if independent > 0 else float("nan")
+    return PairedSummary(
+        a,
+        b,
+        n,
+        difference,
+        max(-1.0, difference - margin),
+        min(1.0, difference + margin),
+        ratio,
+    )
+
+
+def pair_score(deal: Iterable[Dict[str, Any]], a: int, b: int) -> Optional[float]:
+    """Score in [0, 1] of player a against b over a deal's games:
+    (1 + a's win rate - b's win rate) / 2 (None if either didn't play)."""
+    games = {a: 0, b: 0}
+    wins = {a: 0, b: 0}
+    for result in deal:
+        for seat, player in enumerate(result["seats"]):
+            if player in games:
+                games[player] += 1
+                wins[player] += seat == result["winner"]
+    if not games[a] or not games[b]:
+        return None
+    return (1 + wins[a] / games[a] - wins[b] / games[b]) / 2
+
+
+class DealCollector:
+    """Groups results by deal (seed) and releases complete deals in schedule
+    order, so sequential tests don't favor deals whose games end quickly."""
+
+    def __init__(self, tasks: Sequence[GameTask]):
+        self.sizes = Counter(task.seed for task in tasks)
+        self.order = list(dict.fromkeys(task.seed for task in tasks))
+        self.next = 0
+        self.buffer: Dict[int, List[Dict[str, Any]]] = {}
+
+    def add(self, result: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        """Adds a result, returning the deals it completed (in order)."""
+        self.buffer.setdefault(result["seed"], []).append(result)
+        complete = []
+        while self.next < len(self.order):
+            seed = self.order[self.next]
+            if len(self.buffer.get(seed, [])) < self.sizes[seed]:
+                break
+            complete.append(self.buffer.pop(seed))
+            self.next += 1
+        return complete
+
+
+def print_summary(
+    results: List[Dict[str, Any]],
+    specs: Sequence[PlayerSpec],
+    confidence: float = 0.95,
+    pairs: Sequence[Tuple[int, int]] = (),
+):
+    level = f"{confidence:.0%} CI"
+    print(f"{'player':<28} {'games':>6} {'wins':>6} {'win rate':>9}  {level}")
+    for s in summarize(results, specs, confidence):
+        label = f"{s.player} {s.spec}"
+        print(
+            f"{label:<28} {s.games:>6} {s.wins:>6} {s.win_rate:>9.1%}  "
+            f"[{s.low:.1%}, {s.high:.1%}]"
+        )
+
+    num_seats = max((len(result["seats"]) for result in results), default=0)
+    seat_wins = [0] * num_seats
+    for result in results:
+        if result["winner"] is not None:
+            seat_wins[result["winner"]] += 1
+    if results:
+        rates = ", ".join(f"{w / len(results):.1%}" for w in seat_wins)
+        truncated = sum(result["winner"] is None for result in results)
+        turns = sum(result["turns"] for result in results) / len(results)
+        print(f"win rate by seat: {rates}")
+        print(f"no winner (turn limit): {truncated}, mean turns: {turns:.1f}")
+
+    for a, b in pairs:
+        paired = paired_difference(results, a, b, confidence)
+        label = f"{a} {specs[a]} - {b} {specs[b]}"
+        print(
+            f"{label:<28} {paired.difference:+.1%}  "
+            f"[{paired.low:+.1%}, {paired.high:+.1%}] over {paired.deals} deals "
+            f"(variance x{paired.variance_ratio:.2f} of independent games)"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("players", nargs="+", help="player specs, e.g. R W MCTS:50")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--output", default=None, help="JSON lines results file")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--no-rotate", action="store_true")
+    parser.add_argument("--maps", default=None, help="MapPool .npy file")
+    parser.add_argument("--vps-to-win", type=int, default=10)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    duplicate = parser.add_argument_group("duplicate mode")
+    duplicate.add_argument("--duplicate", type=int, default=None, metavar="DEALS")
+    duplicate.add_argument("--all-seatings", action="store_true")
+    duplicate.add_argument(
+        "--candidates",
+        nargs="+",
+        default=[],
+        help="bots to play every deal against the players (the field)",
+    )
+    sequential = parser.add_argument_group(
+        "sequential testing (stops as soon as decided, see catan.analysis.sequential)"
+    )
+    sequential.add_argument(
+        "--sprt", type=float, nargs=2, default=None, metavar=("ELO0", "ELO1")
+    )
+    sequential.add_argument("--alpha", type=float, default=0.05)
+    sequential.add_argument("--beta", type=float, default=0.05)
+    sequential.add_argument("--bayes", type=float, default=None, metavar="THRESHOLD")
+    sequential.add_argument("--min-deals", type=int, default=20)
+    sequential.add_argument(
+        "--compare",
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=("A", "B"),
+        help="players to test (indexes, candidates first). Defaults to 0 1.",
+    )
+    farm = parser.add_argument_group("game farm (see catan.farm)")
+    farm.add_argument("--listen", default=None, help="serve games on host:port")
+    farm.add_argument("--local-workers", type=int, default=0)
+    farm.add_argument("--retries", type=int, default=3)
+    farm.add_argument("--task-timeout", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        specs = [PlayerSpec.parse(text) for text in args.candidates + args.players]
+    except ValueError as error:
+        parser.error(str(error))
+    if args.candidates and args.duplicate is None:
+        parser.error("--candidates needs --duplicate")
+    num_candidates = len(args.candidates)
+    num_seats = len(args.players) + (1 if num_candidates else 0)
+    if not 2 <= num_seats <= len(Color):
+        parser.error(f"Games must have between 2 and {len(Color)} players")
+
+    num_maps = None
+    if args.maps is not None:
+        from catan.core.map_pool import MapPool
+
+        num_maps = len(MapPool.load(args.maps))
+    pairs: List[Tuple[int, int]] = []
+    if args.duplicate is not None:
+        field = list(range(num_candidates, len(specs)))
+        if num_candidates:
+            lineups = [[candidate] + field for candidate in range(num_candidates)]
+            if num_candidates > 1:
+                pairs = list(itertools.combinations(range(num_candidates), 2))
+            else:
+                pairs = [(0, player) for player in field]
+        else:
+            lineups = [field]
+            pairs = list(itertools.combinations(field, 2))
+        tasks = schedule_duplicate(
+            lineups, args.duplicate, args.seed, args.all_seatings, num_maps
+        )
+    else:
+        tasks = schedule(
+            len(specs), args.games, args.seed, not args.no_rotate, num_maps
+        )
+
+    results: List[Dict[str, Any]] = []
+    if args.output is not None and os.path.exists(args.output):
+        if not args.resume:
+            parser.error(f"{args.output} exists. Pass --resume to continue it.")
+        results = read_results(args.output, repair=True)
+        try:
+            check_resumable(results, tasks, specs)
+        except ValueError as error:
+            parser.error(str(error))
+
+    test: Any = None
+    compare = tuple(args.compare) if args.compare else (pairs or [(0, 1)])[0]
+    deals = DealCollector(tasks)
+    if args.sprt is not None or args.bayes is not None:
+        from catan.analysis import sequential
+
+        if not all(0 <= player < len(specs) for player in compare):
+            parser.error(f"--compare takes player indexes below {len(specs)}")
+        if args.sprt is not None:
+            test = sequential.SPRT(*args.sprt, args.alpha, args.beta)
+        else:
+            test = sequential.BayesianStop(args.bayes, args.min_deals)
+
+    def decided(result: Dict[str, Any]) -> bool:
+        """Feeds result to the test, returning whether it's decided"""
+        if test is None:
+            return False
+        for deal in deals.add(result):
+            score = pair_score(deal, *compare)
+            if score is not None:
+                test.update(score)
+            if test.decision is not None:
+                return True
+        return False
+
+    stopped = any(decided(r) for r in sorted(results, key=lambda r: r["game"]))
+    done = {result["game"] for result in results}
+    pending = [] if stopped else [task for task in tasks if task.game not in done]
+    print(f"{len(done)} games done, playing {len(pending)}", file=sys.stderr)
+
+    coordinator = None
+    local_workers = []
+    if args.listen is not None or args.local_workers:
+        from catan.farm import Coordinator, parse_address, spawn_local_workers
+
+        host, port = parse_address(args.listen or "127.0.0.1:0")
+        coordinator = Coordinator(
+            specs,
+            pending,
+            host,
+            port,
+            args.maps,
+            args.vps_to_win,
+            max_retries=args.retries,
+            task_timeout=args.task_timeout,
+        )
+        coordinator.start()
+        host, port = coordinator.address
+        print(f"serving games on {host}:{port}", file=sys.stderr)
+        local_workers = spawn_local_workers((host, port), args.local_workers)
+        games = coordinator.results()
+    else:
+        games = play_games(
+            specs, pending, args.workers, args.chunksize, args.maps, args.vps_to_win
+        )
+
+    output = open(args.output, "a") if args.output is not None else None
+    start = time.perf_counter()
+    played = 0
+    try:
+        for played, result in enumerate(games, start=1):
+            results.append(result)
+            if output is not None:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+            if played % max(1, len(pending) // 20) == 0:
+                print(f"{played}/{len(pending)} games", file=sys.stderr)
+            if decided(result):
+                stopped = True
+                break
+    finally:
+        games.close()  # stops the process pool
+        if output is not None:
+            output.close()
+        if coordinator is not None:
+            coordinator.close()
+        for worker in local_workers:
+            if stopped:
+                worker.terminate()
+            worker.wait()
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda result: result["game"])
+    summarized = results
+    if stopped:
+        # games of deals the test didn't get to would unbalance seats and luck
+        partial = {r["game"] for deal in deals.buffer.values() for r in deal}
+        summarized = [r for r in results if r["game"] not in partial]
+        if partial:
+            print(
+                f"summary of complete deals only ({len(partial)} games of "
+                "unfinished deals left out)"
+            )
+    print_summary(summarized, specs, args.confidence, pairs)
+    if played:
+        print(
+            f"played {played} games in {elapsed:.1f}s "
+            f"({played / elapsed:.2f} games/s)"
+        )
+    if test is not None:
+        a, b = compare
+        print(test.status())
+        if test.decision is None:
+            print(f"undecided after {len(results)} games")
+        else:
+            verdict = "stronger" if test.decision == "H1" else "not stronger"
+            saved = len(tasks) - len(results)
+            print(
+                f"{test.decision}: {a} {specs[a]} is {verdict} than {b} {specs[b]}. "
+                f"Decided after {len(results)} of {len(tasks)} games "
+                f"({saved} games, {saved / len(tasks):.0%} saved)"
+            )
+    if coordinator is not None:
+        workers = ", ".join(f"{w}: {n}" for w, n in coordinator.workers.items())
+        print(f"games by worker: {workers}")
+        for game, reason in sorted(coordinator.failed.items()):
+            print(f"game {game} failed: {reason}", file=sys.stderr)
+        if coordinator.failed:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
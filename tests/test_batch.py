@@ -0,0 +1,194 @@
+import random
+
+import numpy as np
+import pytest
+
+from catan.core.batch import BatchState
+from catan.core.game import TURNS_LIMIT, Game
+from catan.core.models.enums import ActionPrompt
+from catan.core.models.player import Color, RandomPlayer
+from catan.core.rollout import (
+    DICE_OUTCOMES,
+    DISCARD,
+    DISCARDING,
+    MOVE_ROBBER,
+    NUM_ACTION_TYPES,
+    ROLL,
+    RolloutState,
+)
+from catan.core.state_functions import player_key
+
+COLORS = [Color.RED, Color.BLUE, Color.ORANGE, Color.WHITE]
+
+FIELDS = [
+    "hands",
+    "bank",
+    "dev_hands",
+    "owned_at_start",
+    "played_dev_in_turn",
+    "has_rolled",
+    "knights_played",
+    "roads_available",
+    "settlements_available",
+    "cities_available",
+    "victory_points",
+    "actual_victory_points",
+    "road_owner",
+    "road_length",
+    "army_owner",
+    "node_owner",
+    "node_is_city",
+    "robber_tile",
+    "current_player",
+    "current_turn",
+    "num_turns",
+    "prompt",
+    "is_initial_build_phase",
+    "is_road_building",
+    "free_roads_available",
+]
+
+
+class ScriptedRandom:
+    """Stands in for the random module in catan.core.rollout, so that steals
+    and discards take the outcomes drawn by the batch."""
+
+    def __init__(self):
+        self.pick = None
+        self.discarded = None
+
+    def randrange(self, stop):
+        assert 0 <= self.pick < stop
+        return self.pick
+
+    def sample(self, population, k):
+        assert len(self.discarded) == k
+        return self.discarded
+
+
+def started_games(num_players, num_games, rng):
+    """Games advanced a random number of plies by the main engine"""
+    games = []
+    for seed in range(num_games):
+        game = Game([RandomPlayer(c) for c in COLORS[:num_players]], seed=seed)
+        for _ in range(rng.randrange(300)):
+            game.play_tick()
+        while game.state.current_prompt == ActionPrompt.DISCARD:
+            game.play_tick()
+        games.append(game)
+    return games
+
+
+def assert_same_state(batch, g, state):
+    for field in FIELDS:
+        assert np.array_equal(getattr(batch, field)[g], getattr(state, field)), field
+    assert batch.edge_owner[g, :-1].tolist() == state.edge_owner
+
+
+def discard_like_batch(state, discarded, scripted):
+    """Plays the DISCARDs of state, discarding as the batch did"""
+    while state.prompt == DISCARDING:
+        player = state.current_player
+        scripted.discarded = [
+            resource
+            for resource, amount in enumerate(discarded[player])
+            for _ in range(amount)
+        ]
+        state.apply(DISCARD)
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4])
+def test_batch_matches_rollout_state_in_lockstep(monkeypatch, num_players):
+    scripted = ScriptedRandom()
+    monkeypatch.setattr("catan.core.rollout.random", scripted)
+    rng = random.Random(num_players)
+    games = started_games(num_players, 6, rng)
+    states = [RolloutState.from_game(game) for game in games]
+    batch = BatchState.from_games(games, seed=num_players)
+    discards = 0
+
+    while True:
+        active = [g for g, state in enumerate(states) if state.winner() == -1]
+        if not active:
+            break
+        mask = batch.legal_mask(np.array(active))
+        slots = np.full(batch.num_games, -1)
+        dices = {}
+        for row, g in enumerate(active):
+            legal = np.nonzero(mask[row])[0]
+            playable = set(states[g].playable_actions())
+            assert {batch.slot_action(slot) for slot in legal} == playable
+            slots[g] = rng.choice(legal)
+            if batch.slot_types[slots[g]] == ROLL:
+                dices[g] = rng.choice(DICE_OUTCOMES)
+
+        hands_before = batch.hands.copy()
+        rolls = [g for g in active if g in dices]
+        slots_without_rolls = slots.copy()
+        slots_without_rolls[rolls] = -1
+        batch.apply(slots_without_rolls)
+        batch.roll(np.array(rolls, int), np.array([sum(dices[g]) for g in rolls], int))
+        for g in active:
+            state = states[g]
+            action = batch.slot_action(slots[g])
+            if g in dices:
+                state.roll(dices[g])
+                if state.prompt == DISCARDING:
+                    discards += 1
+                    discarded = hands_before[g] - batch.hands[g]
+                    discard_like_batch(state, discarded.tolist(), scripted)
+                continue
+            if action % NUM_ACTION_TYPES == MOVE_ROBBER:
+                stride = num_players + 1
+                victim = action // NUM_ACTION_TYPES % stride - 1
+                if victim != -1:
+                    stolen = hands_before[g, victim] - batch.hands[g, victim]
+                    resource = int(np.argmax(stolen))
+                    scripted.pick = sum(state.hands[victim][:resource])
+            state.apply(action)
+        for g in active:
+            assert_same_state(batch, g, states[g])
+
+    assert batch.winners().tolist() == [state.winner() for state in states]
+    assert discards > 0
+
+
+def batch_results(num_games, seed):
+    batch = BatchState.new_games(num_games, 4, seed=seed)
+    slot_weights = batch.slot_weights(None)
+    while True:
+        active = (batch.winners() == -1) & (batch.num_turns < TURNS_LIMIT)
+        if not active.any():
+            break
+        batch.step(slot_weights, np.nonzero(active)[0])
+    return batch.num_turns, batch.actual_victory_points.sum(axis=1)
+
+
+def game_results(num_games):
+    turns, points = [], []
+    for seed in range(num_games):
+        game = Game([RandomPlayer(c) for c in COLORS], seed=seed)
+        game.play()
+        state = game.state
+        turns.append(state.num_turns)
+        points.append(
+            sum(
+                state.player_state[f"{player_key(state, c)}_ACTUAL_VICTORY_POINTS"]
+                for c in state.colors
+            )
+        )
+    return np.array(turns), np.array(points)
+
+
+def assert_same_mean(a, b):
+    """Means agree within 4 standard errors of their difference"""
+    error = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    assert abs(a.mean() - b.mean()) < 4 * error
+
+
+def test_batch_games_are_distributed_as_main_engine_games():
+    batch_turns, batch_points = batch_results(2000, seed=0)
+    game_turns, game_points = game_results(150)
+
+    assert_same_mean(batch_turns, game_turns)
+    assert_same_mean(batch_points, game_points)
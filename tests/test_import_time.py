@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+import pytest
+
+from catan.benchmarks.import_time import HEAVY_DEPENDENCIES, LIGHT_MODULES
+
+
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_light_modules_do_not_import_heavy_dependencies(module):
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    loaded = {name.split(".")[0] for name in result.stdout.split()}
+    assert not loaded & set(HEAVY_DEPENDENCIES)
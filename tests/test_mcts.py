@@ -0,0 +1,407 @@
+import math
+import pickle
+import random
+import time
+
+import pytest
+
+from catan.bots import mcts
+from catan.bots.evaluation import FEATURES, Evaluator
+from catan.bots.heuristics import action_score
+from catan.bots.mcts import (
+    LeafParallelMCTS,
+    MCTSNode,
+    Playout,
+    RootParallelMCTS,
+    TranspositionMCTS,
+    TranspositionTable,
+    position_key,
+    run_until_settled,
+    settled,
+)
+from catan.core.game import Game
+from catan.core.models.enums import ActionType
+from catan.core.models.player import Color, RandomPlayer
+from catan.core.rollout import RolloutState
+
+
+def new_game(seed=0, num_players=2):
+    colors = [Color.RED, Color.BLUE, Color.ORANGE, Color.WHITE][:num_players]
+    random.seed(seed)
+    return Game([RandomPlayer(color) for color in colors], seed=seed)
+
+
+def game_after(seed, plies):
+    """Seeded game after plies random plies"""
+    game = new_game(seed)
+    for _ in range(plies):
+        game.play_tick()
+    return game
+
+
+def searched_root(game, n_simulations, **options):
+    random.seed(0)
+    root = MCTSNode(game=game.copy(), color=game.state.current_color(), **options)
+    root.run_playouts(n_simulations)
+    return root
+
+
+def played_game(seed=0):
+    """Game past its initial build phase"""
+    game = new_game(seed)
+    while game.state.is_initial_build_phase:
+        game.play_tick()
+    return game
+
+
+def test_playout_cut_short_by_deadline_has_no_value():
+    playout = Playout({})
+    state = RolloutState.from_game(played_game())
+    assert playout.value(state.copy(), Color.RED, time.perf_counter() - 1) is None
+    assert playout.value(state.copy(), Color.RED) in (0.0, 1.0)
+
+
+def test_batched_playouts_skip_values_cut_short():
+    game = played_game()
+    root = MCTSNode(game=game, color=game.state.current_color())
+
+    def simulate_batch(nodes, deadline):
+        return [1.0, None, 0.0, None][: len(nodes)]
+
+    assert root.run_batched_playouts(100, simulate_batch, batch_size=4) == 2
+    assert root.visits == 2
+    assert sum(child.visits for child in root.children) == 2
+    assert root.virtual_visits == 0
+    assert not root.child_virtual_visits.any()
+
+
+def test_leaf_parallel_search_drops_playouts_cut_short():
+    game = played_game()
+    root = MCTSNode(game=game, color=game.state.current_color())
+    search = LeafParallelMCTS(workers=2, batch_size=4)
+    search.start()
+    root.run_playouts(1)  # imports numpy (on expanding): before the clock starts
+    values = []
+
+    def simulate(nodes, deadline):
+        result = LeafParallelMCTS.simulate(search, nodes, deadline)
+        values.extend(result)
+        return result
+
+    search.simulate = simulate
+    # workers stop latency seconds early: most of this budget
+    search.latency = 0.045
+    try:
+        done = search.run(root, 1000, time.perf_counter() + 0.05)
+    finally:
+        search.close()
+
+    assert None in values
+    assert root.visits - 1 == done <= len(values) - values.count(None)
+    assert root.virtual_visits == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_playouts_stopped_at_deadline_are_not_backpropagated(seed):
+    game = played_game(seed)
+    root = MCTSNode(game=game, color=game.state.current_color())
+    done = root.run_playouts(1000, time.perf_counter() + 0.02)
+    assert root.visits == done
+
+
+# Seeded searches of the tree before its statistics moved to NumPy arrays:
+# (seed, plies) => (best action, visits and reward of each root child)
+SEARCH_RESULTS = {
+    (0, 0): (
+        (ActionType.BUILD_SETTLEMENT, 21),
+        [45, 43, 32],
+        [55.0, 51.0, 35.0],
+    ),
+    (0, 60): (
+        (ActionType.MARITIME_TRADE, ("SHEEP", "SHEEP", "SHEEP", "SHEEP", "WHEAT")),
+        [24, 30, 18, 22, 26],
+        [22.02, 30.02, 15.0, 20.0, 25.0],
+    ),
+    (3, 90): (
+        (ActionType.BUILD_ROAD, (19, 21)),
+        [4, 16, 7, 9, 9, 14, 7, 16, 12, 9, 10, 7],
+        [1.0, 17.935484, 5.0, 6.935484, 7.935484, 14.935484]
+        + [5.0, 17.935484, 10.935484, 7.935484, 8.935484, 5.0],
+    ),
+}
+
+
+@pytest.mark.parametrize("vectorize_min_children", [mcts.VECTORIZE_MIN_CHILDREN, 2])
+@pytest.mark.parametrize("seed, plies", list(SEARCH_RESULTS))
+def test_search_results_match_list_based_tree(
+    monkeypatch, vectorize_min_children, seed, plies
+):
+    monkeypatch.setattr(mcts, "VECTORIZE_MIN_CHILDREN", vectorize_min_children)
+    game = game_after(seed, plies)
+    random.seed(seed)
+    root = MCTSNode(game=game.copy(), color=game.state.current_color())
+    root.run_playouts(120)
+
+    best, visits, rewards = SEARCH_RESULTS[(seed, plies)]
+    action = root.find_best_action()
+    assert (action.action_type, action.value) == best
+    assert [child.visits for child in root.children] == visits
+    assert [round(child.reward, 6) for child in root.children] == rewards
+    assert root.visits == 120
+
+
+def test_reused_subtree_keeps_its_statistics():
+    root = searched_root(game_after(0, 60), 100)
+    child = max(root.children, key=lambda node: node.visits)
+    visits, reward = child.visits, child.reward
+    grandchildren = [(node.visits, node.reward) for node in child.children]
+
+    assert root.find_descendant([child.outcome]) is child
+    child.detach()
+
+    assert child.parent is None
+    assert (child.visits, child.reward) == (visits, reward)
+    assert [(node.visits, node.reward) for node in child.children] == grandchildren
+    assert child.game.state.actions[-1] == child.outcome
+    child.run_playouts(10)
+    assert child.visits == visits + 10
+
+
+def test_find_descendant_of_unexplored_outcomes_is_none():
+    root = searched_root(game_after(0, 60), 20)
+    assert root.find_descendant([]) is root
+    assert root.find_descendant([root.children[0].action._replace(value="?")]) is None
+
+
+def test_root_parallel_search_sums_worker_trees():
+    game = game_after(0, 60)
+    search = RootParallelMCTS(workers=2)
+    try:
+        stats = search.search(game, game.state.current_color(), 30)
+        again = search.search(game, game.state.current_color(), 7)
+    finally:
+        search.close()
+
+    assert sum(visits for visits, _ in stats.values()) == 30
+    assert sum(visits for visits, _ in again.values()) == 7
+    assert set(stats) <= set(game.state.playable_actions)
+    assert pickle.loads(pickle.dumps(search))._pool is None
+
+
+def root_child(node):
+    while node.parent.parent is not None:
+        node = node.parent
+    return node
+
+
+@pytest.mark.parametrize("virtual_loss, spread", [(1.0, 5), (0.0, 1)])
+def test_virtual_loss_spreads_a_batch_over_paths(virtual_loss, spread):
+    game = game_after(0, 60)
+    root = MCTSNode(game=game, color=game.state.current_color())
+    batches = []
+
+    def simulate_batch(nodes, deadline):
+        batches.append(nodes)
+        return [0.0] * len(nodes)
+
+    root.run_batched_playouts(5, simulate_batch, batch_size=1)
+    assert len(root.children) == 5 and root.is_fully_expanded()
+    root.run_batched_playouts(5, simulate_batch, 5, virtual_loss)
+
+    assert len({root_child(node).index for node in batches[-1]}) == spread
+    assert root.visits == 10
+    assert root.virtual_visits == 0
+
+
+def test_leaf_parallel_search_runs_every_simulation():
+    game = game_after(0, 60)
+    root = MCTSNode(game=game, color=game.state.current_color())
+    search = LeafParallelMCTS(workers=2, batch_size=4)
+    try:
+        assert search.run(root, 10) == 10
+    finally:
+        search.close()
+
+    assert root.visits == sum(child.visits for child in root.children) == 10
+    assert root.virtual_visits == 0
+    assert not root.child_virtual_visits.any()
+
+
+def nodes_of(root):
+    nodes = [root]
+    for node in nodes:
+        nodes.extend(node.children)
+    return nodes
+
+
+def test_nodes_materialize_states_by_replaying_their_path():
+    root = searched_root(game_after(3, 90), 100, cache_size=4)
+    cache = root.cache
+
+    assert not hasattr(root, "__dict__")
+    assert len(cache.states) <= 4
+    assert cache.replays > 0
+    for node in nodes_of(root)[1:]:
+        assert node._game is None
+        game = node.parent.game.copy()
+        mcts.replay_action(game, node.action, node.outcome)
+        assert position_key(node.game) == position_key(game)
+        assert len(cache.states) <= 4
+
+
+def test_detached_subtree_drops_states_of_the_old_tree():
+    root = searched_root(game_after(3, 90), 100, cache_size=16)
+    child = max(root.children, key=lambda node: node.visits)
+    subtree = set(nodes_of(child))
+    assert set(root.cache.states) - subtree
+    child.detach()
+
+    assert child._game is not None
+    assert set(child.cache.states) <= subtree
+
+
+def test_action_orders_reaching_one_position_share_its_key():
+    game = game_after(3, 90)
+    roads = [
+        action
+        for action in game.state.playable_actions
+        if action.action_type == ActionType.BUILD_ROAD
+    ]
+    first, second = None, None
+    for a in roads:
+        after_a = game.copy()
+        after_a.execute(a)
+        second = next((b for b in roads if b in after_a.state.playable_actions), None)
+        if second is not None:
+            first = a
+            break
+    assert first is not None
+
+    keys = []
+    for order in ([first, second], [second, first]):
+        copy = game.copy()
+        for action in order:
+            copy.execute(action)
+        keys.append(position_key(copy))
+    assert keys[0] == keys[1] != position_key(game)
+
+
+def test_transposed_positions_share_one_node():
+    game = game_after(3, 90)
+    random.seed(0)
+    search = TranspositionMCTS(game.copy(), game.state.current_color())
+    search.run_playouts(150)
+
+    incoming = {}
+    for key, position in search.table.positions.items():
+        for edge in position.edges:
+            incoming.setdefault(edge.key, []).append((key, edge))
+    transposed = [
+        key for key, edges in incoming.items() if len({k for k, _ in edges}) > 1
+    ]
+    assert search.table.transpositions > 0 and transposed
+    for key in transposed:
+        edges = [edge for _, edge in incoming[key]]
+        assert search.table.get(key).visits == sum(edge.visits for edge in edges)
+    assert search.root.visits == 150
+
+
+@pytest.mark.parametrize("policy", TranspositionTable.POLICIES)
+def test_transposition_table_stays_within_capacity(policy):
+    game = game_after(3, 90)
+    table = TranspositionTable(capacity=20, policy=policy)
+    search = TranspositionMCTS(game.copy(), game.state.current_color(), table)
+    search.run_playouts(60)
+
+    assert len(table) <= 20
+    assert table.evictions > 0
+
+
+def test_truncated_playout_is_valued_by_the_evaluator():
+    state = RolloutState.from_game(played_game())
+    evaluator = Evaluator([0.5] * len(FEATURES))
+    playout = Playout({}, turns=3, evaluator=evaluator)
+
+    random.seed(1)
+    value = playout.value(state.copy(), Color.RED)
+    random.seed(1)
+    expected = state.copy()
+    assert expected.play({}, expected.num_turns + 3) is None
+    assert value == evaluator.win_probability(expected, Color.RED)
+    assert 0 < value < 1
+
+
+def test_playouts_truncate_after_at_least_one_turn():
+    with pytest.raises(ValueError):
+        Playout({}, turns=0)
+
+
+def test_evaluator_weights_round_trip(tmp_path):
+    evaluator = Evaluator([0.1 * i for i in range(len(FEATURES))])
+    path = str(tmp_path / "evaluation.json")
+    evaluator.save(path)
+
+    assert Evaluator.load(path).weights == evaluator.weights
+    with pytest.raises(ValueError):
+        Evaluator([1.0])
+
+
+def test_settled_once_runner_up_cannot_catch_up():
+    assert settled([10, 4, 1], [5, 2, 0], False, 5)
+    assert not settled([10, 4, 1], [5, 2, 0], False, 6)
+    assert settled([4, 10], [2, 5], True, 5)  # whatever the untried actions
+    assert not settled([], [], True, 0)
+
+
+def test_settled_with_confidence_needs_a_clear_best_mean():
+    visits, rewards = [100, 90], [90, 10]
+    assert not settled(visits, rewards, False, 1000)
+    assert settled(visits, rewards, False, 1000, confidence=0.05)
+    assert not settled(visits, rewards, True, 1000, confidence=0.05)
+    assert not settled([100, 90], [60, 50], False, 1000, confidence=0.05)
+
+
+def test_run_until_settled_stops_once_settled():
+    calls = []
+
+    def run_playouts(n):
+        calls.append(n)
+        return n
+
+    def is_settled(remaining):
+        return sum(calls) >= 30
+
+    assert run_until_settled(run_playouts, 100, is_settled, step=8) == 32
+    assert run_until_settled(run_playouts, 10, lambda remaining: False, 4) == 10
+
+
+@pytest.mark.parametrize("widening, exponent", [(1.0, 0.5), (2.0, 0.3)])
+def test_widened_node_expands_as_it_gets_visited(widening, exponent):
+    game = game_after(3, 90)
+    random.seed(0)
+    root = MCTSNode(
+        game=game.copy(),
+        color=game.state.current_color(),
+        widening=widening,
+        widening_exponent=exponent,
+    )
+    actions = len(root.untried_actions)
+    expected = 0
+    for visits in range(60):
+        # one more child per simulation while under k * (visits + 1) ** alpha
+        if expected < min(actions, math.ceil(widening * (visits + 1) ** exponent)):
+            expected += 1
+        root.run_playouts(1)
+        assert len(root.children) == expected
+    assert len(root.children) < actions
+
+
+def test_widened_node_tries_best_scored_actions_first():
+    game = game_after(3, 90)
+    root = searched_root(game, 4, widening=1.0)
+    tried = [child.action for child in root.children]
+    scores = [action_score(game, action) for action in tried + root.untried_actions]
+
+    assert [action_score(game, action) for action in tried] == sorted(
+        scores, reverse=True
+    )[: len(tried)]
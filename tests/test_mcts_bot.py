@@ -0,0 +1,168 @@
+import pickle
+import random
+import time
+
+import pytest
+
+from catan.bots import mcts
+from catan.bots.evaluation import FEATURES, Evaluator
+from catan.bots.mcts_bot import MAX_BANKED_BUDGETS, MIN_TIME_BUDGET_MS, MCTSBot
+from catan.core.game import Game
+from catan.core.models.player import Color, RandomPlayer
+
+
+class FakeClock:
+    """Stands in for time.perf_counter: time advances by step seconds on
+    every reading, so time budgets hold whatever the machine's load."""
+
+    def __init__(self, step: float):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+@pytest.mark.parametrize("options", [{}, {"transpositions": True}])
+def test_decisions_stay_within_time_budget(monkeypatch, options):
+    monkeypatch.setattr(time, "perf_counter", FakeClock(1e-5))
+    budget_ms = 50
+    for seed in range(3):
+        random.seed(seed)
+        bot = MCTSBot(Color.RED, time_budget_ms=budget_ms, **options)
+        game = Game([bot, RandomPlayer(Color.BLUE)], seed=seed)
+        while not game.finished() and len(bot.reports) < 15:
+            game.play_tick()
+
+        assert any(report.simulations for report in bot.reports)
+        for report in bot.reports:
+            assert report.seconds <= budget_ms / 1000
+
+
+def test_rejects_time_budgets_below_minimum():
+    with pytest.raises(ValueError):
+        MCTSBot(Color.RED, time_budget_ms=MIN_TIME_BUDGET_MS - 1)
+    with pytest.raises(ValueError):
+        MCTSBot(Color.RED, time_budget_ms=50, workers=2, parallel="leaf")
+    MCTSBot(Color.RED, time_budget_ms=MIN_TIME_BUDGET_MS)
+
+
+def play_decisions(bot, seed, decisions):
+    random.seed(seed)
+    game = Game([bot, RandomPlayer(Color.BLUE)], seed=seed)
+    while not game.finished() and (
+        bot.game_id != game.id or len(bot.reports) < decisions
+    ):
+        game.play_tick()
+    return game
+
+
+def test_reuses_subtree_of_previous_decision():
+    bot = MCTSBot(Color.RED, n_simulations=40)
+    play_decisions(bot, 0, 10)
+
+    assert any(report.inherited > 0 for report in bot.reports)
+    assert bot.root is not None and bot.root.parent is None
+
+
+def test_reports_and_tree_are_per_game():
+    bot = MCTSBot(Color.RED, n_simulations=20)
+    play_decisions(bot, 0, 3)
+    game = play_decisions(bot, 1, 1)
+
+    assert len(bot.reports) == 1
+    assert bot.reports[0].inherited == 0
+    assert bot.root.game.id == game.id
+
+
+def test_pickled_bot_leaves_search_state_out():
+    bot = MCTSBot(Color.RED, n_simulations=20)
+    play_decisions(bot, 0, 2)
+    copy = pickle.loads(pickle.dumps(bot))
+
+    assert copy.root is None and copy.reports == []
+    assert copy.n_simulations == 20 and bot.reports
+
+
+def test_root_parallel_bot_decides_playable_actions():
+    bot = MCTSBot(Color.RED, n_simulations=20, workers=2)
+    try:
+        play_decisions(bot, 0, 3)
+    finally:
+        bot.close()
+
+    assert [report.simulations for report in bot.reports] == [20, 20, 20]
+
+
+def test_leaf_parallel_bot_searches_one_tree():
+    bot = MCTSBot(Color.RED, n_simulations=16, workers=2, parallel="leaf")
+    try:
+        play_decisions(bot, 0, 3)
+    finally:
+        bot.close()
+
+    assert [report.simulations for report in bot.reports] == [16, 16, 16]
+    assert any(report.inherited > 0 for report in bot.reports)
+
+
+def test_transpositions_bot_keeps_its_table_within_a_game():
+    bot = MCTSBot(Color.RED, n_simulations=40, transpositions=True)
+    play_decisions(bot, 0, 10)
+
+    assert bot.table is not None and len(bot.table) > 0
+    assert any(report.inherited > 0 for report in bot.reports)
+
+
+def test_bot_truncates_playouts_with_saved_evaluator(tmp_path):
+    path = str(tmp_path / "evaluation.json")
+    Evaluator([0.5] * len(FEATURES)).save(path)
+    bot = MCTSBot(Color.RED, n_simulations=20, rollout_turns=2, evaluator=path)
+    play_decisions(bot, 0, 2)
+
+    assert bot.evaluator.weights == [0.5] * len(FEATURES)
+    assert bot.root.playout.turns == 2
+    assert bot.root.playout.evaluator is bot.evaluator
+
+
+def test_early_stop_saves_simulations_of_settled_decisions():
+    bot = MCTSBot(Color.RED, n_simulations=200, early_stop=True)
+    play_decisions(bot, 0, 5)
+
+    assert any(report.saved > 0 for report in bot.reports)
+    for report in bot.reports:
+        assert report.simulations + report.saved == 200
+
+
+def test_bank_time_carries_time_saved_to_later_decisions(monkeypatch):
+    monkeypatch.setattr(time, "perf_counter", FakeClock(1e-5))
+    budget = 0.05
+    bot = MCTSBot(Color.RED, time_budget_ms=50, early_stop=True, bank_time=True)
+    time_left = []  # at the start of each search, with the banked time
+    run_until = mcts.run_until
+
+    def recorded_run_until(run_playouts, deadline, *args):
+        time_left.append((deadline - time.perf_counter(), bot.banked_seconds))
+        return run_until(run_playouts, deadline, *args)
+
+    monkeypatch.setattr(mcts, "run_until", recorded_run_until)
+    play_decisions(bot, 0, 10)
+
+    assert any(report.saved > 0 for report in bot.reports)
+    assert any(banked > 0 for _, banked in time_left)
+    for left, banked in time_left:
+        assert banked <= MAX_BANKED_BUDGETS * budget
+        assert left <= budget + banked
+    assert any(left > budget for left, _ in time_left)
+
+
+def test_widening_bot_limits_root_children():
+    bot = MCTSBot(Color.RED, n_simulations=9, widening=1.0, reuse_tree=False)
+    roots = []
+    bot.debug_cb = roots.append
+    play_decisions(bot, 0, 5)
+
+    for root in roots:
+        assert len(root.children) <= 3  # ceil(1 * 9 ** 0.5)
+    with pytest.raises(ValueError):
+        MCTSBot(Color.RED, widening=1.0, transpositions=True)
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from catan.core import rollout as rollout_module
+from catan.core.game import Game
+from catan.core.models.enums import CITY, RESOURCES, SETTLEMENT, ActionType
+from catan.core.models.player import Color, RandomPlayer
+from catan.core.rollout import (
+    PROMPT_INDEX,
+    RolloutState,
+    decode_action,
+    encode_action,
+)
+from catan.core.state_functions import get_player_freqdeck, player_key
+
+COLORS = [Color.RED, Color.BLUE, Color.ORANGE, Color.WHITE]
+
+
+class ScriptedRandom:
+    """Stands in for the random module in catan.core.rollout, so that steals
+    and discards take the outcomes logged by the main engine."""
+
+    def __init__(self):
+        self.pick = None
+        self.discarded = None
+
+    def randrange(self, stop):
+        assert 0 <= self.pick < stop
+        return self.pick
+
+    def sample(self, population, k):
+        assert len(self.discarded) == k
+        return self.discarded
+
+
+def assert_same_state(game, state):
+    main = game.state
+    board = main.board
+    assert state.current_player == main.current_player_index
+    assert state.prompt == PROMPT_INDEX[main.current_prompt]
+    assert state.num_turns == main.num_turns
+    assert state.bank == list(main.resource_freqdeck)
+    assert state.hands == [get_player_freqdeck(main, c) for c in main.colors]
+    assert state.dev_deck == main.development_listdeck
+
+    owners = {}
+    for node, owner in enumerate(state.node_owner):
+        if owner != -1:
+            kind = CITY if state.node_is_city[node] else SETTLEMENT
+            owners[node] = (main.colors[owner], kind)
+    assert owners == {node: (c, kind) for node, (c, kind) in board.buildings.items()}
+    roads = {
+        frozenset(state.topology.edges[edge]): main.colors[owner]
+        for edge, owner in enumerate(state.edge_owner)
+        if owner != -1
+    }
+    assert roads == {frozenset(edge): c for edge, c in board.roads.items()}
+    assert state.robber_tile == state.topology.tile_index[board.robber_coordinate]
+
+    assert state.road_lengths == [board.road_lengths.get(c, 0) for c in main.colors]
+    road_owner = None if state.road_owner == -1 else main.colors[state.road_owner]
+    assert road_owner == board.road_color
+    for index, color in enumerate(main.colors):
+        key = player_key(main, color)
+        player_state = main.player_state
+        assert (state.army_owner == index) == player_state[f"{key}_HAS_ARMY"]
+        assert state.knights_played[index] == player_state[f"{key}_PLAYED_KNIGHT"]
+        assert state.victory_points[index] == player_state[f"{key}_VICTORY_POINTS"]
+        assert (
+            state.actual_victory_points[index]
+            == player_state[f"{key}_ACTUAL_VICTORY_POINTS"]
+        )
+
+
+def assert_same_actions(game, state):
+    playable = game.state.playable_actions
+    encoded = state.playable_actions()
+    assert set(encoded) == {encode_action(state, action) for action in playable}
+    for action in encoded:
+        assert decode_action(state, action) in playable
+
+
+def apply_logged(state, action, scripted):
+    """Applies the main engine's logged action, with its chance outcome."""
+    if action.action_type == ActionType.ROLL:
+        state.roll(action.value)
+        return
+    if action.action_type == ActionType.MOVE_ROBBER and action.value[1] is not None:
+        victim_hand = state.hands[state.colors.index(action.value[1])]
+        scripted.pick = sum(victim_hand[: RESOURCES.index(action.value[2])])
+        action = action._replace(value=(*action.value[:2], None))
+    elif action.action_type == ActionType.DISCARD:
+        scripted.discarded = [RESOURCES.index(r) for r in action.value]
+        action = action._replace(value=None)
+    elif action.action_type == ActionType.BUY_DEVELOPMENT_CARD:
+        action = action._replace(value=None)
+    state.apply(encode_action(state, action))
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4])
+@pytest.mark.parametrize("seed", range(3))
+def test_rollout_state_matches_main_engine(monkeypatch, num_players, seed):
+    scripted = ScriptedRandom()
+    monkeypatch.setattr(rollout_module, "random", scripted)
+    players = [RandomPlayer(color) for color in COLORS[:num_players]]
+    game = Game(players, seed=seed)
+    rng = random.Random(seed)
+    state = RolloutState.from_game(game)
+
+    while not game.finished():
+        assert_same_actions(game, state)
+        action = rng.choice(game.state.playable_actions)
+        apply_logged(state, game.execute(action), scripted)
+        assert_same_state(game, state)
+
+    winner = game.winning_color()
+    assert state.winner() == (-1 if winner is None else state.colors.index(winner))
@@ -123,7 +123,9 @@ export default function Prompt({ gameState, isBotThinking }) {
     BLUE: '#2b6ed9',
     RED: '#c83d3a',
     ORANGE: '#ffa500',
-    VIOLET: '#8F00FF'
+    VIOLET: '#8F00FF',
+    WHITE: '#e8e8e8',
+    GREEN: '#2e8b57'
   }
 
   return <div className="prompt">Game finished!
@@ -84,7 +84,9 @@ function GameScreen({ replayMode }) {
     BLUE: '#2b6ed9',
     RED: '#c83d3a',
     ORANGE: '#ffa500',
-    VIOLET: '#8F00FF'
+    VIOLET: '#8F00FF',
+    WHITE: '#e8e8e8',
+    GREEN: '#2e8b57'
   }
 
 